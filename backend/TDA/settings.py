@@ -48,11 +48,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la solicitud completa (ver /metrics)
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ContextoAccesoMiddleware',
+    'core.middleware.FijacionPrimariaMiddleware',
+    'core.middleware.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,6 +75,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.tickets_sin_asignar_count',
+                'core.context_processors.eventos_cola',
             ],
         },
     },
@@ -83,7 +89,7 @@ WSGI_APPLICATION = 'TDA.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.mysql'),
         'NAME': os.environ.get('DB_NAME', 'sistema_tickets_db'),
         'USER': os.environ.get('DB_USER', 'tickets_user'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'tickets_pass'),
@@ -92,6 +98,112 @@ DATABASES = {
     }
 }
 
+# Conexiones. DB_POOL=1 (solo MySQL) usa el backend core.backends.mysql_pool: cada proceso mantiene
+# hasta DB_POOL_MAXIMO conexiones abiertas y las reutiliza entre requests e hilos; su estado se
+# publica en /metrics (tda_db_pool_*) y /health/. Sin pool, DB_CONN_MAX_AGE > 0 conserva una
+# conexión por hilo entre requests. benchmark_conexiones compara ambos modos
+if os.environ.get('DB_POOL', '0') == '1' and DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+    DATABASES['default'].update(
+        ENGINE='core.backends.mysql_pool',
+        # La conexión vuelve al pool al terminar cada request
+        CONN_MAX_AGE=0,
+        POOL={
+            'MAXIMO': int(os.environ.get('DB_POOL_MAXIMO', '10')),
+            # Segundos que un request espera una conexión libre
+            'ESPERA': float(os.environ.get('DB_POOL_ESPERA', '10')),
+            # Segundos sin uso tras los que una conexión libre se cierra (menor que wait_timeout de MySQL)
+            'MAX_INACTIVA': float(os.environ.get('DB_POOL_MAX_INACTIVA', '300')),
+            'MAX_VIDA': float(os.environ.get('DB_POOL_MAX_VIDA', '3600')),
+            'PRE_PING': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        },
+    )
+else:
+    DATABASES['default'].update(
+        CONN_MAX_AGE=int(os.environ.get('DB_CONN_MAX_AGE', '0')),
+        CONN_HEALTH_CHECKS=True,
+    )
+
+# Réplicas de lectura (opcional): DB_REPLICAS="host1[:puerto],host2[:puerto]" agrega los alias
+# replica1, replica2... con las credenciales de la primaria. Las vistas y comandos de solo lectura
+# leen de ellas (core/routers.py). Para probar en local con SQLite: DB_ENGINE=django.db.backends.sqlite3,
+# DB_NAME=primaria.sqlite3 y DB_REPLICAS=replica.sqlite3 (cada entrada es la ruta de un archivo,
+# que se "replica" copiando el de la primaria)
+DATABASE_REPLICAS = []
+for _indice, _entrada in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    _replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if _replica['ENGINE'].endswith('sqlite3'):
+        _replica['NAME'] = _entrada.strip()
+    else:
+        _host, _, _puerto = _entrada.strip().partition(':')
+        _replica.update(HOST=_host, PORT=_puerto or _replica['PORT'])
+        # Una escritura enviada por error a la réplica falla en lugar de desincronizarla
+        _replica['OPTIONS'] = {'init_command': 'SET SESSION TRANSACTION READ ONLY'}
+    DATABASES[f'replica{_indice}'] = _replica
+    DATABASE_REPLICAS.append(f'replica{_indice}')
+
+DATABASE_ROUTERS = ['core.routers.RouterReplicas']
+
+# Segundos que la sesión de un usuario lee de la primaria después de una escritura suya,
+# para no mostrarle datos atrasados de la réplica (debe superar el retraso de replicación)
+DB_FIJACION_PRIMARIA_SEGUNDOS = int(os.environ.get('DB_FIJACION_PRIMARIA_SEGUNDOS', '10'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# En despliegues con varios procesos usar una cache compartida (Redis/Memcached)
+# para que la invalidación del contador de tickets sin asignar llegue a todos.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Segundos que se mantiene en cache el contador de tickets sin asignar por área
+TICKETS_SIN_ASIGNAR_CACHE_TIMEOUT = int(os.environ.get('TICKETS_SIN_ASIGNAR_CACHE_TIMEOUT', '60'))
+
+# Segundos que se cachea el contexto de acceso (perfil, área y jefaturas) de cada usuario.
+# 0 = se resuelve una vez por request. Con varios procesos, usar un cache compartido (CACHE_BACKEND)
+# para que la invalidación al modificar perfiles o jefaturas llegue a todos
+ACCESO_CACHE_TIMEOUT = int(os.environ.get('ACCESO_CACHE_TIMEOUT', '0'))
+
+# Segundos que se guarda en cache cada versión del catálogo de áreas y trabajadores de los selects.
+# Se invalida al modificar áreas, usuarios, perfiles o jefaturas; con varios procesos necesita un
+# cache compartido (CACHE_BACKEND) para que la nueva versión llegue a todos
+CATALOGOS_CACHE_TIMEOUT = int(os.environ.get('CATALOGOS_CACHE_TIMEOUT', '3600'))
+
+# Dashboards async: sus consultas independientes se ejecutan a la vez, cada una con su conexión
+# (core.asincronas). Solo bajo un servidor ASGI (perfil "asgi" de docker-compose): con WSGI Django
+# corre la vista en un event loop por request y pierde la ganancia
+VISTAS_ASYNC = os.environ.get('VISTAS_ASYNC', '0') == '1'
+
+# Cambios en la cola sin asignar enviados a los navegadores (Server-Sent Events, core.eventos), en
+# lugar de recargar la cola y los dashboards. Cada pestaña mantiene una conexión abierta: solo bajo
+# un servidor ASGI. Con varios procesos, EVENTOS_BROKER=core.eventos.BrokerRedis reparte los eventos
+# entre todos a través de EVENTOS_REDIS_URL
+EVENTOS_COLA = os.environ.get('EVENTOS_COLA', '0') == '1'
+EVENTOS_BROKER = os.environ.get('EVENTOS_BROKER', 'core.eventos.BrokerMemoria')
+EVENTOS_REDIS_URL = os.environ.get('EVENTOS_REDIS_URL', 'redis://localhost:6379/0')
+# Comentario periódico para detectar conexiones cortadas y evitar timeouts de proxies
+EVENTOS_KEEPALIVE_SEGUNDOS = int(os.environ.get('EVENTOS_KEEPALIVE_SEGUNDOS', '15'))
+# Duración de cada conexión; al cerrarse el navegador se reconecta tras EVENTOS_REINTENTO_MS
+EVENTOS_DURACION_MAXIMA_SEGUNDOS = int(os.environ.get('EVENTOS_DURACION_MAXIMA_SEGUNDOS', '300'))
+EVENTOS_REINTENTO_MS = int(os.environ.get('EVENTOS_REINTENTO_MS', '5000'))
+
+# Máximo de tickets que devuelve la búsqueda de texto completo, ordenados por relevancia
+BUSQUEDA_LIMITE_RESULTADOS = int(os.environ.get('BUSQUEDA_LIMITE_RESULTADOS', '1000'))
+
+# Token que exige /metrics en el encabezado "Authorization: Bearer <token>" (vacío = sin autenticación;
+# en ese caso restringir el acceso a /metrics desde el proxy)
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
+# Perfilado bajo demanda para usuarios staff (?perfilar=1 o encabezado X-Perfilar: 1).
+# Cada solicitud perfilada deja cProfile, SQL y EXPLAIN de las consultas lentas en PERFILADO_DIRECTORIO/<id>
+PERFILADO_HABILITADO = os.environ.get('PERFILADO_HABILITADO', '1') == '1'
+PERFILADO_DIRECTORIO = os.environ.get('PERFILADO_DIRECTORIO', str(BASE_DIR / 'perfiles'))
+PERFILADO_UMBRAL_EXPLAIN_MS = float(os.environ.get('PERFILADO_UMBRAL_EXPLAIN_MS', '100'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,4 +246,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Login/Logout URLs
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
-LOGOUT_REDIRECT_URL = '/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/login/'
+
+# Correo saliente (SMTP). En desarrollo docker-compose usa el servicio mailpit (interfaz en :8025)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '0') == '1'
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', '10'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Sistema de Tickets <no-responder@tickets.local>')
+
+# URL pública del sitio, para los enlaces de los correos
+SITIO_URL = os.environ.get('SITIO_URL', 'http://localhost:8000')
+
+# Outbox (core/outbox.py, comando procesar_outbox). Un evento fallido se reintenta con espera
+# exponencial desde la base hasta el máximo; después de OUTBOX_MAX_INTENTOS queda FALLIDO
+OUTBOX_MAX_INTENTOS = int(os.environ.get('OUTBOX_MAX_INTENTOS', '8'))
+OUTBOX_REINTENTO_BASE_SEGUNDOS = int(os.environ.get('OUTBOX_REINTENTO_BASE_SEGUNDOS', '30'))
+OUTBOX_REINTENTO_MAXIMO_SEGUNDOS = int(os.environ.get('OUTBOX_REINTENTO_MAXIMO_SEGUNDOS', '3600'))
+# Segundos que un worker reserva los eventos que reclamó; si no los marca a tiempo (el worker murió)
+# quedan disponibles para otro
+OUTBOX_RECLAMO_SEGUNDOS = int(os.environ.get('OUTBOX_RECLAMO_SEGUNDOS', '300'))
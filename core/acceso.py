@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Area, Perfil, Jefatura
+from .routers import usar_primaria
+
+# ===================================================================
+# CONTEXTO DE ACCESO DEL USUARIO
+# Perfil, área y jefaturas activas se cargan una sola vez por request
+# (ContextoAccesoMiddleware) y, opcionalmente, se cachean entre requests
+# ===================================================================
+
+@dataclass(frozen=True)
+class ContextoAcceso:
+    """Datos del usuario que usan las verificaciones de permisos"""
+    usuario_id: Optional[int] = None
+    es_superusuario: bool = False
+    tiene_perfil: bool = False
+    area: Optional[Area] = None
+    # Áreas de las jefaturas activas, en orden de creación de la jefatura
+    areas_jefatura: Tuple[Area, ...] = ()
+
+    @property
+    def area_id(self):
+        return self.area.id if self.area else None
+
+    @property
+    def es_jefe(self):
+        return bool(self.areas_jefatura)
+
+    @property
+    def es_jefe_o_admin(self):
+        return self.es_superusuario or self.es_jefe
+
+    @property
+    def area_jefatura(self):
+        """Área de la primera jefatura activa (la que usan los dashboards y la gestión de usuarios)"""
+        return self.areas_jefatura[0] if self.areas_jefatura else None
+
+    def es_del_area(self, area_id):
+        return self.area_id is not None and self.area_id == area_id
+
+    def es_jefe_de(self, area_id):
+        return any(area.id == area_id for area in self.areas_jefatura)
+
+CONTEXTO_ANONIMO = ContextoAcceso()
+
+def _clave_cache(usuario_id):
+    return f'contexto_acceso:usuario:{usuario_id}'
+
+def _timeout_cache():
+    return getattr(settings, 'ACCESO_CACHE_TIMEOUT', 0)
+
+def _cargar(user):
+    """Dos consultas: perfil con su área y jefaturas activas con sus áreas"""
+    perfil = Perfil.objects.filter(usuario_id=user.pk).select_related('area').first()
+    jefaturas = Jefatura.objects.filter(
+        trabajador_jefe_id=user.pk,
+        fecha_fin_jefatura__isnull=True
+    ).select_related('area_jefatura').order_by('id')
+
+    return ContextoAcceso(
+        usuario_id=user.pk,
+        es_superusuario=user.is_superuser,
+        tiene_perfil=perfil is not None,
+        area=perfil.area if perfil else None,
+        areas_jefatura=tuple(jefatura.area_jefatura for jefatura in jefaturas),
+    )
+
+def contexto_acceso(user):
+    """Contexto del usuario, memorizado en la instancia para el resto del request"""
+    if not user.is_authenticated:
+        return CONTEXTO_ANONIMO
+
+    contexto = getattr(user, '_contexto_acceso', None)
+    if contexto is not None:
+        return contexto
+
+    timeout = _timeout_cache()
+    if timeout:
+        contexto = cache.get(_clave_cache(user.pk))
+        # is_superuser viene del usuario ya cargado en el request, no del cache
+        if contexto is None or contexto.es_superusuario != user.is_superuser:
+            with usar_primaria():
+                contexto = _cargar(user)
+            cache.set(_clave_cache(user.pk), contexto, timeout)
+    else:
+        contexto = _cargar(user)
+
+    user._contexto_acceso = contexto
+    return contexto
+
+def invalidar_contexto(usuario_ids):
+    """Descarta el contexto cacheado de los usuarios al confirmarse la transacción actual"""
+    if not _timeout_cache():
+        return
+    claves = [_clave_cache(usuario_id) for usuario_id in usuario_ids]
+    transaction.on_commit(lambda: cache.delete_many(claves))
@@ -0,0 +1,218 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import outbox
+from .acceso import contexto_acceso
+from .forms import CambioEstadoForm
+from .models import Ticket, Observacion, Derivacion, ContadorTickets, TerminoBusqueda
+
+# ===================================================================
+# ACCIONES MASIVAS SOBRE TICKETS
+# Cada acción lee los tickets en una consulta (bloqueándolos), valida
+# permisos y transiciones en memoria y aplica los cambios con un UPDATE
+# y bulk_create, dentro de una sola transacción
+# ===================================================================
+
+@dataclass(frozen=True)
+class ResultadoAccionMasiva:
+    """Tickets modificados y tickets rechazados con su motivo"""
+    actualizados: List[int] = field(default_factory=list)
+    rechazados: Dict[int, str] = field(default_factory=dict)
+
+def _nombre(usuario):
+    return usuario.get_full_name() or usuario.username
+
+def _cargar_tickets(ids):
+    """Filas de los tickets con los campos del contador, bloqueadas hasta el fin de la transacción"""
+    filas = Ticket.objects.select_for_update().filter(pk__in=ids).values(
+        'id', 'estado', 'nivel_critico', 'area_asignada_id', 'trabajador_asignado_id'
+    )
+    return {fila['id']: fila for fila in filas}
+
+def _clave(fila, **cambios):
+    datos = {**fila, **cambios}
+    return ContadorTickets.clave(
+        datos['area_asignada_id'], datos['estado'], datos['nivel_critico'], datos['trabajador_asignado_id']
+    )
+
+def _clasificar(ids, filas, motivo_rechazo):
+    """Separa los tickets válidos de los rechazados; motivo_rechazo(fila) devuelve None si es válido"""
+    validos, rechazados = [], {}
+    for ticket_id in ids:
+        fila = filas.get(ticket_id)
+        motivo = 'El ticket no existe' if fila is None else motivo_rechazo(fila)
+        if motivo:
+            rechazados[ticket_id] = motivo
+        else:
+            validos.append(fila)
+    return validos, rechazados
+
+def _aplicar(filas, cambios, observaciones=(), derivaciones=()):
+    """Actualiza los tickets, sus conteos y el contador; crea sus observaciones y derivaciones"""
+    ids = [fila['id'] for fila in filas]
+    campos = {**cambios, 'fecha_actualizacion': timezone.now()}
+    if observaciones:
+        campos['observaciones_count'] = F('observaciones_count') + 1
+    if derivaciones:
+        campos['derivaciones_count'] = F('derivaciones_count') + 1
+    Ticket.objects.filter(pk__in=ids).update(**campos)
+
+    deltas = {}
+    for fila in filas:
+        anterior, nueva = _clave(fila), _clave(fila, **cambios)
+        if anterior != nueva:
+            deltas[anterior] = deltas.get(anterior, 0) - 1
+            deltas[nueva] = deltas.get(nueva, 0) + 1
+    ContadorTickets.aplicar(deltas)
+
+    Derivacion.objects.bulk_create(derivaciones)
+    # En MySQL bulk_create no devuelve los IDs, pero ahí la búsqueda usa FULLTEXT y no se indexa
+    TerminoBusqueda.indexar_tickets([], Observacion.objects.bulk_create(observaciones))
+
+# -------------------------------------------------------------------
+# Asignación
+# -------------------------------------------------------------------
+
+@transaction.atomic
+def asignar_tickets(usuario, ids, trabajador=None):
+    """Asigna los tickets al trabajador (o los desasigna si es None).
+    Requiere ser jefe del área de cada ticket; el trabajador debe pertenecer a esa área."""
+    acceso = contexto_acceso(usuario)
+    area_trabajador = trabajador.perfil.area_id if trabajador and hasattr(trabajador, 'perfil') else None
+    filas = _cargar_tickets(ids)
+
+    def motivo_rechazo(fila):
+        if not (usuario.is_superuser or acceso.es_jefe_de(fila['area_asignada_id'])):
+            return 'No tienes permisos para asignar este ticket'
+        if trabajador and area_trabajador != fila['area_asignada_id']:
+            return 'El trabajador debe pertenecer al área del ticket'
+        if fila['trabajador_asignado_id'] == (trabajador.id if trabajador else None):
+            return 'El ticket ya tiene esa asignación'
+        return None
+
+    validos, rechazados = _clasificar(ids, filas, motivo_rechazo)
+    if not validos:
+        return ResultadoAccionMasiva(rechazados=rechazados)
+
+    if trabajador:
+        texto = f'Ticket asignado a {_nombre(trabajador)}'
+        observaciones = [
+            Observacion(ticket_asociado_id=fila['id'], observacion_texto=texto, autor_trabajador=usuario)
+            for fila in validos
+        ]
+    else:
+        anteriores = User.objects.in_bulk({fila['trabajador_asignado_id'] for fila in validos})
+        observaciones = [
+            Observacion(
+                ticket_asociado_id=fila['id'],
+                observacion_texto=f"Ticket desasignado de {_nombre(anteriores[fila['trabajador_asignado_id']])}",
+                autor_trabajador=usuario
+            )
+            for fila in validos
+        ]
+
+    _aplicar(validos, {'trabajador_asignado_id': trabajador.id if trabajador else None}, observaciones=observaciones)
+    if trabajador and trabajador.id != usuario.id:
+        outbox.registrar_varios(outbox.TICKET_ASIGNADO, [
+            {'ticket_id': fila['id'], 'trabajador_id': trabajador.id} for fila in validos
+        ])
+    return ResultadoAccionMasiva([fila['id'] for fila in validos], rechazados)
+
+# -------------------------------------------------------------------
+# Derivación
+# -------------------------------------------------------------------
+
+@transaction.atomic
+def derivar_tickets(usuario, ids, area_destino, motivo):
+    """Deriva los tickets abiertos al área de destino y los desasigna (HU02)"""
+    acceso = contexto_acceso(usuario)
+    filas = _cargar_tickets(ids)
+
+    def motivo_rechazo(fila):
+        area_id = fila['area_asignada_id']
+        if not (usuario.is_superuser or acceso.es_del_area(area_id) or acceso.es_jefe_de(area_id)):
+            return 'No tienes permisos para derivar este ticket'
+        if fila['estado'] != Ticket.Estado.ABIERTO:
+            return 'Solo se pueden derivar tickets en estado ABIERTO'
+        if area_id == area_destino.id:
+            return 'El ticket ya está en el área de destino'
+        return None
+
+    validos, rechazados = _clasificar(ids, filas, motivo_rechazo)
+    if not validos:
+        return ResultadoAccionMasiva(rechazados=rechazados)
+
+    derivaciones = [
+        Derivacion(
+            ticket_id=fila['id'],
+            area_origen_id=fila['area_asignada_id'],
+            trabajador_origen=usuario,
+            area_destino=area_destino,
+            motivo_derivacion=motivo
+        )
+        for fila in validos
+    ]
+    _aplicar(
+        validos,
+        {'area_asignada_id': area_destino.id, 'trabajador_asignado_id': None},
+        derivaciones=derivaciones
+    )
+    outbox.registrar_varios(outbox.TICKET_DERIVADO, [
+        {'ticket_id': fila['id'], 'area_destino_id': area_destino.id, 'motivo': motivo} for fila in validos
+    ])
+    return ResultadoAccionMasiva([fila['id'] for fila in validos], rechazados)
+
+# -------------------------------------------------------------------
+# Cambio de estado
+# -------------------------------------------------------------------
+
+@transaction.atomic
+def cambiar_estado_tickets(usuario, ids, nuevo_estado, observacion=''):
+    """Cambia el estado de los tickets que admiten la transición (HU03)"""
+    acceso = contexto_acceso(usuario)
+    filas = _cargar_tickets(ids)
+
+    def motivo_rechazo(fila):
+        area_id = fila['area_asignada_id']
+        if not (
+            usuario.is_superuser
+            or fila['trabajador_asignado_id'] == usuario.id
+            or acceso.es_del_area(area_id)
+            or acceso.es_jefe_de(area_id)
+        ):
+            return 'No tienes permisos para cambiar el estado de este ticket'
+        if not CambioEstadoForm.transicion_valida(fila['estado'], nuevo_estado):
+            return f"No se puede cambiar de {Ticket.Estado(fila['estado']).label} a {Ticket.Estado(nuevo_estado).label}"
+        return None
+
+    validos, rechazados = _clasificar(ids, filas, motivo_rechazo)
+    if not validos:
+        return ResultadoAccionMasiva(rechazados=rechazados)
+
+    cambios = {'estado': nuevo_estado}
+    if nuevo_estado == Ticket.Estado.RESUELTO:
+        cambios['fecha_resolucion'] = timezone.now()
+    elif nuevo_estado == Ticket.Estado.CERRADO:
+        cambios['fecha_cierre'] = timezone.now()
+
+    observaciones = []
+    if observacion:
+        observaciones = [
+            Observacion(
+                ticket_asociado_id=fila['id'],
+                observacion_texto=f"Estado cambiado de {fila['estado']} a {nuevo_estado}. {observacion}",
+                autor_trabajador=usuario
+            )
+            for fila in validos
+        ]
+
+    _aplicar(validos, cambios, observaciones=observaciones)
+    outbox.registrar_varios(outbox.TICKET_ESTADO, [
+        {'ticket_id': fila['id'], 'estado_anterior': fila['estado'], 'estado_nuevo': nuevo_estado} for fila in validos
+    ])
+    return ResultadoAccionMasiva([fila['id'] for fila in validos], rechazados)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Area, Departamento, Perfil, Jefatura, Cliente, Ticket, Observacion, Derivacion, Grupo, HistorialUsuario
+from django.db import transaction
+from django.utils import timezone
+from .models import Area, Departamento, Perfil, Jefatura, Cliente, Ticket, ContadorTickets, Observacion, Derivacion, Grupo, HistorialUsuario, EventoOutbox
 
 # Registrar modelos del Sprint 1-3
 @admin.register(Area)
@@ -39,15 +41,39 @@ class TicketAdmin(admin.ModelAdmin):
     date_hierarchy = 'fecha_creacion'
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
 
+@admin.register(ContadorTickets)
+class ContadorTicketsAdmin(admin.ModelAdmin):
+    list_display = ['area', 'estado', 'nivel_critico', 'asignado', 'cantidad']
+    list_filter = ['area', 'estado', 'nivel_critico', 'asignado']
+    
+    def has_add_permission(self, request):
+        # Se mantiene automáticamente (usar recontar_contadores para reconstruir)
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class ConteoTicketAdmin(admin.ModelAdmin):
+    """Filas contadas en Ticket: el borrado masivo no pasa por delete() del modelo"""
+    campo_ticket = None
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            ticket_ids = set(queryset.values_list(self.campo_ticket, flat=True))
+            super().delete_queryset(request, queryset)
+            Ticket.objects.filter(pk__in=ticket_ids).recalcular_conteos()
+
 @admin.register(Observacion)
-class ObservacionAdmin(admin.ModelAdmin):
+class ObservacionAdmin(ConteoTicketAdmin):
+    campo_ticket = 'ticket_asociado'
     list_display = ['ticket_asociado', 'autor_trabajador', 'fecha_hora_observacion']
     list_filter = ['fecha_hora_observacion']
     search_fields = ['observacion_texto']
     date_hierarchy = 'fecha_hora_observacion'
 
 @admin.register(Derivacion)
-class DerivacionAdmin(admin.ModelAdmin):
+class DerivacionAdmin(ConteoTicketAdmin):
+    campo_ticket = 'ticket'
     list_display = ['ticket', 'area_origen', 'area_destino', 'trabajador_origen', 'fecha_derivacion']
     list_filter = ['area_origen', 'area_destino', 'fecha_derivacion']
     date_hierarchy = 'fecha_derivacion'
@@ -79,4 +105,17 @@ class HistorialUsuarioAdmin(admin.ModelAdmin):
     
     def has_delete_permission(self, request, obj=None):
         # No permitir eliminar registros de historial
-        return False
\ No newline at end of file
+        return False
+
+@admin.register(EventoOutbox)
+class EventoOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'estado', 'intentos', 'disponible_desde', 'fecha_creacion', 'fecha_procesado']
+    list_filter = ['estado', 'tipo']
+    readonly_fields = ['tipo', 'datos', 'intentos', 'ultimo_error', 'fecha_creacion', 'fecha_procesado']
+    actions = ['reintentar']
+    
+    @admin.action(description='Reintentar ahora')
+    def reintentar(self, request, queryset):
+        queryset.exclude(estado=EventoOutbox.Estado.ENVIADO).update(
+            estado=EventoOutbox.Estado.PENDIENTE, intentos=0, disponible_desde=timezone.now()
+        )
@@ -0,0 +1,62 @@
+import asyncio
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections, connections
+
+# ===================================================================
+# VISTAS ASYNC
+# Las consultas independientes de una vista (conteos, listas) se
+# ejecutan a la vez, cada una en un hilo con su propia conexión.
+# El ORM async de Django 4.2 (aget, acount, aaggregate...) corre todo
+# en un único hilo compartido, así que no sirve para paralelizar
+# ===================================================================
+
+# execute_wrappers activos en el request (métricas, perfilado)
+_envoltorios = ContextVar('envoltorios_sql', default=())
+
+@contextmanager
+def envolver_consultas(envoltorio):
+    """execute_wrapper sobre las conexiones del hilo actual y de los hilos de en_paralelo"""
+    token = _envoltorios.set((*_envoltorios.get(), envoltorio))
+    try:
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(envoltorio))
+            yield
+    finally:
+        _envoltorios.reset(token)
+
+def _ejecutar(consulta):
+    """Corre en un hilo del executor: instala los wrappers del request y, al terminar,
+    libera la conexión del hilo según CONN_MAX_AGE (o la devuelve al pool)"""
+    try:
+        with ExitStack() as pila:
+            for envoltorio in _envoltorios.get():
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(envoltorio))
+            return consulta()
+    finally:
+        close_old_connections()
+
+async def en_paralelo(consultas):
+    """Ejecuta a la vez las funciones sync de {clave: función} y devuelve {clave: resultado}.
+    Cada función debe traer sus datos completos (listas, no querysets perezosos)."""
+    claves = list(consultas)
+    resultados = await asyncio.gather(*(
+        sync_to_async(_ejecutar, thread_sensitive=False)(consultas[clave]) for clave in claves
+    ))
+    return dict(zip(claves, resultados))
+
+def login_requerido(view):
+    """login_required para vistas async (el de Django 4.2 no las admite)"""
+    @wraps(view)
+    async def envoltura(request, *args, **kwargs):
+        # request.user se carga desde la sesión: consulta la base, no puede hacerse en el event loop
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return envoltura
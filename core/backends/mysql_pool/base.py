@@ -0,0 +1,9 @@
+from django.db.backends.mysql import base as mysql
+
+from .pool import ConexionesEnPool
+
+class DatabaseWrapper(ConexionesEnPool, mysql.DatabaseWrapper):
+    """Backend de MySQL de Django con las conexiones en un pool por proceso (ver pool.py).
+
+    Usar con CONN_MAX_AGE = 0: la conexión se devuelve al pool al terminar cada request.
+    """
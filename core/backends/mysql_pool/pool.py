@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import DatabaseError
+
+# ===================================================================
+# POOL DE CONEXIONES
+# Cada alias de DATABASES con el backend core.backends.mysql_pool tiene
+# un pool por proceso: al terminar el request Django "cierra" la conexión
+# y esta vuelve al pool en lugar de cerrarse, así el siguiente request
+# (de cualquier hilo) no paga la conexión y autenticación con MySQL
+# ===================================================================
+
+OPCIONES_POR_DEFECTO = {
+    # Conexiones abiertas como máximo (en uso + libres)
+    'MAXIMO': 10,
+    # Segundos que un request espera una conexión libre antes de fallar
+    'ESPERA': 10,
+    # Una conexión libre por más de estos segundos se cierra en lugar de reutilizarse
+    'MAX_INACTIVA': 300,
+    # Segundos de vida de una conexión (None = sin límite)
+    'MAX_VIDA': 3600,
+    # Verificar la conexión (ping) antes de entregarla
+    'PRE_PING': True,
+}
+
+class PoolAgotado(DatabaseError):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+def _verificar(conexion):
+    """Ping sin reconexión (MySQLdb/PyMySQL); otros drivers, con una consulta mínima"""
+    if hasattr(conexion, 'ping'):
+        conexion.ping(False)
+        return
+    cursor = conexion.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+
+def _cerrar(conexion):
+    try:
+        conexion.close()
+    except Exception:
+        pass
+
+class PoolConexiones:
+    """Conexiones del driver reutilizables entre hilos, con máximo, reciclado y métricas"""
+
+    def __init__(self, alias, destino, opciones=None):
+        self.alias = alias
+        # Base de datos a la que apuntan las conexiones (NAME, HOST, PORT, USER)
+        self.destino = destino
+        self.opciones = {**OPCIONES_POR_DEFECTO, **(opciones or {})}
+        self.pid = os.getpid()
+        self._condicion = threading.Condition()
+        # Libres como (conexión, creada, devuelta); se entrega la devuelta más recientemente
+        # para que las que sobran queden inactivas y se reciclen
+        self._libres = deque()
+        self._creacion = {}
+        self.en_uso = 0
+        self.esperando = 0
+        self.creadas = 0
+        self.recicladas = 0
+        self.descartadas = 0
+        self.esperas_agotadas = 0
+
+    def _vencida(self, creada, devuelta, ahora):
+        max_vida = self.opciones['MAX_VIDA']
+        return (
+            ahora - devuelta > self.opciones['MAX_INACTIVA']
+            or (max_vida is not None and ahora - creada > max_vida)
+        )
+
+    def tomar(self, conectar):
+        """Devuelve (conexión, nueva). conectar() abre una conexión cuando no hay libres y
+        el pool no llegó a su máximo; si llegó, espera hasta ESPERA segundos."""
+        limite = time.monotonic() + self.opciones['ESPERA']
+        while True:
+            vencidas = []
+            conexion = None
+            with self._condicion:
+                while conexion is None:
+                    ahora = time.monotonic()
+                    while self._libres:
+                        candidata, creada, devuelta = self._libres.pop()
+                        if self._vencida(creada, devuelta, ahora):
+                            vencidas.append(candidata)
+                            self._creacion.pop(id(candidata), None)
+                            self.recicladas += 1
+                            continue
+                        conexion = candidata
+                        break
+                    if conexion is not None or self.en_uso < self.opciones['MAXIMO']:
+                        break
+                    restante = limite - ahora
+                    if restante <= 0:
+                        self.esperas_agotadas += 1
+                        raise PoolAgotado(
+                            f'Pool "{self.alias}" agotado: {self.en_uso} conexiones en uso '
+                            f'(máximo {self.opciones["MAXIMO"]})'
+                        )
+                    self.esperando += 1
+                    try:
+                        self._condicion.wait(restante)
+                    finally:
+                        self.esperando -= 1
+                self.en_uso += 1
+
+            for vencida in vencidas:
+                _cerrar(vencida)
+
+            if conexion is None:
+                try:
+                    conexion = conectar()
+                except BaseException:
+                    self._liberar_cupo()
+                    raise
+                with self._condicion:
+                    self.creadas += 1
+                    self._creacion[id(conexion)] = time.monotonic()
+                return conexion, True
+
+            if not self.opciones['PRE_PING']:
+                return conexion, False
+            try:
+                _verificar(conexion)
+                return conexion, False
+            except Exception:
+                # La conexión murió estando libre (timeout del servidor, reinicio): se descarta
+                # y se intenta con otra, o se abre una nueva
+                self.descartar(conexion)
+
+    def devolver(self, conexion):
+        with self._condicion:
+            self.en_uso -= 1
+            creada = self._creacion.get(id(conexion))
+            if creada is not None:
+                self._libres.append((conexion, creada, time.monotonic()))
+            self._condicion.notify()
+        if creada is None:
+            _cerrar(conexion)
+
+    def descartar(self, conexion):
+        """Cierra una conexión en uso que no debe volver al pool (errores, transacción abierta)"""
+        with self._condicion:
+            self._creacion.pop(id(conexion), None)
+            self.descartadas += 1
+        self._liberar_cupo()
+        _cerrar(conexion)
+
+    def _liberar_cupo(self):
+        with self._condicion:
+            self.en_uso -= 1
+            self._condicion.notify()
+
+    def cerrar_libres(self):
+        with self._condicion:
+            libres = [conexion for conexion, _, _ in self._libres]
+            self._libres.clear()
+            for conexion in libres:
+                self._creacion.pop(id(conexion), None)
+        for conexion in libres:
+            _cerrar(conexion)
+
+    def estado(self):
+        with self._condicion:
+            return {
+                'maximo': self.opciones['MAXIMO'],
+                'en_uso': self.en_uso,
+                'libres': len(self._libres),
+                'esperando': self.esperando,
+                'creadas': self.creadas,
+                'recicladas': self.recicladas,
+                'descartadas': self.descartadas,
+                'esperas_agotadas': self.esperas_agotadas,
+            }
+
+_POOLS = {}
+_lock = threading.Lock()
+
+def _vigente(pool, destino):
+    return pool is not None and pool.pid == os.getpid() and pool.destino == destino
+
+def obtener_pool(alias, destino, opciones=None):
+    """Pool del alias en este proceso. Se crea uno nuevo después de un fork (los sockets heredados
+    no se comparten con el proceso padre) o si cambia la base de datos del alias (tests)"""
+    pool = _POOLS.get(alias)
+    if _vigente(pool, destino):
+        return pool
+    with _lock:
+        anterior = _POOLS.get(alias)
+        if _vigente(anterior, destino):
+            return anterior
+        pool = _POOLS[alias] = PoolConexiones(alias, destino, opciones)
+    if anterior is not None and anterior.pid == os.getpid():
+        anterior.cerrar_libres()
+    return pool
+
+def estado_pools():
+    """{alias: estado} de los pools de este proceso, para /metrics y /health/"""
+    return {alias: pool.estado() for alias, pool in sorted(_POOLS.items()) if pool.pid == os.getpid()}
+
+class ConexionesEnPool:
+    """Mixin para el DatabaseWrapper de un backend de Django: get_new_connection toma la
+    conexión del pool y _close la devuelve. La configuración va en DATABASES[alias]['POOL']."""
+
+    def get_new_connection(self, conn_params):
+        ajustes = self.settings_dict
+        destino = (ajustes['NAME'], ajustes['HOST'], ajustes['PORT'], ajustes['USER'])
+        pool = obtener_pool(self.alias, destino, ajustes.get('POOL'))
+        padre = super(ConexionesEnPool, self)
+        conexion, nueva = pool.tomar(lambda: padre.get_new_connection(conn_params))
+        # La conexión vuelve al pool del que salió aunque el alias haya cambiado de pool
+        self._pool_conexion = pool
+        self._conexion_reutilizada = not nueva
+        return conexion
+
+    def init_connection_state(self):
+        # El estado de la sesión (SQL_AUTO_IS_NULL, aislamiento, init_command) se conserva en la
+        # conexión: solo se configura al abrirla
+        if not getattr(self, '_conexion_reutilizada', False):
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self._pool_conexion
+        # Dentro de un bloque atómico Django conserva la referencia a la conexión, y tras un error
+        # su estado es dudoso: en ambos casos se cierra en lugar de devolverla
+        if self.in_atomic_block or self.errors_occurred:
+            pool.descartar(self.connection)
+            return
+        if not self.autocommit:
+            try:
+                self.connection.rollback()
+            except Exception:
+                pool.descartar(self.connection)
+                return
+        pool.devolver(self.connection)
@@ -0,0 +1,181 @@
+import math
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import routers
+from .models import Jefatura, Ticket
+
+# ===================================================================
+# BENCHMARK DE VISTAS
+# Escenarios (vista + usuario + filtros) compartidos por el comando
+# benchmark_vistas y los tests de presupuesto de consultas
+# ===================================================================
+
+# Máximo de consultas SQL por escenario: si una vista lo supera, volvió un N+1
+# (con el cache vacío: incluye armar el catálogo de áreas y trabajadores, 2 consultas)
+PRESUPUESTO_CONSULTAS = {
+    'dashboard (trabajador)': 9,
+    'dashboard (jefe)': 11,
+    'dashboard (admin)': 6,
+    'dashboard jefatura': 9,
+    'lista (trabajador)': 9,
+    'lista (admin)': 8,
+    'lista: búsqueda': 9,
+    'lista: fecha desde': 8,
+    'lista: fecha hasta': 8,
+    'lista: estado': 8,
+    'lista: nivel crítico': 8,
+    'lista: tipo de problema': 8,
+    'lista: área': 9,
+    'lista: trabajador asignado': 9,
+    'lista: cliente': 8,
+    'lista: orden por prioridad': 8,
+    'ver ticket': 7,
+    'crear ticket': 9,
+    'tickets sin asignar': 6,
+    'lista de usuarios': 8,
+    'lista de grupos': 9,
+}
+
+@dataclass(frozen=True)
+class Escenario:
+    nombre: str
+    usuario: User
+    url: str
+    parametros: Dict[str, str] = field(default_factory=dict)
+
+@dataclass(frozen=True)
+class UsuariosBenchmark:
+    """Un usuario por rol: los permisos cambian las consultas de cada vista"""
+    admin: User
+    jefe: User
+    trabajador: User
+
+def usuarios_benchmark():
+    """Primer superusuario, primer jefe con jefatura activa y primer trabajador con tickets asignados.
+    None si la base no tiene los tres roles."""
+    admin = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+    jefatura = Jefatura.objects.filter(
+        fecha_fin_jefatura__isnull=True, trabajador_jefe__is_active=True
+    ).select_related('trabajador_jefe').order_by('id').first()
+    asignado = Ticket.objects.filter(
+        trabajador_asignado__is_active=True,
+        trabajador_asignado__is_superuser=False,
+        trabajador_asignado__perfil__isnull=False,
+    ).exclude(
+        trabajador_asignado__in=Jefatura.objects.filter(fecha_fin_jefatura__isnull=True).values('trabajador_jefe')
+    ).values_list('trabajador_asignado_id', flat=True).order_by('trabajador_asignado_id').first()
+
+    if not (admin and jefatura and asignado):
+        return None
+    return UsuariosBenchmark(admin=admin, jefe=jefatura.trabajador_jefe, trabajador=User.objects.get(pk=asignado))
+
+def escenarios(usuarios: UsuariosBenchmark) -> List[Escenario]:
+    """Vistas críticas con cada filtro de la lista; los valores se toman de los datos existentes"""
+    admin, jefe, trabajador = usuarios.admin, usuarios.jefe, usuarios.trabajador
+    area_id = trabajador.perfil.area_id
+    # El ticket con más observaciones es el peor caso del detalle
+    ticket_id = Ticket.objects.order_by('-observaciones_count', 'id').values_list('id', flat=True).first()
+    hace_un_mes = (timezone.localdate() - timedelta(days=30)).isoformat()
+    lista = reverse('lista_tickets')
+
+    resultado = [
+        Escenario('dashboard (trabajador)', trabajador, reverse('dashboard')),
+        Escenario('dashboard (jefe)', jefe, reverse('dashboard')),
+        Escenario('dashboard (admin)', admin, reverse('dashboard')),
+        Escenario('dashboard jefatura', jefe, reverse('dashboard_jefatura')),
+        Escenario('lista (trabajador)', trabajador, lista),
+        Escenario('lista (admin)', admin, lista),
+        Escenario('lista: búsqueda', admin, lista, {'busqueda': 'impresora'}),
+        Escenario('lista: fecha desde', admin, lista, {'fecha_desde': hace_un_mes}),
+        Escenario('lista: fecha hasta', admin, lista, {'fecha_hasta': hace_un_mes}),
+        Escenario('lista: estado', admin, lista, {'estado': Ticket.Estado.ABIERTO}),
+        Escenario('lista: nivel crítico', admin, lista, {'nivel_critico': Ticket.NivelCritico.CRITICO}),
+        Escenario('lista: tipo de problema', admin, lista, {'tipo_problema': 'Red'}),
+        Escenario('lista: área', admin, lista, {'area_asignada': str(area_id)}),
+        Escenario('lista: trabajador asignado', admin, lista, {'trabajador_asignado': str(trabajador.id)}),
+        Escenario('lista: cliente', admin, lista, {'cliente': 'gonz'}),
+        Escenario('lista: orden por prioridad', admin, lista, {'orden': '-prioridad'}),
+        Escenario('crear ticket', trabajador, reverse('crear_ticket')),
+        Escenario('tickets sin asignar', jefe, reverse('tickets_sin_asignar')),
+        Escenario('lista de usuarios', admin, reverse('lista_usuarios')),
+        Escenario('lista de grupos', admin, reverse('lista_grupos')),
+    ]
+    if ticket_id:
+        resultado.insert(-4, Escenario('ver ticket', admin, reverse('ver_ticket', args=[ticket_id])))
+    return resultado
+
+# -------------------------------------------------------------------
+# Medición
+# -------------------------------------------------------------------
+
+def _percentil(valores, porcentaje):
+    """Percentil por rango más cercano (valores ordenados)"""
+    indice = max(0, math.ceil(porcentaje / 100 * len(valores)) - 1)
+    return valores[indice]
+
+def contar_consultas(cliente, escenario: Escenario):
+    """Código de estado y consultas SQL de una ejecución del escenario.
+    Se cuenta con el cache vacío (el peor caso) para que el resultado no dependa del orden."""
+    cliente.force_login(escenario.usuario)
+    cache.clear()
+    # Con DEBUG el registro de consultas tiene un máximo: si está lleno, la captura no ve las nuevas
+    reset_queries()
+    # Primaria y réplicas: las vistas de solo lectura consultan una réplica
+    with ExitStack() as pila:
+        capturas = [
+            pila.enter_context(CaptureQueriesContext(connections[alias]))
+            for alias in (DEFAULT_DB_ALIAS, *routers.replicas())
+        ]
+        respuesta = cliente.get(escenario.url, escenario.parametros)
+    return respuesta.status_code, sum(len(captura) for captura in capturas)
+
+def medir(cliente, escenario: Escenario, repeticiones=20, calentamiento=2):
+    """Latencias en milisegundos (p50/p90/p99) y consultas por request del escenario"""
+    estado, consultas = contar_consultas(cliente, escenario)
+    for _ in range(calentamiento):
+        cliente.get(escenario.url, escenario.parametros)
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cliente.get(escenario.url, escenario.parametros)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+
+    return {
+        'estado': estado,
+        'consultas': consultas,
+        'p50_ms': round(_percentil(tiempos, 50), 2),
+        'p90_ms': round(_percentil(tiempos, 90), 2),
+        'p99_ms': round(_percentil(tiempos, 99), 2),
+        'max_ms': round(tiempos[-1], 2),
+    }
+
+def comparar(reporte, base, tolerancia=0.5, minimo_ms=5.0, latencias=True) -> List[str]:
+    """Regresiones del reporte respecto de la línea base: más consultas, o una mediana que la supera
+    en más de la tolerancia (se ignoran diferencias menores a minimo_ms, que son ruido).
+    Con latencias=False solo se comparan las consultas (línea base de otro motor)"""
+    regresiones = []
+    for nombre, actual in reporte['escenarios'].items():
+        anterior: Optional[dict] = base.get('escenarios', {}).get(nombre)
+        if anterior is None:
+            continue
+        if actual['consultas'] > anterior['consultas']:
+            regresiones.append(f'{nombre}: {actual["consultas"]} consultas (base {anterior["consultas"]})')
+        if not latencias:
+            continue
+        limite = anterior['p50_ms'] * (1 + tolerancia)
+        if actual['p50_ms'] > limite and actual['p50_ms'] - anterior['p50_ms'] > minimo_ms:
+            regresiones.append(f'{nombre}: p50 {actual["p50_ms"]} ms (base {anterior["p50_ms"]} ms)')
+    return regresiones
@@ -0,0 +1,65 @@
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+# ===================================================================
+# BÚSQUEDA DE TEXTO COMPLETO
+# MySQL usa índices FULLTEXT; el resto de los motores usa el índice
+# invertido TerminoBusqueda, construido con las funciones de este módulo
+# ===================================================================
+
+# Peso de cada término según el campo donde aparece
+PESO_TITULO = 3
+PESO_DESCRIPCION = 1
+PESO_OBSERVACION = 1
+
+LARGO_MINIMO_TERMINO = 2
+LARGO_MAXIMO_TERMINO = 50
+
+PALABRAS_VACIAS = {
+    'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los', 'no',
+    'para', 'por', 'que', 'se', 'su', 'un', 'una', 'y',
+}
+
+# Índices FULLTEXT creados en MySQL: (tabla, nombre del índice, columnas)
+INDICES_FULLTEXT = [
+    ('core_ticket', 'ticket_busqueda_ft', ['titulo', 'descripcion_problema']),
+    ('core_observacion', 'observacion_busqueda_ft', ['observacion_texto']),
+]
+
+def usa_fulltext(using='default'):
+    """Indica si la base de datos resuelve la búsqueda con índices FULLTEXT"""
+    return connections[using].vendor == 'mysql'
+
+def limite_resultados():
+    """Máximo de tickets candidatos que devuelve una búsqueda, ordenados por relevancia"""
+    return getattr(settings, 'BUSQUEDA_LIMITE_RESULTADOS', 1000)
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para que 'Impresión' e 'impresion' coincidan"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+def tokenizar(texto):
+    return [
+        termino[:LARGO_MAXIMO_TERMINO]
+        for termino in re.findall(r'\w+', normalizar(texto))
+        if len(termino) >= LARGO_MINIMO_TERMINO and termino not in PALABRAS_VACIAS
+    ]
+
+def terminos_ponderados(*textos_con_peso):
+    """Suma el peso de cada término en los textos recibidos como pares (texto, peso)"""
+    pesos = Counter()
+    for texto, peso in textos_con_peso:
+        for termino in tokenizar(texto):
+            pesos[termino] += peso
+    return pesos
+
+def sql_crear_indice(tabla, nombre, columnas):
+    return f'ALTER TABLE {tabla} ADD FULLTEXT INDEX {nombre} ({", ".join(columnas)})'
+
+def sql_eliminar_indice(tabla, nombre):
+    return f'ALTER TABLE {tabla} DROP INDEX {nombre}'
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .routers import usar_primaria
+
+# ===================================================================
+# CACHE DEL CONTADOR DE TICKETS SIN ASIGNAR POR ÁREA
+# Se invalida al confirmar cualquier transacción que mueva un ticket
+# dentro o fuera de la cola sin asignar del área
+# ===================================================================
+
+def _clave_sin_asignar(area_id):
+    return f'tickets_sin_asignar:area:{area_id}'
+
+def obtener_sin_asignar(area_id, calcular):
+    """Devuelve el contador cacheado del área, calculándolo con `calcular()` si no existe"""
+    clave = _clave_sin_asignar(area_id)
+    cantidad = cache.get(clave)
+    if cantidad is None:
+        # Desde la primaria: una réplica atrasada dejaría en cache un contador ya invalidado
+        with usar_primaria():
+            cantidad = calcular()
+        cache.set(clave, cantidad, getattr(settings, 'TICKETS_SIN_ASIGNAR_CACHE_TIMEOUT', 60))
+    return cantidad
+
+def invalidar_sin_asignar(area_ids):
+    """Elimina los contadores cacheados de las áreas una vez confirmada la transacción"""
+    claves = [_clave_sin_asignar(area_id) for area_id in set(area_ids)]
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(claves))
@@ -0,0 +1,121 @@
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Area
+from .routers import usar_primaria
+
+# ===================================================================
+# CATÁLOGOS DE OPCIONES (ÁREAS Y TRABAJADORES)
+# Las listas de los selects cambian pocas veces al mes y se leen en
+# cada request: se arman una vez por versión, se guardan en el cache
+# compartido y cada proceso conserva su copia mientras la versión no
+# cambie. Las señales de Area, User, Perfil y Jefatura publican una
+# versión nueva al confirmarse la transacción
+# ===================================================================
+
+CLAVE_VERSION = 'catalogos:version'
+
+@dataclass(frozen=True)
+class AreaCatalogo:
+    id: int
+    nombre: str
+    miembros: int
+
+@dataclass(frozen=True)
+class TrabajadorCatalogo:
+    """Usuario activo; nombre es el nombre completo o, si no tiene, el username"""
+    id: int
+    nombre: str
+    area_id: Optional[int]
+
+@dataclass(frozen=True)
+class Catalogo:
+    areas: Tuple[AreaCatalogo, ...]
+    trabajadores: Tuple[TrabajadorCatalogo, ...]
+
+# Copia del proceso: (versión, catálogo)
+_local = None
+
+def _clave_datos(version):
+    return f'catalogos:datos:{version}'
+
+def _version():
+    """Versión vigente en el cache compartido; si no existe (cache vacío o reiniciado) se crea una"""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+def _construir():
+    """Dos consultas: áreas con su cantidad de miembros y usuarios activos con su área"""
+    areas = tuple(
+        AreaCatalogo(id=area['id'], nombre=area['nombre'], miembros=area['total_miembros'])
+        for area in Area.objects.annotate(total_miembros=Count('miembros')).order_by('nombre').values(
+            'id', 'nombre', 'total_miembros'
+        )
+    )
+    trabajadores = tuple(
+        TrabajadorCatalogo(
+            id=usuario['id'],
+            nombre=f"{usuario['first_name']} {usuario['last_name']}".strip() or usuario['username'],
+            area_id=usuario['perfil__area_id'],
+        )
+        for usuario in User.objects.filter(is_active=True).order_by('first_name', 'last_name', 'username').values(
+            'id', 'username', 'first_name', 'last_name', 'perfil__area_id'
+        )
+    )
+    return Catalogo(areas=areas, trabajadores=trabajadores)
+
+def obtener():
+    """Catálogo de la versión vigente: copia del proceso, cache compartido o base de datos"""
+    global _local
+    version = _version()
+    local = _local
+    if local is not None and local[0] == version:
+        return local[1]
+
+    catalogo = cache.get(_clave_datos(version))
+    if catalogo is None:
+        # Una réplica atrasada dejaría en cache la versión anterior del catálogo
+        with usar_primaria():
+            catalogo = _construir()
+        cache.set(_clave_datos(version), catalogo, getattr(settings, 'CATALOGOS_CACHE_TIMEOUT', 3600))
+    _local = (version, catalogo)
+    return catalogo
+
+def invalidar():
+    """Publica una versión nueva al confirmarse la transacción: todos los procesos rearman su copia"""
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION, uuid.uuid4().hex, None))
+
+# -------------------------------------------------------------------
+# Consultas sobre el catálogo
+# -------------------------------------------------------------------
+
+def areas(excluir=None):
+    return [area for area in obtener().areas if area.id != excluir]
+
+def trabajadores(area_id=None, con_area=False):
+    """Usuarios activos; con area_id, solo los de esa área; con con_area, solo los que tienen área"""
+    resultado = obtener().trabajadores
+    if area_id is not None:
+        return [trabajador for trabajador in resultado if trabajador.area_id == area_id]
+    if con_area:
+        return [trabajador for trabajador in resultado if trabajador.area_id is not None]
+    return list(resultado)
+
+def opciones_areas(excluir=None):
+    return [(area.id, area.nombre) for area in areas(excluir)]
+
+def opciones_areas_con_miembros():
+    return [(area.id, f'{area.nombre} ({area.miembros} miembros)') for area in areas()]
+
+def opciones_trabajadores(area_id=None, con_area=False):
+    return [(trabajador.id, trabajador.nombre) for trabajador in trabajadores(area_id, con_area)]
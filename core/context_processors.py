@@ -1,10 +1,19 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from .models import ContadorTickets
+
 def tickets_sin_asignar_count(request):
-    """Context processor para mostrar contador de tickets sin asignar en navegación"""
-    if request.user.is_authenticated and hasattr(request.user, 'perfil') and request.user.perfil.area:
-        count = Ticket.objects.filter(
-            area_asignada=request.user.perfil.area,
-            trabajador_asignado__isnull=True,
-            estado__in=[Ticket.Estado.ABIERTO, Ticket.Estado.EN_PROCESO]
-        ).count()
-        return {'tickets_sin_asignar_count': count}
-    return {'tickets_sin_asignar_count': 0}
\ No newline at end of file
+    """Context processor para mostrar contador de tickets sin asignar en navegación.
+    
+    Se evalúa de forma diferida: solo las plantillas que muestran el contador
+    consultan la cache (y la base de datos si la entrada del área no existe).
+    """
+    def contar():
+        area_id = request.acceso.area_id
+        return ContadorTickets.sin_asignar(area_id) if area_id else 0
+    
+    return {'tickets_sin_asignar_count': SimpleLazyObject(contar)}
+
+def eventos_cola(request):
+    """Si las páginas deben escuchar los cambios de la cola sin asignar (ver core/eventos.py)"""
+    return {'eventos_cola': settings.EVENTOS_COLA}
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Exists, OuterRef, Q, QuerySet, Sum
+
+from .models import Ticket, Jefatura, ContadorTickets
+
+# ===================================================================
+# SERVICIO DE ESTADÍSTICAS DE TICKETS
+# Cada función resuelve sus conteos en una sola consulta agregada
+# ===================================================================
+
+@dataclass(frozen=True)
+class ResumenTickets:
+    """Conteos de un conjunto de tickets por estado, criticidad y asignación"""
+    total: int = 0
+    abiertos: int = 0
+    en_proceso: int = 0
+    resueltos: int = 0
+    criticos: int = 0
+    altos: int = 0
+    asignados: int = 0
+    sin_asignar: int = 0
+    sin_asignar_activos: int = 0
+
+@dataclass(frozen=True)
+class CargaTrabajador:
+    """Tickets asignados a un trabajador"""
+    usuario_id: int
+    nombre: str
+    asignados: int
+    activos: int
+    en_proceso: int
+    es_jefe: bool
+
+@dataclass(frozen=True)
+class EstadisticasArea:
+    """Resumen de tickets del área junto con la carga de sus trabajadores"""
+    resumen: ResumenTickets
+    carga_trabajo: List[CargaTrabajador]
+
+    @property
+    def trabajadores_activos(self) -> int:
+        """Trabajadores (sin rol de jefatura) considerados en la carga"""
+        return sum(1 for carga in self.carga_trabajo if not carga.es_jefe)
+
+def resumen_tickets(tickets: Optional[QuerySet] = None) -> ResumenTickets:
+    """Calcula todos los conteos de ResumenTickets en una única consulta"""
+    if tickets is None:
+        tickets = Ticket.objects.all()
+
+    sin_trabajador = Q(trabajador_asignado__isnull=True)
+    conteos = tickets.aggregate(
+        total=Count('id'),
+        abiertos=Count('id', filter=Q(estado=Ticket.Estado.ABIERTO)),
+        en_proceso=Count('id', filter=Q(estado=Ticket.Estado.EN_PROCESO)),
+        resueltos=Count('id', filter=Q(estado=Ticket.Estado.RESUELTO)),
+        criticos=Count('id', filter=Q(nivel_critico=Ticket.NivelCritico.CRITICO)),
+        altos=Count('id', filter=Q(nivel_critico=Ticket.NivelCritico.ALTO)),
+        asignados=Count('id', filter=~sin_trabajador),
+        sin_asignar=Count('id', filter=sin_trabajador),
+        sin_asignar_activos=Count('id', filter=sin_trabajador & Q(estado__in=Ticket.ESTADOS_ACTIVOS)),
+    )
+    return ResumenTickets(**conteos)
+
+def resumen_contadores(area=None) -> ResumenTickets:
+    """Mismos conteos que resumen_tickets() leídos desde ContadorTickets,
+    cuyo tamaño no crece con el historial de tickets"""
+    contadores = ContadorTickets.objects.all()
+    if area is not None:
+        contadores = contadores.filter(area=area)
+
+    sin_trabajador = Q(asignado=False)
+    conteos = contadores.aggregate(
+        total=Sum('cantidad'),
+        abiertos=Sum('cantidad', filter=Q(estado=Ticket.Estado.ABIERTO)),
+        en_proceso=Sum('cantidad', filter=Q(estado=Ticket.Estado.EN_PROCESO)),
+        resueltos=Sum('cantidad', filter=Q(estado=Ticket.Estado.RESUELTO)),
+        criticos=Sum('cantidad', filter=Q(nivel_critico=Ticket.NivelCritico.CRITICO)),
+        altos=Sum('cantidad', filter=Q(nivel_critico=Ticket.NivelCritico.ALTO)),
+        asignados=Sum('cantidad', filter=~sin_trabajador),
+        sin_asignar=Sum('cantidad', filter=sin_trabajador),
+        sin_asignar_activos=Sum('cantidad', filter=sin_trabajador & Q(estado__in=Ticket.ESTADOS_ACTIVOS)),
+    )
+    return ResumenTickets(**{campo: valor or 0 for campo, valor in conteos.items()})
+
+def carga_trabajo(area, solo_activos=True) -> List[CargaTrabajador]:
+    """Carga de todos los trabajadores del área en una única consulta agrupada,
+    ordenada de mayor a menor cantidad de tickets activos"""
+    trabajadores = User.objects.filter(perfil__area=area)
+    if solo_activos:
+        trabajadores = trabajadores.filter(is_active=True)
+
+    trabajadores = trabajadores.annotate(
+        asignados=Count('tickets_asignados'),
+        activos=Count(
+            'tickets_asignados',
+            filter=Q(tickets_asignados__estado__in=Ticket.ESTADOS_ACTIVOS)
+        ),
+        en_proceso=Count(
+            'tickets_asignados',
+            filter=Q(tickets_asignados__estado=Ticket.Estado.EN_PROCESO)
+        ),
+        es_jefe=Exists(Jefatura.objects.filter(trabajador_jefe=OuterRef('pk'))),
+    ).order_by('-activos', 'first_name', 'last_name', 'username')
+
+    return [
+        CargaTrabajador(
+            usuario_id=trabajador.id,
+            nombre=trabajador.get_full_name() or trabajador.username,
+            asignados=trabajador.asignados,
+            activos=trabajador.activos,
+            en_proceso=trabajador.en_proceso,
+            es_jefe=trabajador.es_jefe,
+        )
+        for trabajador in trabajadores
+    ]
+
+def estadisticas_area(area, solo_activos=True) -> EstadisticasArea:
+    """Resumen y carga de trabajo de un área (dos consultas en total)"""
+    return EstadisticasArea(
+        resumen=resumen_contadores(area),
+        carga_trabajo=carga_trabajo(area, solo_activos=solo_activos),
+    )
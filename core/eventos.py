@@ -0,0 +1,255 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# ===================================================================
+# EVENTOS DE LA COLA SIN ASIGNAR (SERVER-SENT EVENTS)
+# Cada cambio confirmado en la cola de un área (ticket nuevo, asignado,
+# derivado, cambio de estado) se publica en un broker y eventos_cola_view
+# lo envía a los navegadores suscritos (EventSource), que actualizan los
+# contadores sin recargar la página. El broker por defecto vive en el
+# proceso; con varios procesos, BrokerRedis reparte los eventos entre
+# todos. Solo bajo un servidor ASGI (settings.EVENTOS_COLA)
+# ===================================================================
+
+# Tipos de cambio en la cola de un área
+NUEVO = 'nuevo'
+ASIGNADO = 'asignado'
+LIBERADO = 'liberado'
+DERIVADO = 'derivado'
+ESTADO = 'estado'
+ELIMINADO = 'eliminado'
+# Cambio sin detalle (acciones masivas, importaciones) o de otro campo del contador
+ACTUALIZADO = 'actualizado'
+# Primer evento de cada conexión: el total vigente, por si hubo cambios mientras estaba cerrada
+INICIAL = 'inicial'
+
+def tipo_cambio(clave_anterior, clave_nueva):
+    """Tipo de cambio de un ticket según sus claves de ContadorTickets (área, estado, nivel, asignado)"""
+    if clave_anterior is None:
+        return NUEVO
+    if clave_nueva is None:
+        return ELIMINADO
+    if clave_anterior[0] != clave_nueva[0]:
+        return DERIVADO
+    if clave_anterior[3] != clave_nueva[3]:
+        return ASIGNADO if clave_nueva[3] else LIBERADO
+    if clave_anterior[1] != clave_nueva[1]:
+        return ESTADO
+    return ACTUALIZADO
+
+# -------------------------------------------------------------------
+# Brokers
+# -------------------------------------------------------------------
+
+class Suscripcion:
+    """Eventos de un conjunto de áreas para una conexión; se usa desde el event loop"""
+
+    def __init__(self, broker, area_ids, maximo):
+        self.broker = broker
+        self.area_ids = frozenset(area_ids)
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=maximo)
+
+    async def siguiente(self, espera):
+        """Próximo evento, o None si no llega ninguno en `espera` segundos"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), espera)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.broker._retirar(self)
+
+class BrokerMemoria:
+    """Reparte los eventos entre las suscripciones del proceso. publicar() puede llamarse desde
+    cualquier hilo: el evento se entrega en el event loop de cada suscripción."""
+
+    # Eventos pendientes por conexión; si un cliente no los consume, los nuevos se descartan
+    # (cada evento trae el total de la cola, así que el siguiente lo pone al día)
+    MAXIMO_PENDIENTES = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscripciones = defaultdict(set)
+        self.publicados = 0
+        self.descartados = 0
+        self.errores = 0
+
+    def suscribir(self, area_ids):
+        suscripcion = Suscripcion(self, area_ids, self.MAXIMO_PENDIENTES)
+        with self._lock:
+            for area_id in suscripcion.area_ids:
+                self._suscripciones[area_id].add(suscripcion)
+        return suscripcion
+
+    def _retirar(self, suscripcion):
+        with self._lock:
+            for area_id in suscripcion.area_ids:
+                suscripciones = self._suscripciones.get(area_id)
+                if suscripciones is not None:
+                    suscripciones.discard(suscripcion)
+                    if not suscripciones:
+                        del self._suscripciones[area_id]
+
+    def hay_suscriptores(self, area_id):
+        """Si nadie escucha el área no se calcula ni publica el evento"""
+        return area_id in self._suscripciones
+
+    def publicar(self, evento):
+        self._entregar_local(evento)
+
+    def _entregar_local(self, evento):
+        with self._lock:
+            self.publicados += 1
+            suscripciones = list(self._suscripciones.get(evento['area'], ()))
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.loop.call_soon_threadsafe(self._encolar, suscripcion, evento)
+            except RuntimeError:
+                # Event loop cerrado: la conexión terminó sin retirar la suscripción
+                self._retirar(suscripcion)
+
+    def _encolar(self, suscripcion, evento):
+        try:
+            suscripcion.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            with self._lock:
+                self.descartados += 1
+
+    def registrar_error(self):
+        with self._lock:
+            self.errores += 1
+
+    def estado(self):
+        with self._lock:
+            return {
+                'suscriptores': len({s for suscripciones in self._suscripciones.values() for s in suscripciones}),
+                'publicados': self.publicados,
+                'descartados': self.descartados,
+                'errores': self.errores,
+            }
+
+class BrokerRedis(BrokerMemoria):
+    """Publica en un canal de Redis (EVENTOS_REDIS_URL); un hilo por proceso escucha el canal y
+    entrega los eventos, de cualquier proceso, a las suscripciones locales."""
+
+    CANAL = 'tda:eventos:cola'
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured('BrokerRedis necesita el paquete redis (pip install redis)') from exc
+        self._redis = redis.Redis.from_url(settings.EVENTOS_REDIS_URL)
+        self._oyente = None
+
+    def suscribir(self, area_ids):
+        self._iniciar_oyente()
+        return super().suscribir(area_ids)
+
+    def hay_suscriptores(self, area_id):
+        # Los suscriptores pueden estar en otro proceso
+        return True
+
+    def publicar(self, evento):
+        self._redis.publish(self.CANAL, json.dumps(evento))
+
+    def _iniciar_oyente(self):
+        with self._lock:
+            if self._oyente is not None and self._oyente.is_alive():
+                return
+            self._oyente = threading.Thread(target=self._escuchar, name='eventos-redis', daemon=True)
+            self._oyente.start()
+
+    def _escuchar(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CANAL)
+                for mensaje in pubsub.listen():
+                    self._entregar_local(json.loads(mensaje['data']))
+            except Exception:
+                # Redis reiniciado o inaccesible: reintentar; los clientes se ponen al día con el
+                # evento inicial de su próxima conexión
+                self.registrar_error()
+                time.sleep(1)
+
+_broker = None
+_lock_broker = threading.Lock()
+
+def obtener_broker():
+    """Broker del proceso, de la clase settings.EVENTOS_BROKER"""
+    global _broker
+    if _broker is None:
+        with _lock_broker:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'EVENTOS_BROKER', 'core.eventos.BrokerMemoria'))()
+    return _broker
+
+def estado_broker():
+    """Estado del broker para /metrics (vacío si el proceso no lo ha usado)"""
+    return _broker.estado() if _broker is not None else {}
+
+# -------------------------------------------------------------------
+# Publicación
+# -------------------------------------------------------------------
+
+def publicar_cola(area_ids, tipo, ticket_id, contar):
+    """Publica un evento por cada área cuya cola cambió, una vez confirmada la transacción.
+    contar(area_id) devuelve el total sin asignar del área (ContadorTickets.sin_asignar)."""
+    area_ids = set(area_ids)
+    if area_ids and getattr(settings, 'EVENTOS_COLA', False):
+        transaction.on_commit(lambda: _publicar(area_ids, tipo, ticket_id, contar))
+
+def _publicar(area_ids, tipo, ticket_id, contar):
+    broker = obtener_broker()
+    for area_id in sorted(area_ids):
+        if not broker.hay_suscriptores(area_id):
+            continue
+        try:
+            broker.publicar({'area': area_id, 'tipo': tipo, 'ticket': ticket_id, 'sin_asignar': contar(area_id)})
+        except Exception:
+            # La escritura ya está confirmada: un broker caído no debe convertirla en un error
+            broker.registrar_error()
+
+# -------------------------------------------------------------------
+# Server-Sent Events
+# -------------------------------------------------------------------
+
+def _mensaje(evento):
+    return f'event: cola\ndata: {json.dumps(evento)}\n\n'
+
+async def flujo_sse(area_ids, contar):
+    """Contenido de la respuesta text/event-stream de las áreas.
+
+    Termina después de EVENTOS_DURACION_MAXIMA_SEGUNDOS y el navegador se reconecta solo: Django 4.2
+    no avisa a la vista cuando el cliente se desconecta, así que este es el límite de una conexión
+    abandonada. Los comentarios periódicos mantienen abierta la conexión a través de proxies.
+    """
+    suscripcion = obtener_broker().suscribir(area_ids)
+    try:
+        yield f'retry: {getattr(settings, "EVENTOS_REINTENTO_MS", 5000)}\n\n'
+        for area_id in sorted(area_ids):
+            total = await sync_to_async(contar)(area_id)
+            yield _mensaje({'area': area_id, 'tipo': INICIAL, 'ticket': None, 'sin_asignar': total})
+
+        keepalive = getattr(settings, 'EVENTOS_KEEPALIVE_SEGUNDOS', 15)
+        fin = time.monotonic() + getattr(settings, 'EVENTOS_DURACION_MAXIMA_SEGUNDOS', 300)
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                return
+            evento = await suscripcion.siguiente(min(keepalive, restante))
+            yield ': keepalive\n\n' if evento is None else _mensaje(evento)
+    finally:
+        suscripcion.cerrar()
@@ -0,0 +1,217 @@
+import csv
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import Ticket
+from .paginacion import PaginadorCursor
+
+# ===================================================================
+# EXPORTACIÓN DE TICKETS EN STREAMING (CSV / XLSX)
+# Las filas se leen por lotes con una proyección de valores y se
+# escriben a medida que llegan: memoria constante y primer byte inmediato
+# ===================================================================
+
+FORMATO_CSV = 'csv'
+FORMATO_XLSX = 'xlsx'
+
+TIPOS_CONTENIDO = {
+    FORMATO_CSV: 'text/csv; charset=utf-8',
+    FORMATO_XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+TAMANO_LOTE = 2000
+
+# (campo de la proyección, encabezado)
+COLUMNAS = [
+    ('id', 'ID'),
+    ('titulo', 'Título'),
+    ('estado', 'Estado'),
+    ('nivel_critico', 'Nivel crítico'),
+    ('tipo_problema', 'Tipo de problema'),
+    ('area_asignada__nombre', 'Área'),
+    ('cliente_solicitante__nombre', 'Cliente'),
+    ('cliente_solicitante__correo_electronico', 'Correo cliente'),
+    ('trabajador_asignado__username', 'Asignado a'),
+    ('trabajador_creador__username', 'Creado por'),
+    ('fecha_creacion', 'Fecha de creación'),
+    ('fecha_resolucion', 'Fecha de resolución'),
+    ('fecha_cierre', 'Fecha de cierre'),
+    ('observaciones_count', 'Observaciones'),
+    ('derivaciones_count', 'Derivaciones'),
+]
+
+ETIQUETAS = {
+    'estado': dict(Ticket.Estado.choices),
+    'nivel_critico': dict(Ticket.NivelCritico.choices),
+}
+
+def _valor(campo, valor):
+    if valor is None:
+        return ''
+    if campo in ETIQUETAS:
+        return ETIQUETAS[campo].get(valor, valor)
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M')
+    return valor
+
+def filas_tickets(tickets, orden, tamano_lote=TAMANO_LOTE):
+    """Genera las filas de la exportación en el orden de la lista.
+
+    Con cursores de servidor (PostgreSQL) o lectura por bloques (SQLite) se usa iterator();
+    el cliente de MySQL carga el resultado completo, así que ahí se recorre por lotes keyset."""
+    campos = [campo for campo, _ in COLUMNAS]
+    if connections[tickets.db].vendor == 'mysql':
+        paginador = PaginadorCursor(tickets, orden)
+        nombres_orden = [nombre for nombre, _ in paginador.campos]
+        paginador.queryset = tickets.values(*campos, *[nombre for nombre in nombres_orden if nombre not in campos])
+        filas = paginador.recorrer(tamano_lote)
+    else:
+        filas = tickets.order_by(*orden, '-pk' if orden[-1].startswith('-') else 'pk').values(*campos).iterator(
+            chunk_size=tamano_lote
+        )
+
+    for fila in filas:
+        yield [_valor(campo, fila[campo]) for campo in campos]
+
+# -------------------------------------------------------------------
+# CSV
+# -------------------------------------------------------------------
+
+# Inicios de celda que Excel/LibreOffice interpretan como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+def _celda_csv(valor):
+    """Antepone ' al texto que la planilla evaluaría como fórmula al abrir el CSV (inyección de
+    fórmulas). En XLSX no hace falta: las celdas de texto (inlineStr) no se evalúan"""
+    if isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+class _Eco:
+    """Pseudo-archivo que devuelve lo escrito, para generar el CSV línea a línea"""
+    def write(self, valor):
+        return valor
+
+def csv_streaming(filas):
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel reconozca UTF-8
+    yield '\ufeff' + escritor.writerow([encabezado for _, encabezado in COLUMNAS])
+    for fila in filas:
+        yield escritor.writerow([_celda_csv(valor) for valor in fila])
+
+# -------------------------------------------------------------------
+# XLSX (SpreadsheetML mínimo, escrito con zipfile en modo streaming)
+# -------------------------------------------------------------------
+
+XLSX_ARCHIVOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Tickets" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+XLSX_HOJA_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_HOJA_FIN = '</sheetData></worksheet>'
+
+# Caracteres de control que XML 1.0 no admite
+_CONTROL_INVALIDO = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Filas escritas entre cada envío al cliente
+FILAS_POR_ENVIO = 500
+
+def _columna(indice):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def _fila_xml(numero, valores):
+    celdas = []
+    for indice, valor in enumerate(valores):
+        referencia = f'{_columna(indice)}{numero}'
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            celdas.append(f'<c r="{referencia}"><v>{valor}</v></c>')
+        elif valor != '':
+            texto = escape(_CONTROL_INVALIDO.sub('', str(valor)))
+            celdas.append(f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>')
+    return f'<row r="{numero}">{"".join(celdas)}</row>'
+
+class _Salida:
+    """Destino sin seek para zipfile: acumula lo escrito hasta el próximo envío"""
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+def xlsx_streaming(filas):
+    salida = _Salida()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+        for nombre, contenido in XLSX_ARCHIVOS.items():
+            archivo.writestr(nombre, contenido)
+        yield salida.vaciar()
+
+        with archivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            hoja.write(XLSX_HOJA_INICIO.encode())
+            hoja.write(_fila_xml(1, [encabezado for _, encabezado in COLUMNAS]).encode())
+            for numero, fila in enumerate(filas, start=2):
+                hoja.write(_fila_xml(numero, fila).encode())
+                if numero % FILAS_POR_ENVIO == 0:
+                    yield salida.vaciar()
+            hoja.write(XLSX_HOJA_FIN.encode())
+    yield salida.vaciar()
+
+def contenido_streaming(formato, filas):
+    if formato == FORMATO_XLSX:
+        return xlsx_streaming(filas)
+    return csv_streaming(filas)
@@ -1,8 +1,46 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
+from django.forms.models import ModelChoiceIterator
 from .models import Ticket, Cliente, Area, Derivacion, Observacion, Perfil, Jefatura, Grupo, HistorialUsuario
 from django.contrib.auth.models import User
 from django.utils import timezone
+from .importacion import formato_de_archivo
+from . import catalogos
+from .acceso import invalidar_contexto
+
+class CatalogoIterator(ModelChoiceIterator):
+    """Recorre las opciones del catálogo cacheado (core.catalogos) en lugar del queryset"""
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from self.field.opciones()
+    
+    def __len__(self):
+        return len(self.field.opciones()) + (self.field.empty_label is not None)
+    
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.opciones())
+
+class _OpcionesCatalogo:
+    """Mostrar el campo no consulta la base; el valor enviado se valida contra el queryset"""
+    iterator = CatalogoIterator
+    
+    def __init__(self, *args, opciones, **kwargs):
+        # opciones: callable que devuelve [(id, etiqueta), ...] desde el catálogo
+        self.opciones = opciones
+        super().__init__(*args, **kwargs)
+
+class CatalogoChoiceField(_OpcionesCatalogo, forms.ModelChoiceField):
+    pass
+
+class CatalogoMultipleChoiceField(_OpcionesCatalogo, forms.ModelMultipleChoiceField):
+    pass
+
+def _restringir_areas(campo, area_ids):
+    """Limita un campo de áreas del catálogo a area_ids, en las opciones y en la validación"""
+    permitidas = set(area_ids)
+    campo.queryset = campo.queryset.filter(id__in=permitidas)
+    campo.opciones = lambda: [opcion for opcion in catalogos.opciones_areas() if opcion[0] in permitidas]
 
 class CustomLoginForm(AuthenticationForm):
     """Formulario de login personalizado"""
@@ -39,13 +77,21 @@ class ClienteForm(forms.ModelForm):
 
 class TicketForm(forms.ModelForm):
     """Formulario para crear tickets"""
-    # Campo para buscar cliente existente
+    # Cliente existente: el ID lo completa el buscador (autocompletado por nombre o correo),
+    # así la página no carga todos los clientes; al enviar se valida con una consulta por ID
     cliente_existente = forms.ModelChoiceField(
         queryset=Cliente.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        widget=forms.HiddenInput(),
         label='Cliente existente',
-        empty_label='-- Seleccionar cliente existente --'
+        error_messages={'invalid_choice': 'El cliente seleccionado no existe.'}
+    )
+    
+    area_asignada = CatalogoChoiceField(
+        queryset=Area.objects.all(),
+        opciones=catalogos.opciones_areas,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Área asignada'
     )
     
     # Campos para nuevo cliente
@@ -77,14 +123,12 @@ class TicketForm(forms.ModelForm):
             }),
             'nivel_critico': forms.Select(attrs={'class': 'form-control'}),
             'tipo_problema': forms.TextInput(attrs={'class': 'form-control'}),
-            'area_asignada': forms.Select(attrs={'class': 'form-control'}),
         }
         labels = {
             'titulo': 'Título del ticket',
             'descripcion_problema': 'Descripción del problema',
             'nivel_critico': 'Nivel de criticidad',
-            'tipo_problema': 'Tipo de problema',
-            'area_asignada': 'Área asignada'
+            'tipo_problema': 'Tipo de problema'
         }
     
     def clean(self):
@@ -100,16 +144,28 @@ class TicketForm(forms.ModelForm):
             )
         
         return cleaned_data
+    
+    def cliente_seleccionado(self):
+        """Cliente elegido en un envío con errores, para volver a mostrarlo en el buscador"""
+        if not self.is_bound:
+            return None
+        return getattr(self, 'cleaned_data', {}).get('cliente_existente')
 
 # SPRINT 2 - NUEVOS FORMULARIOS
 
 class DerivacionForm(forms.ModelForm):
     """Formulario para derivar tickets entre áreas (HU02)"""
+    area_destino = CatalogoChoiceField(
+        queryset=Area.objects.all(),
+        opciones=catalogos.opciones_areas,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Derivar a área'
+    )
+    
     class Meta:
         model = Derivacion
         fields = ['area_destino', 'motivo_derivacion']
         widgets = {
-            'area_destino': forms.Select(attrs={'class': 'form-control'}),
             'motivo_derivacion': forms.Textarea(attrs={
                 'class': 'form-control',
                 'rows': 3,
@@ -117,7 +173,6 @@ class DerivacionForm(forms.ModelForm):
             }),
         }
         labels = {
-            'area_destino': 'Derivar a área',
             'motivo_derivacion': 'Motivo de derivación'
         }
     
@@ -128,9 +183,9 @@ class DerivacionForm(forms.ModelForm):
         
         if self.ticket:
             # Excluir el área actual del ticket
-            self.fields['area_destino'].queryset = Area.objects.exclude(
-                id=self.ticket.area_asignada.id
-            )
+            area_actual = self.ticket.area_asignada_id
+            self.fields['area_destino'].queryset = Area.objects.exclude(id=area_actual)
+            self.fields['area_destino'].opciones = lambda: catalogos.opciones_areas(excluir=area_actual)
     
     def clean(self):
         cleaned_data = super().clean()
@@ -186,6 +241,17 @@ class CambioEstadoForm(forms.Form):
         (Ticket.Estado.CERRADO, 'Cerrado'),
     ]
     
+    # Estados a los que se puede pasar desde cada estado actual
+    TRANSICIONES = {
+        Ticket.Estado.ABIERTO: [Ticket.Estado.EN_PROCESO, Ticket.Estado.NO_APLICA],
+        Ticket.Estado.EN_PROCESO: [Ticket.Estado.RESUELTO, Ticket.Estado.NO_APLICA],
+        Ticket.Estado.RESUELTO: [Ticket.Estado.CERRADO],
+    }
+    
+    # Estados finales: exigen una observación
+    ESTADOS_CON_OBSERVACION = [Ticket.Estado.RESUELTO, Ticket.Estado.NO_APLICA, Ticket.Estado.CERRADO]
+    LARGO_MINIMO_OBSERVACION = 10
+    
     nuevo_estado = forms.ChoiceField(
         choices=ESTADOS_PERMITIDOS,
         widget=forms.Select(attrs={'class': 'form-control'}),
@@ -214,18 +280,20 @@ class CambioEstadoForm(forms.Form):
                 if estado in estados_validos
             ]
     
+    @classmethod
+    def transicion_valida(cls, estado_actual, nuevo_estado):
+        return nuevo_estado in cls.TRANSICIONES.get(estado_actual, [])
+    
+    @classmethod
+    def observacion_faltante(cls, nuevo_estado, observacion):
+        """Indica si el nuevo estado exige una observación que no se entregó"""
+        return nuevo_estado in cls.ESTADOS_CON_OBSERVACION and (
+            not observacion or len(observacion.strip()) < cls.LARGO_MINIMO_OBSERVACION
+        )
+    
     def _get_estados_validos(self):
         """Determina qué estados son válidos según el estado actual"""
-        estado_actual = self.ticket.estado
-        
-        if estado_actual == Ticket.Estado.ABIERTO:
-            return [Ticket.Estado.EN_PROCESO, Ticket.Estado.NO_APLICA]
-        elif estado_actual == Ticket.Estado.EN_PROCESO:
-            return [Ticket.Estado.RESUELTO, Ticket.Estado.NO_APLICA]
-        elif estado_actual == Ticket.Estado.RESUELTO:
-            return [Ticket.Estado.CERRADO]
-        else:
-            return []
+        return self.TRANSICIONES.get(self.ticket.estado, [])
     
     def clean(self):
         cleaned_data = super().clean()
@@ -241,11 +309,117 @@ class CambioEstadoForm(forms.Form):
                 )
         
         # Observación obligatoria para estados finales
-        if nuevo_estado in [Ticket.Estado.RESUELTO, Ticket.Estado.NO_APLICA, Ticket.Estado.CERRADO]:
-            if not observacion or len(observacion.strip()) < 10:
-                raise forms.ValidationError({
-                    'observacion': 'La observación es obligatoria para estados finales (mínimo 10 caracteres)'
-                })
+        if self.observacion_faltante(nuevo_estado, observacion):
+            raise forms.ValidationError({
+                'observacion': 'La observación es obligatoria para estados finales (mínimo 10 caracteres)'
+            })
+        
+        return cleaned_data
+
+class ListaIdsField(forms.Field):
+    """IDs enviados como varios valores del mismo parámetro (checkboxes), sin repetidos"""
+    widget = forms.MultipleHiddenInput
+    
+    def __init__(self, *args, max_ids=None, **kwargs):
+        self.max_ids = max_ids
+        super().__init__(*args, **kwargs)
+    
+    def to_python(self, value):
+        if not value:
+            return []
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        try:
+            ids = [int(valor) for valor in value]
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Identificadores inválidos')
+        return list(dict.fromkeys(ids))
+    
+    def validate(self, value):
+        super().validate(value)
+        if self.max_ids and len(value) > self.max_ids:
+            raise forms.ValidationError(f'Se pueden procesar como máximo {self.max_ids} tickets por acción')
+
+class AccionMasivaForm(forms.Form):
+    """Formulario para asignar, derivar o cambiar el estado de varios tickets a la vez"""
+    ASIGNAR = 'asignar'
+    DERIVAR = 'derivar'
+    CAMBIAR_ESTADO = 'cambiar_estado'
+    
+    ACCIONES = [
+        (ASIGNAR, 'Asignar a trabajador'),
+        (DERIVAR, 'Derivar a otra área'),
+        (CAMBIAR_ESTADO, 'Cambiar estado'),
+    ]
+    
+    MAX_TICKETS = 500
+    
+    tickets = ListaIdsField(max_ids=MAX_TICKETS, label='Tickets')
+    
+    accion = forms.ChoiceField(
+        choices=ACCIONES,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Acción'
+    )
+    
+    trabajador_asignado = CatalogoChoiceField(
+        queryset=User.objects.filter(is_active=True, perfil__area__isnull=False),
+        opciones=lambda: catalogos.opciones_trabajadores(con_area=True),
+        required=False,
+        empty_label='-- Sin asignar --',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Asignar a'
+    )
+    
+    area_destino = CatalogoChoiceField(
+        queryset=Area.objects.all(),
+        opciones=catalogos.opciones_areas,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Derivar a área'
+    )
+    
+    motivo_derivacion = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Motivo de la derivación...'
+        }),
+        label='Motivo de derivación'
+    )
+    
+    nuevo_estado = forms.ChoiceField(
+        choices=CambioEstadoForm.ESTADOS_PERMITIDOS,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Nuevo estado'
+    )
+    
+    observacion = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Observación sobre el cambio de estado...'
+        }),
+        label='Observación'
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        accion = cleaned_data.get('accion')
+        
+        if accion == self.DERIVAR:
+            if not cleaned_data.get('area_destino'):
+                self.add_error('area_destino', 'Seleccione el área de destino')
+            if not (cleaned_data.get('motivo_derivacion') or '').strip():
+                self.add_error('motivo_derivacion', 'El motivo de la derivación es obligatorio')
+        
+        elif accion == self.CAMBIAR_ESTADO:
+            nuevo_estado = cleaned_data.get('nuevo_estado')
+            if not nuevo_estado:
+                self.add_error('nuevo_estado', 'Seleccione el nuevo estado')
+            elif CambioEstadoForm.observacion_faltante(nuevo_estado, cleaned_data.get('observacion')):
+                self.add_error('observacion', 'La observación es obligatoria para estados finales (mínimo 10 caracteres)')
         
         return cleaned_data
 
@@ -258,7 +432,7 @@ class FiltroTicketsForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Buscar por ID, título o descripción...'
+            'placeholder': 'Buscar por ID, título, descripción u observaciones...'
         }),
         label='Búsqueda'
     )
@@ -308,18 +482,20 @@ class FiltroTicketsForm(forms.Form):
     )
     
     # Área
-    area_asignada = forms.ModelChoiceField(
+    area_asignada = CatalogoChoiceField(
         required=False,
         queryset=Area.objects.all(),
+        opciones=catalogos.opciones_areas,
         empty_label='Todas las áreas',
         widget=forms.Select(attrs={'class': 'form-control'}),
         label='Área'
     )
     
     # Trabajador asignado
-    trabajador_asignado = forms.ModelChoiceField(
+    trabajador_asignado = CatalogoChoiceField(
         required=False,
         queryset=User.objects.filter(is_active=True),
+        opciones=catalogos.opciones_trabajadores,
         empty_label='Todos los trabajadores',
         widget=forms.Select(attrs={'class': 'form-control'}),
         label='Asignado a'
@@ -339,24 +515,19 @@ class FiltroTicketsForm(forms.Form):
     orden = forms.ChoiceField(
         required=False,
         choices=[
+            ('', 'Relevancia (al buscar) / Más recientes'),
             ('-fecha_creacion', 'Más recientes primero'),
             ('fecha_creacion', 'Más antiguos primero'),
-            ('-nivel_critico', 'Mayor criticidad primero'),
-            ('nivel_critico', 'Menor criticidad primero'),
+            ('-prioridad', 'Mayor criticidad primero'),
+            ('prioridad', 'Menor criticidad primero'),
             ('titulo', 'Título (A-Z)'),
             ('-titulo', 'Título (Z-A)'),
             ('-fecha_actualizacion', 'Última actualización'),
         ],
-        initial='-fecha_creacion',
         widget=forms.Select(attrs={'class': 'form-control'}),
         label='Ordenar por'
     )
     
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Personalizar queryset de trabajadores para mostrar nombre completo
-        self.fields['trabajador_asignado'].label_from_instance = lambda obj: obj.get_full_name() or obj.username
-    
     def clean(self):
         cleaned_data = super().clean()
         fecha_desde = cleaned_data.get('fecha_desde')
@@ -379,8 +550,9 @@ class UsuarioCreacionForm(forms.ModelForm):
         label='Confirmar contraseña',
         widget=forms.PasswordInput(attrs={'class': 'form-control'})
     )
-    area = forms.ModelChoiceField(
+    area = CatalogoChoiceField(
         queryset=Area.objects.all(),
+        opciones=catalogos.opciones_areas,
         required=False,
         widget=forms.Select(attrs={'class': 'form-control'}),
         label='Área asignada',
@@ -414,6 +586,12 @@ class UsuarioCreacionForm(forms.ModelForm):
             'is_staff': 'Permite acceso al panel de administración Django'
         }
     
+    def __init__(self, *args, areas_permitidas=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Jefes: solo pueden asignar sus áreas
+        if areas_permitidas is not None:
+            _restringir_areas(self.fields['area'], areas_permitidas)
+    
     def clean_password2(self):
         password1 = self.cleaned_data.get("password1")
         password2 = self.cleaned_data.get("password2")
@@ -467,8 +645,9 @@ class UsuarioCreacionForm(forms.ModelForm):
 
 class UsuarioEdicionForm(forms.ModelForm):
     """Formulario para editar usuarios existentes (HU07)"""
-    area = forms.ModelChoiceField(
+    area = CatalogoChoiceField(
         queryset=Area.objects.all(),
+        opciones=catalogos.opciones_areas,
         required=False,
         widget=forms.Select(attrs={'class': 'form-control'}),
         label='Área asignada'
@@ -512,8 +691,12 @@ class UsuarioEdicionForm(forms.ModelForm):
             'is_staff': 'Acceso al panel administrativo'
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, areas_permitidas=None, **kwargs):
         super().__init__(*args, **kwargs)
+        # Jefes: solo pueden asignar sus áreas
+        if areas_permitidas is not None:
+            _restringir_areas(self.fields['area'], areas_permitidas)
+        
         if self.instance.pk:
             # Obtener área actual del perfil
             try:
@@ -576,6 +759,9 @@ class UsuarioEdicionForm(forms.ModelForm):
             elif not es_jefe and jefaturas_activas.exists():
                 # Finalizar jefaturas activas
                 jefaturas_activas.update(fecha_fin_jefatura=timezone.now().date())
+                # update() no envía post_save: invalidar a mano lo que invalidan las señales de Jefatura
+                invalidar_contexto([user.pk])
+                catalogos.invalidar()
 
             # AÑADIR: Registrar cambios en historial
             if commit and self.instance.pk:
@@ -610,8 +796,10 @@ class UsuarioEdicionForm(forms.ModelForm):
 
 class GrupoForm(forms.ModelForm):
     """Formulario para crear/editar grupos (HU08)"""
-    areas = forms.ModelMultipleChoiceField(
+    # Cada área con su cantidad de miembros, tomada del catálogo
+    areas = CatalogoMultipleChoiceField(
         queryset=Area.objects.all(),
+        opciones=catalogos.opciones_areas_con_miembros,
         required=False,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
         label='Áreas del grupo',
@@ -651,11 +839,6 @@ class GrupoForm(forms.ModelForm):
             raise forms.ValidationError('Ya existe un grupo con este nombre')
         
         return nombre
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Personalizar la representación de las áreas
-        self.fields['areas'].label_from_instance = lambda obj: f"{obj.nombre} ({obj.miembros.count()} miembros)"
 
 class DesactivacionUsuarioForm(forms.Form):
     """Formulario para desactivar usuarios con motivo (HU10)"""
@@ -686,8 +869,9 @@ class DesactivacionUsuarioForm(forms.Form):
 
 class AsignacionTicketForm(forms.Form):
     """Formulario para asignar tickets a trabajadores"""
-    trabajador_asignado = forms.ModelChoiceField(
+    trabajador_asignado = CatalogoChoiceField(
         queryset=User.objects.none(),
+        opciones=list,
         required=False,
         empty_label='-- Sin asignar --',
         widget=forms.Select(attrs={'class': 'form-control'}),
@@ -703,9 +887,31 @@ class AsignacionTicketForm(forms.Form):
             self.fields['trabajador_asignado'].queryset = User.objects.filter(
                 perfil__area=area,
                 is_active=True
-            ).order_by('first_name', 'last_name', 'username')
-            
-            # Personalizar etiquetas
-            self.fields['trabajador_asignado'].label_from_instance = (
-                lambda obj: obj.get_full_name() or obj.username
-            )
\ No newline at end of file
+            )
+            self.fields['trabajador_asignado'].opciones = (
+                lambda: catalogos.opciones_trabajadores(area_id=area.pk)
+            )
+
+class ImportacionTicketsForm(forms.Form):
+    """Formulario para subir un archivo CSV o JSONL de tickets"""
+    archivo = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson'}),
+        label='Archivo'
+    )
+    
+    formato = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Según la extensión'), ('csv', 'CSV'), ('jsonl', 'JSONL (un objeto JSON por línea)')],
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Formato'
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        archivo = cleaned_data.get('archivo')
+        if archivo and not cleaned_data.get('formato'):
+            formato = formato_de_archivo(archivo.name)
+            if not formato:
+                raise forms.ValidationError('No se reconoce el formato del archivo: elija CSV o JSONL')
+            cleaned_data['formato'] = formato
+        return cleaned_data
@@ -0,0 +1,272 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from . import busqueda
+from .models import Area, Cliente, ContadorTickets, Ticket, TerminoBusqueda
+
+# ===================================================================
+# IMPORTACIÓN MASIVA DE TICKETS
+# Lee CSV o JSONL fila a fila y crea los tickets por lotes: memoria
+# constante sin importar el tamaño del archivo
+# ===================================================================
+
+FORMATO_CSV = 'csv'
+FORMATO_JSONL = 'jsonl'
+FORMATOS = [FORMATO_CSV, FORMATO_JSONL]
+
+LOTE_POR_DEFECTO = 1000
+
+# Errores de fila que se conservan en el resultado (el resto solo se cuenta)
+MAX_ERRORES_REPORTADOS = 100
+
+COLUMNAS_OBLIGATORIAS = [
+    'titulo', 'descripcion_problema', 'nivel_critico', 'tipo_problema', 'area',
+    'cliente_nombre', 'cliente_email',
+]
+COLUMNAS_OPCIONALES = ['estado', 'cliente_telefono']
+
+@dataclass
+class ResultadoImportacion:
+    """Avance de una importación; se actualiza al terminar cada lote"""
+    filas: int = 0
+    tickets_creados: int = 0
+    clientes_creados: int = 0
+    clientes_actualizados: int = 0
+    filas_con_error: int = 0
+    errores: List[Tuple[int, str]] = field(default_factory=list)
+    # (línea, mensaje) del error que detuvo la importación; los lotes anteriores ya quedaron guardados
+    interrupcion: Optional[Tuple[int, str]] = None
+
+    def registrar_error(self, linea, mensaje):
+        self.filas_con_error += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append((linea, mensaje))
+
+# -------------------------------------------------------------------
+# Lectura de archivos
+# -------------------------------------------------------------------
+
+def formato_de_archivo(nombre):
+    """Deduce el formato por la extensión del archivo (None si no se reconoce)"""
+    extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if extension == 'csv':
+        return FORMATO_CSV
+    if extension in ('jsonl', 'ndjson'):
+        return FORMATO_JSONL
+    return None
+
+def abrir_texto(archivo_binario, encoding='utf-8-sig'):
+    """Envuelve un archivo binario (p. ej. un UploadedFile) para leerlo como texto por líneas"""
+    return io.TextIOWrapper(archivo_binario, encoding=encoding, newline='')
+
+def leer_filas(archivo_texto, formato) -> Iterator[Tuple[int, dict]]:
+    """Genera (número de línea, fila) sin cargar el archivo completo"""
+    if formato == FORMATO_CSV:
+        lector = csv.DictReader(archivo_texto)
+        faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in (lector.fieldnames or [])]
+        if faltantes:
+            raise ValueError(f'Faltan columnas en el CSV: {", ".join(faltantes)}')
+        for fila in lector:
+            yield lector.line_num, fila
+        return
+
+    for numero, linea in enumerate(archivo_texto, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except json.JSONDecodeError as error:
+            fila = {'_error': f'JSON inválido: {error.msg}'}
+        if not isinstance(fila, dict):
+            fila = {'_error': 'Cada línea debe ser un objeto JSON'}
+        yield numero, fila
+
+# -------------------------------------------------------------------
+# Validación de filas
+# -------------------------------------------------------------------
+
+def _mapa_opciones(choices):
+    """Acepta tanto el valor ('CRITICO') como la etiqueta ('Crítico') de cada opción"""
+    mapa = {}
+    for valor, etiqueta in choices:
+        mapa[busqueda.normalizar(valor)] = valor
+        mapa[busqueda.normalizar(etiqueta)] = valor
+    return mapa
+
+NIVELES = _mapa_opciones(Ticket.NivelCritico.choices)
+ESTADOS = _mapa_opciones(Ticket.Estado.choices)
+
+def mapa_areas():
+    """Áreas por nombre normalizado, cargadas una sola vez por importación"""
+    return {busqueda.normalizar(nombre).strip(): area_id for area_id, nombre in Area.objects.values_list('id', 'nombre')}
+
+def _texto(fila, columna, largo_maximo=None):
+    valor = fila.get(columna)
+    valor = '' if valor is None else str(valor).strip()
+    if largo_maximo and len(valor) > largo_maximo:
+        raise ValueError(f'"{columna}" supera los {largo_maximo} caracteres')
+    return valor
+
+def validar_fila(fila, areas) -> dict:
+    """Convierte una fila del archivo en los datos del ticket y su cliente; ValueError si no es válida"""
+    if '_error' in fila:
+        raise ValueError(fila['_error'])
+
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if not _texto(fila, columna)]
+    if faltantes:
+        raise ValueError(f'Faltan valores: {", ".join(faltantes)}')
+
+    area_id = areas.get(busqueda.normalizar(_texto(fila, 'area')))
+    if area_id is None:
+        raise ValueError(f'Área desconocida: {_texto(fila, "area")}')
+
+    nivel_critico = NIVELES.get(busqueda.normalizar(_texto(fila, 'nivel_critico')))
+    if nivel_critico is None:
+        raise ValueError(f'Nivel crítico inválido: {_texto(fila, "nivel_critico")}')
+
+    estado = Ticket.Estado.ABIERTO
+    if _texto(fila, 'estado'):
+        estado = ESTADOS.get(busqueda.normalizar(_texto(fila, 'estado')))
+        if estado is None:
+            raise ValueError(f'Estado inválido: {_texto(fila, "estado")}')
+
+    correo = _texto(fila, 'cliente_email', 255)
+    try:
+        validate_email(correo)
+    except ValidationError:
+        raise ValueError(f'Correo inválido: {correo}')
+
+    return {
+        'titulo': _texto(fila, 'titulo', 200),
+        'descripcion_problema': _texto(fila, 'descripcion_problema'),
+        'nivel_critico': nivel_critico,
+        'tipo_problema': _texto(fila, 'tipo_problema', 100),
+        'estado': estado,
+        'area_asignada_id': area_id,
+        'cliente': {
+            'correo_electronico': correo,
+            'nombre': _texto(fila, 'cliente_nombre', 100),
+            'telefono': _texto(fila, 'cliente_telefono', 25) or None,
+        },
+    }
+
+# -------------------------------------------------------------------
+# Escritura por lotes
+# -------------------------------------------------------------------
+
+def upsert_clientes(clientes: Iterable[dict]) -> Tuple[Dict[str, int], int]:
+    """Crea o actualiza los clientes por correo_electronico en un INSERT ... ON CONFLICT/ON DUPLICATE KEY.
+    Devuelve {correo: id} y la cantidad de clientes nuevos."""
+    # Un mismo correo solo puede aparecer una vez por sentencia: gana la última fila del lote
+    por_correo = {cliente['correo_electronico']: cliente for cliente in clientes}
+    existentes = set(
+        Cliente.objects.filter(correo_electronico__in=por_correo).values_list('correo_electronico', flat=True)
+    )
+
+    # Solo se actualiza el nombre: un teléfono vacío en el archivo no borra el registrado
+    opciones = {'update_conflicts': True, 'update_fields': ['nombre']}
+    if connection.features.supports_update_conflicts_with_target:
+        # MySQL no admite indicar la columna: usa cualquier clave única en conflicto
+        opciones['unique_fields'] = ['correo_electronico']
+    Cliente.objects.bulk_create([Cliente(**cliente) for cliente in por_correo.values()], **opciones)
+
+    # MySQL no devuelve los IDs de un upsert: se leen por correo en una consulta
+    ids = dict(
+        Cliente.objects.filter(correo_electronico__in=por_correo).values_list('correo_electronico', 'id')
+    )
+    return ids, len(por_correo) - len(existentes)
+
+@transaction.atomic
+def crear_lote(datos: List[dict], creador) -> Tuple[int, int]:
+    """Crea los tickets del lote con sus clientes, contadores e índice de búsqueda"""
+    clientes, nuevos = upsert_clientes(fila['cliente'] for fila in datos)
+
+    # Igual que un cambio de estado: los tickets resueltos o cerrados llevan su fecha
+    ahora = timezone.now()
+    tickets = [
+        Ticket(
+            titulo=fila['titulo'],
+            descripcion_problema=fila['descripcion_problema'],
+            nivel_critico=fila['nivel_critico'],
+            prioridad=Ticket.PRIORIDADES[fila['nivel_critico']],
+            tipo_problema=fila['tipo_problema'],
+            estado=fila['estado'],
+            fecha_resolucion=ahora if fila['estado'] in (Ticket.Estado.RESUELTO, Ticket.Estado.CERRADO) else None,
+            fecha_cierre=ahora if fila['estado'] == Ticket.Estado.CERRADO else None,
+            area_asignada_id=fila['area_asignada_id'],
+            cliente_solicitante_id=clientes[fila['cliente']['correo_electronico']],
+            trabajador_creador=creador,
+        )
+        for fila in datos
+    ]
+    Ticket.objects.bulk_create(tickets)
+
+    # bulk_create no pasa por Ticket.save(): contador e índice se actualizan aquí
+    deltas = {}
+    for ticket in tickets:
+        clave = ticket.clave_contador()
+        deltas[clave] = deltas.get(clave, 0) + 1
+    ContadorTickets.aplicar(deltas)
+    # En MySQL bulk_create no devuelve los IDs, pero ahí la búsqueda usa FULLTEXT y no se indexa
+    TerminoBusqueda.indexar_tickets(tickets)
+
+    return len(tickets), nuevos
+
+def importar_tickets(
+    filas: Iterable[Tuple[int, dict]],
+    creador,
+    lote: int = LOTE_POR_DEFECTO,
+    al_avanzar: Optional[Callable[[ResultadoImportacion], None]] = None,
+) -> ResultadoImportacion:
+    """Valida e importa las filas por lotes; cada lote es una transacción independiente.
+    Las filas inválidas se omiten y quedan registradas en el resultado. Un error de lectura del
+    archivo o al guardar un lote detiene la importación y queda en resultado.interrupcion."""
+    resultado = ResultadoImportacion()
+    areas = mapa_areas()
+    filas = iter(filas)
+    ultima_linea = 0
+
+    while resultado.interrupcion is None:
+        bloque = []
+        try:
+            for linea, fila in islice(filas, lote):
+                bloque.append((linea, fila))
+                ultima_linea = linea
+        except (ValueError, UnicodeDecodeError, csv.Error) as error:
+            # Se importan las filas leídas antes del error
+            resultado.interrupcion = (ultima_linea + 1, str(error))
+        if not bloque:
+            break
+
+        datos = []
+        for linea, fila in bloque:
+            try:
+                datos.append(validar_fila(fila, areas))
+            except ValueError as error:
+                resultado.registrar_error(linea, str(error))
+
+        if datos:
+            try:
+                creados, nuevos = crear_lote(datos, creador)
+            except DatabaseError as error:
+                primera = bloque[0][0]
+                resultado.interrupcion = (primera, f'No se pudo guardar el lote de las líneas {primera} a {ultima_linea}: {error}')
+                break
+            resultado.tickets_creados += creados
+            resultado.clientes_creados += nuevos
+            resultado.clientes_actualizados += len({fila['cliente']['correo_electronico'] for fila in datos}) - nuevos
+
+        resultado.filas += len(bloque)
+        if al_avanzar:
+            al_avanzar(resultado)
+
+    return resultado
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from core import benchmark, views
+from core.acceso import contexto_acceso
+from core.benchmark import _percentil
+
+# (nombre, atributo de UsuariosBenchmark, url, vista sync, vista async)
+ESCENARIOS = [
+    ('dashboard (trabajador)', 'trabajador', 'dashboard', views.dashboard_view, views.dashboard_async_view),
+    ('dashboard (jefe)', 'jefe', 'dashboard', views.dashboard_view, views.dashboard_async_view),
+    ('dashboard jefatura', 'jefe', 'dashboard_jefatura', views.dashboard_jefatura_view, views.dashboard_jefatura_async_view),
+]
+
+class Command(BaseCommand):
+    help = (
+        'Compara latencia (p50/p90/p99) y throughput de los dashboards sync y async con requests '
+        'concurrentes, como los atiende un servidor ASGI'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solicitudes', type=int, default=100, help='Requests medidos por escenario y modo (por defecto, 100)')
+        parser.add_argument('--concurrencia', type=int, default=8, help='Requests simultáneos (por defecto, 8)')
+        parser.add_argument('--salida', help='Guarda el resultado en un archivo JSON')
+
+    def handle(self, *args, **options):
+        if min(options['solicitudes'], options['concurrencia']) < 1:
+            raise CommandError('--solicitudes y --concurrencia deben ser mayores que 0')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('Con una base SQLite en memoria cada hilo ve otra base: use un archivo o MySQL')
+
+        usuarios = benchmark.usuarios_benchmark()
+        if usuarios is None:
+            raise CommandError('Se necesita un superusuario, un jefe con jefatura activa y un trabajador con tickets')
+
+        self.stdout.write(
+            f'{options["solicitudes"]} requests por escenario y modo, {options["concurrencia"]} simultáneos '
+            f'({connection.vendor}). Se llama a las vistas sin middleware: la cadena de middleware sync '
+            'agrega el mismo costo en ambos modos'
+        )
+        resultado = {
+            'motor': connection.vendor,
+            'solicitudes': options['solicitudes'],
+            'concurrencia': options['concurrencia'],
+            'escenarios': {},
+        }
+        for nombre, rol, url, vista_sync, vista_async in ESCENARIOS:
+            request = self._request(getattr(usuarios, rol), reverse(url))
+            self.stdout.write(f'\n{nombre}')
+            medicion = {
+                # ASGI ejecuta las vistas sync con thread_sensitive: una a la vez en el mismo hilo
+                'sync': async_to_sync(self._medir)(sync_to_async(vista_sync), request, options),
+                'async': async_to_sync(self._medir)(vista_async, request, options),
+            }
+            for modo in ('sync', 'async'):
+                self._mostrar(modo, medicion[modo])
+            aceleracion = medicion['sync']['p50_ms'] / medicion['async']['p50_ms'] if medicion['async']['p50_ms'] else 0
+            self.stdout.write(self.style.SUCCESS(f'  aceleración p50 (sync/async): {aceleracion:.2f}x'))
+            resultado['escenarios'][nombre] = medicion
+
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(resultado, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(f'\nResultado guardado en {options["salida"]}')
+
+    def _request(self, usuario, url):
+        """Request autenticado con lo que agregan los middlewares que usan las vistas y templates"""
+        request = RequestFactory().get(url)
+        request.user = usuario or AnonymousUser()
+        request.session = {}
+        request.acceso = SimpleLazyObject(lambda: contexto_acceso(request.user))
+        return request
+
+    async def _medir(self, vista, request, options):
+        tiempos = []
+        estados = set()
+        semaforo = asyncio.Semaphore(options['concurrencia'])
+
+        async def atender():
+            async with semaforo:
+                inicio = time.perf_counter()
+                respuesta = await vista(request)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                estados.add(respuesta.status_code)
+
+        # Calentamiento: cache de contadores, catálogos y conexiones
+        await atender()
+        tiempos.clear()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(atender() for _ in range(options['solicitudes'])))
+        duracion = time.perf_counter() - inicio
+        if estados != {200}:
+            raise CommandError(f'La vista respondió {sorted(estados)}')
+
+        tiempos.sort()
+        return {
+            'p50_ms': round(_percentil(tiempos, 50), 2),
+            'p90_ms': round(_percentil(tiempos, 90), 2),
+            'p99_ms': round(_percentil(tiempos, 99), 2),
+            'requests_por_segundo': round(len(tiempos) / duracion, 1),
+        }
+
+    def _mostrar(self, modo, medicion):
+        self.stdout.write(
+            f'  {modo:<6} p50 {medicion["p50_ms"]:>8.2f} ms  p90 {medicion["p90_ms"]:>8.2f} ms  '
+            f'p99 {medicion["p99_ms"]:>8.2f} ms  {medicion["requests_por_segundo"]:>7.1f} req/s'
+        )
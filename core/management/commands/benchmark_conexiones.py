@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+from core.benchmark import _percentil
+from core.backends.mysql_pool.pool import ConexionesEnPool, obtener_pool
+
+BACKEND_POOL = 'core.backends.mysql_pool'
+
+class Command(BaseCommand):
+    help = (
+        'Compara la latencia de requests simulados (conectar, N consultas, cerrar) con y sin el pool '
+        'de conexiones, para medir el costo de abrir una conexión por request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Alias de DATABASES a medir (por defecto, default)')
+        parser.add_argument('--solicitudes', type=int, default=300, help='Requests simulados por modo (por defecto, 300)')
+        parser.add_argument('--hilos', type=int, default=4, help='Requests concurrentes (por defecto, 4)')
+        parser.add_argument('--consultas', type=int, default=5, help='Consultas por request (por defecto, 5)')
+        parser.add_argument('--pool-maximo', type=int, help='Conexiones del pool (por defecto, una por hilo)')
+        parser.add_argument('--salida', help='Guarda el resultado en un archivo JSON')
+
+    def handle(self, *args, **options):
+        if min(options['solicitudes'], options['hilos'], options['consultas']) < 1:
+            raise CommandError('--solicitudes, --hilos y --consultas deben ser mayores que 0')
+        alias = options['database']
+        if alias not in connections:
+            raise CommandError(f'No existe la base de datos "{alias}"')
+
+        ajustes = dict(connections[alias].settings_dict)
+        motor = BACKEND_POOL if ajustes['ENGINE'] == BACKEND_POOL else ajustes['ENGINE']
+        motor_directo = 'django.db.backends.mysql' if motor == BACKEND_POOL else motor
+        directo = load_backend(motor_directo).DatabaseWrapper
+        if directo.vendor == 'sqlite' and directo(ajustes, alias).is_in_memory_db():
+            raise CommandError('Una base SQLite en memoria no abre conexiones: use un archivo o MySQL')
+
+        ajustes.update(
+            CONN_MAX_AGE=0,
+            POOL={**ajustes.get('POOL', {}), 'MAXIMO': options['pool_maximo'] or options['hilos'], 'ESPERA': 60},
+        )
+        con_pool = type('DatabaseWrapper', (ConexionesEnPool, directo), {})
+
+        self.stdout.write(
+            f'{options["solicitudes"]} requests por modo, {options["hilos"]} hilos, '
+            f'{options["consultas"]} consultas por request ({directo.vendor}, alias "{alias}")'
+        )
+        resultado = {
+            'motor': directo.vendor,
+            'solicitudes': options['solicitudes'],
+            'hilos': options['hilos'],
+            'consultas': options['consultas'],
+        }
+        for modo, clase in (('sin_pool', directo), ('con_pool', con_pool)):
+            resultado[modo] = self._medir(clase, ajustes, f'benchmark_{alias}', options)
+            self._mostrar(modo.replace('_', ' '), resultado[modo])
+
+        ahorro = resultado['sin_pool']['p50_ms'] - resultado['con_pool']['p50_ms']
+        proporcion = ahorro / resultado['sin_pool']['p50_ms'] if resultado['sin_pool']['p50_ms'] else 0
+        resultado['ahorro_p50_ms'] = round(ahorro, 3)
+        self.stdout.write(self.style.SUCCESS(
+            f'\nEl pool ahorra {ahorro:.2f} ms por request en la mediana ({proporcion:.0%}); '
+            f'abrió {resultado["con_pool"]["pool"]["creadas"]} conexiones en lugar de {options["solicitudes"]}'
+        ))
+
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(resultado, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(f'Resultado guardado en {options["salida"]}')
+
+    def _medir(self, clase, ajustes, alias, options):
+        """Cada hilo usa su propio wrapper, como los hilos del servidor con sus conexiones de Django"""
+        pendientes = iter(range(options['solicitudes']))
+        lock = threading.Lock()
+        conexiones, totales, errores = [], [], []
+
+        def trabajar():
+            wrapper = clase(dict(ajustes), alias)
+            try:
+                while True:
+                    with lock:
+                        if next(pendientes, None) is None:
+                            return
+                    inicio = time.perf_counter()
+                    wrapper.ensure_connection()
+                    conectado = time.perf_counter()
+                    with wrapper.cursor() as cursor:
+                        for _ in range(options['consultas']):
+                            cursor.execute('SELECT 1')
+                            cursor.fetchone()
+                    wrapper.close()
+                    fin = time.perf_counter()
+                    with lock:
+                        conexiones.append((conectado - inicio) * 1000)
+                        totales.append((fin - inicio) * 1000)
+            except Exception as error:
+                errores.append(error)
+            finally:
+                wrapper.close()
+
+        hilos = [threading.Thread(target=trabajar) for _ in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+        if errores:
+            raise CommandError(f'Falló un request simulado: {errores[0]}')
+
+        conexiones.sort()
+        totales.sort()
+        medicion = {
+            'conexion_p50_ms': round(_percentil(conexiones, 50), 3),
+            'p50_ms': round(_percentil(totales, 50), 3),
+            'p90_ms': round(_percentil(totales, 90), 3),
+            'p99_ms': round(_percentil(totales, 99), 3),
+            'requests_por_segundo': round(len(totales) / duracion, 1),
+        }
+        if issubclass(clase, ConexionesEnPool):
+            pool = obtener_pool(alias, (ajustes['NAME'], ajustes['HOST'], ajustes['PORT'], ajustes['USER']))
+            medicion['pool'] = pool.estado()
+            pool.cerrar_libres()
+        return medicion
+
+    def _mostrar(self, modo, medicion):
+        self.stdout.write(
+            f'{modo:<9} conexión p50 {medicion["conexion_p50_ms"]:>7.3f} ms   request p50 {medicion["p50_ms"]:>7.3f} ms  '
+            f'p90 {medicion["p90_ms"]:>7.3f} ms  p99 {medicion["p99_ms"]:>7.3f} ms  '
+            f'{medicion["requests_por_segundo"]:>8.1f} req/s'
+        )
@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from core import benchmark
+from core.models import Ticket
+
+ESCALAS = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+DIRECTORIO_BASES = Path(__file__).resolve().parents[2] / 'benchmarks'
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p90/p99) y consultas SQL de las vistas críticas, guarda un reporte JSON '
+        'y lo compara con la línea base de la escala'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=ESCALAS, default='10k', help='Volumen de tickets (por defecto, 10k)')
+        parser.add_argument(
+            '--generar',
+            action='store_true',
+            help='Completa la base con generar_carga hasta el volumen de la escala'
+        )
+        parser.add_argument('--repeticiones', type=int, default=20, help='Requests medidos por escenario (por defecto, 20)')
+        parser.add_argument('--salida', default='benchmark_vistas.json', help='Archivo del reporte JSON')
+        parser.add_argument('--base', help='Línea base a comparar (por defecto, core/benchmarks/base_<escala>.json)')
+        parser.add_argument('--tolerancia', type=float, default=0.5, help='Aumento de la mediana tolerado (por defecto, 0.5)')
+        parser.add_argument('--actualizar-base', action='store_true', help='Guarda el reporte como nueva línea base')
+
+    def handle(self, *args, **options):
+        escala = options['escala']
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser mayor que 0')
+
+        tickets = Ticket.objects.count()
+        if tickets < ESCALAS[escala]:
+            if not options['generar']:
+                raise CommandError(
+                    f'La base tiene {tickets} tickets y la escala {escala} necesita {ESCALAS[escala]}: use --generar'
+                )
+            self._generar(ESCALAS[escala] - tickets, options['verbosity'])
+            tickets = Ticket.objects.count()
+
+        usuarios = benchmark.usuarios_benchmark()
+        if usuarios is None:
+            raise CommandError('Se necesita un superusuario, un jefe con jefatura activa y un trabajador con tickets')
+
+        self.stdout.write(f'Midiendo {tickets} tickets ({connection.vendor}), {options["repeticiones"]} requests por vista...')
+        reporte = {
+            'escala': escala,
+            'tickets': tickets,
+            'motor': connection.vendor,
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'repeticiones': options['repeticiones'],
+            'escenarios': {},
+        }
+        errores = []
+        cliente = Client()
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for escenario in benchmark.escenarios(usuarios):
+                resultado = benchmark.medir(cliente, escenario, options['repeticiones'])
+                presupuesto = benchmark.PRESUPUESTO_CONSULTAS[escenario.nombre]
+                reporte['escenarios'][escenario.nombre] = {**resultado, 'presupuesto': presupuesto}
+
+                linea = (
+                    f'{escenario.nombre:<28} {resultado["consultas"]:>3} consultas  '
+                    f'p50 {resultado["p50_ms"]:>8.1f} ms  p90 {resultado["p90_ms"]:>8.1f} ms  p99 {resultado["p99_ms"]:>8.1f} ms'
+                )
+                if resultado['estado'] != 200:
+                    errores.append(f'{escenario.nombre}: respondió {resultado["estado"]}')
+                    self.stdout.write(self.style.ERROR(f'✗ {linea}'))
+                elif resultado['consultas'] > presupuesto:
+                    errores.append(f'{escenario.nombre}: {resultado["consultas"]} consultas (presupuesto {presupuesto})')
+                    self.stdout.write(self.style.ERROR(f'✗ {linea}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'✓ {linea}'))
+
+        Path(options['salida']).write_text(json.dumps(reporte, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        self.stdout.write(f'Reporte guardado en {options["salida"]}')
+
+        ruta_base = Path(options['base']) if options['base'] else DIRECTORIO_BASES / f'base_{escala}.json'
+        if options['actualizar_base']:
+            ruta_base.parent.mkdir(parents=True, exist_ok=True)
+            ruta_base.write_text(json.dumps(reporte, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'Línea base actualizada: {ruta_base}'))
+        elif ruta_base.exists():
+            base = json.loads(ruta_base.read_text(encoding='utf-8'))
+            mismo_motor = base.get('motor') == connection.vendor
+            if not mismo_motor:
+                self.stdout.write(self.style.WARNING(
+                    f'La línea base se midió con {base.get("motor")}: solo se comparan las consultas'
+                ))
+            errores += benchmark.comparar(reporte, base, options['tolerancia'], latencias=mismo_motor)
+        else:
+            self.stdout.write(self.style.WARNING(f'No existe la línea base {ruta_base}: use --actualizar-base'))
+
+        if errores:
+            raise CommandError('Regresiones de rendimiento:\n  ' + '\n  '.join(errores))
+        self.stdout.write(self.style.SUCCESS('\n¡Todas las vistas dentro del presupuesto!'))
+
+    def _generar(self, faltantes, verbosity):
+        """Completa la base con datos sintéticos y un superusuario para los escenarios de administración"""
+        self.stdout.write(f'Generando {faltantes} tickets...')
+        call_command(
+            'generar_carga',
+            tickets=faltantes,
+            usuarios=max(80, faltantes // 500),
+            areas=max(8, min(40, faltantes // 25_000)),
+            prefijo=f'bench{Ticket.objects.count()}',
+            verbosity=verbosity,
+            stdout=self.stdout,
+        )
+        if not User.objects.filter(is_superuser=True, is_active=True).exists():
+            User.objects.create_superuser('benchmark_admin', 'benchmark_admin@ejemplo.test', None)
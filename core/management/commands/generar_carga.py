@@ -0,0 +1,382 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from core.models import (
+    Area, Perfil, Jefatura, Cliente, Ticket, Observacion, Derivacion, HistorialUsuario,
+    ContadorTickets, TerminoBusqueda
+)
+from core import catalogos
+
+# Distribuciones aproximadas de producción: (valor, peso)
+ESTADOS = [
+    (Ticket.Estado.ABIERTO, 20),
+    (Ticket.Estado.EN_PROCESO, 15),
+    (Ticket.Estado.RESUELTO, 25),
+    (Ticket.Estado.CERRADO, 35),
+    (Ticket.Estado.NO_APLICA, 5),
+]
+NIVELES = [
+    (Ticket.NivelCritico.BAJO, 35),
+    (Ticket.NivelCritico.MEDIO, 40),
+    (Ticket.NivelCritico.ALTO, 18),
+    (Ticket.NivelCritico.CRITICO, 7),
+]
+# Observaciones por ticket: la mayoría tiene pocas y unos pocos acumulan muchas
+OBSERVACIONES_POR_TICKET = [(0, 30), (1, 25), (2, 18), (3, 12), (4, 7), (5, 4), (6, 2), (8, 1), (12, 1)]
+DERIVACIONES_POR_TICKET = [(0, 85), (1, 12), (2, 3)]
+# Probabilidad de que un ticket tenga trabajador asignado según su estado
+PROBABILIDAD_ASIGNADO = {
+    Ticket.Estado.ABIERTO: 0.4,
+    Ticket.Estado.EN_PROCESO: 1.0,
+    Ticket.Estado.RESUELTO: 1.0,
+    Ticket.Estado.CERRADO: 1.0,
+    Ticket.Estado.NO_APLICA: 0.5,
+}
+
+NOMBRES_AREA = [
+    'Soporte TI', 'Finanzas', 'Recursos Humanos', 'Operaciones', 'Logística', 'Comercial',
+    'Abastecimiento', 'Legal', 'Mantención', 'Calidad', 'Marketing', 'Infraestructura',
+]
+NOMBRES = ['Ana', 'Luis', 'María', 'Pedro', 'Camila', 'Jorge', 'Valentina', 'Diego', 'Fernanda', 'Matías']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda']
+TIPOS_PROBLEMA = ['Hardware', 'Software', 'Red', 'Acceso', 'Email', 'Impresora', 'Sistema', 'Base de datos', 'Servidor', 'Otro']
+PROBLEMAS = [
+    'No enciende el equipo', 'Error al iniciar sesión', 'Lentitud en la conexión', 'Impresora atascada',
+    'Solicitud de acceso', 'Correo no sincroniza', 'Falla en el sistema ERP', 'Pantalla azul',
+    'Actualización pendiente', 'Respaldo fallido', 'VPN no conecta', 'Licencia vencida',
+]
+LUGARES = ['oficina 201', 'sala de reuniones', 'bodega central', 'recepción', 'piso 3', 'sucursal norte', 'laboratorio']
+FRASES = [
+    'El usuario reporta que el problema ocurre desde esta mañana.',
+    'Ya se reinició el equipo sin resultados.',
+    'Afecta a varias personas del área.',
+    'Se necesita resolver antes del cierre mensual.',
+    'El error aparece de forma intermitente.',
+    'Se adjuntó una captura del mensaje de error.',
+    'El proveedor fue notificado.',
+]
+TEXTOS_OBSERVACION = [
+    'Se revisó el equipo en terreno.', 'Se solicitó más información al cliente.', 'Se escaló al proveedor.',
+    'Se aplicó la solución propuesta.', 'El cliente confirma que el problema persiste.',
+    'Se programó una visita técnica.', 'Se reinstaló el software afectado.',
+]
+
+def _elegir(rng, distribucion):
+    valores, pesos = zip(*distribucion)
+    return rng.choices(valores, weights=pesos)[0]
+
+@contextmanager
+def _fechas_manuales(*campos):
+    """Desactiva auto_now/auto_now_add para insertar fechas históricas con bulk_create"""
+    originales = [(campo, campo.auto_now, campo.auto_now_add) for campo in campos]
+    try:
+        for campo in campos:
+            campo.auto_now = campo.auto_now_add = False
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in originales:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+def _siguiente_id(modelo):
+    return (modelo.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos deterministas (áreas, usuarios, jefaturas, clientes, tickets, observaciones, '
+        'derivaciones e historial) con bulk_create por lotes, para pruebas de rendimiento'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=10000, help='Cantidad de tickets (por defecto, 10000)')
+        parser.add_argument('--areas', type=int, default=8, help='Cantidad de áreas (por defecto, 8)')
+        parser.add_argument('--usuarios', type=int, default=80, help='Cantidad de trabajadores (por defecto, 80)')
+        parser.add_argument('--clientes', type=int, help='Cantidad de clientes (por defecto, un décimo de los tickets)')
+        parser.add_argument('--dias', type=int, default=730, help='Antigüedad máxima de los tickets en días (por defecto, 730)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador (por defecto, 42)')
+        parser.add_argument('--lote', type=int, default=5000, help='Tickets por transacción (por defecto, 5000)')
+        parser.add_argument('--prefijo', default='carga', help='Prefijo de usuarios, áreas y correos generados')
+        parser.add_argument(
+            '--sin-indice',
+            action='store_true',
+            help='No llenar el índice de búsqueda (más rápido; luego ejecutar reindexar_busqueda)'
+        )
+
+    def handle(self, *args, **options):
+        if options['areas'] < 1 or options['usuarios'] < options['areas'] or options['tickets'] < 0:
+            raise CommandError('Se necesita al menos un área y un trabajador por área')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        self.prefijo = options['prefijo']
+        if User.objects.filter(username__startswith=f'{self.prefijo}_').exists():
+            raise CommandError(f'Ya existen datos con el prefijo "{self.prefijo}": use otro --prefijo')
+
+        self.rng = random.Random(options['semilla'])
+        self.ahora = timezone.now()
+        self.dias = options['dias']
+        inicio = time.monotonic()
+
+        with _fechas_manuales(
+            Ticket._meta.get_field('fecha_creacion'),
+            Ticket._meta.get_field('fecha_actualizacion'),
+            Observacion._meta.get_field('fecha_hora_observacion'),
+            Derivacion._meta.get_field('fecha_derivacion'),
+            HistorialUsuario._meta.get_field('fecha_accion'),
+            Cliente._meta.get_field('fecha_registro'),
+        ):
+            with transaction.atomic():
+                self._organizacion(options['areas'], options['usuarios'])
+                # bulk_create no emite señales: el catálogo de áreas y trabajadores se invalida aquí
+                catalogos.invalidar()
+                self._clientes(options['clientes'] or max(1, options['tickets'] // 10))
+            self._tickets(options['tickets'], options['lote'], not options['sin_indice'])
+
+        self._reiniciar_secuencias()
+        self.stdout.write(self.style.SUCCESS(f'✓ Carga generada en {time.monotonic() - inicio:.1f}s'))
+        if options['sin_indice']:
+            self.stdout.write('Ejecute reindexar_busqueda para habilitar la búsqueda sobre los tickets generados.')
+
+    def _fecha(self, dias_maximo):
+        return self.ahora - timedelta(seconds=self.rng.randint(0, dias_maximo * 86400))
+
+    # ---------------------------------------------------------------
+    # Organización: áreas, trabajadores, perfiles, jefaturas e historial
+    # ---------------------------------------------------------------
+
+    def _organizacion(self, cantidad_areas, cantidad_usuarios):
+        rng = self.rng
+        id_area = _siguiente_id(Area)
+        areas = [
+            Area(id=id_area + i, nombre=f'{NOMBRES_AREA[i % len(NOMBRES_AREA)]} {i + 1} ({self.prefijo})')
+            for i in range(cantidad_areas)
+        ]
+        Area.objects.bulk_create(areas)
+
+        # Una sola contraseña hasheada para todos (el hash es lo costoso)
+        clave = make_password(f'{self.prefijo}1234')
+        id_usuario = _siguiente_id(User)
+        usuarios = [
+            User(
+                id=id_usuario + i,
+                username=f'{self.prefijo}_u{i}',
+                first_name=rng.choice(NOMBRES),
+                last_name=rng.choice(APELLIDOS),
+                email=f'{self.prefijo}_u{i}@ejemplo.test',
+                password=clave,
+                is_active=rng.random() > 0.05,
+                date_joined=self._fecha(self.dias + 365),
+            )
+            for i in range(cantidad_usuarios)
+        ]
+        User.objects.bulk_create(usuarios, batch_size=1000)
+
+        # Reparto de trabajadores: al menos uno por área, el resto al azar
+        self.usuarios_por_area = {area.id: [] for area in areas}
+        id_perfil = _siguiente_id(Perfil)
+        perfiles = []
+        for i, usuario in enumerate(usuarios):
+            area = areas[i] if i < len(areas) else rng.choice(areas)
+            self.usuarios_por_area[area.id].append(usuario.id)
+            perfiles.append(Perfil(id=id_perfil + i, usuario_id=usuario.id, area_id=area.id))
+        Perfil.objects.bulk_create(perfiles, batch_size=1000)
+
+        # El primer trabajador de cada área es su jefe
+        id_jefatura = _siguiente_id(Jefatura)
+        jefaturas = [
+            Jefatura(
+                id=id_jefatura + i,
+                trabajador_jefe_id=self.usuarios_por_area[area.id][0],
+                area_jefatura_id=area.id,
+                fecha_inicio_jefatura=self._fecha(self.dias).date(),
+            )
+            for i, area in enumerate(areas)
+        ]
+        Jefatura.objects.bulk_create(jefaturas)
+
+        jefe = jefaturas[0].trabajador_jefe_id
+        id_historial = _siguiente_id(HistorialUsuario)
+        historial = []
+        for usuario in usuarios:
+            historial.append(HistorialUsuario(
+                usuario_id=usuario.id,
+                tipo_accion=HistorialUsuario.TipoAccion.CREACION,
+                descripcion=f'Usuario {usuario.username} creado',
+                fecha_accion=usuario.date_joined,
+                realizado_por_id=jefe,
+            ))
+            if not usuario.is_active:
+                historial.append(HistorialUsuario(
+                    usuario_id=usuario.id,
+                    tipo_accion=HistorialUsuario.TipoAccion.DESACTIVACION,
+                    descripcion='Usuario desactivado',
+                    fecha_accion=self._fecha(self.dias),
+                    realizado_por_id=jefe,
+                    datos_adicionales={'motivo': 'Término de contrato'},
+                ))
+            elif rng.random() < 0.1:
+                historial.append(HistorialUsuario(
+                    usuario_id=usuario.id,
+                    tipo_accion=HistorialUsuario.TipoAccion.CAMBIO_AREA,
+                    descripcion='Cambio de área',
+                    fecha_accion=self._fecha(self.dias),
+                    realizado_por_id=jefe,
+                ))
+        for i, fila in enumerate(historial):
+            fila.id = id_historial + i
+        HistorialUsuario.objects.bulk_create(historial, batch_size=1000)
+
+        self.areas = [area.id for area in areas]
+        self.stdout.write(
+            f'  {len(areas)} áreas, {len(usuarios)} trabajadores, {len(jefaturas)} jefaturas, '
+            f'{len(historial)} registros de historial'
+        )
+
+    def _clientes(self, cantidad):
+        id_cliente = _siguiente_id(Cliente)
+        for desde in range(0, cantidad, 5000):
+            Cliente.objects.bulk_create([
+                Cliente(
+                    id=id_cliente + i,
+                    nombre=f'{self.rng.choice(NOMBRES)} {self.rng.choice(APELLIDOS)}',
+                    telefono=f'+569{self.rng.randint(10000000, 99999999)}',
+                    correo_electronico=f'{self.prefijo}.cliente{i}@ejemplo.test',
+                    fecha_registro=self._fecha(self.dias + 365),
+                )
+                for i in range(desde, min(desde + 5000, cantidad))
+            ])
+        self.clientes = (id_cliente, id_cliente + cantidad - 1)
+        self.stdout.write(f'  {cantidad} clientes')
+
+    # ---------------------------------------------------------------
+    # Tickets con sus observaciones y derivaciones
+    # ---------------------------------------------------------------
+
+    def _tickets(self, cantidad, lote, indexar):
+        ids = {
+            'ticket': _siguiente_id(Ticket),
+            'observacion': _siguiente_id(Observacion),
+            'derivacion': _siguiente_id(Derivacion),
+        }
+        inicio = time.monotonic()
+        totales = {'observaciones': 0, 'derivaciones': 0}
+
+        for desde in range(0, cantidad, lote):
+            tickets, observaciones, derivaciones = [], [], []
+            for _ in range(min(lote, cantidad - desde)):
+                ticket, obs, der = self._ticket(ids)
+                tickets.append(ticket)
+                observaciones.extend(obs)
+                derivaciones.extend(der)
+
+            deltas = {}
+            for ticket in tickets:
+                clave = ticket.clave_contador()
+                deltas[clave] = deltas.get(clave, 0) + 1
+
+            with transaction.atomic():
+                Ticket.objects.bulk_create(tickets, batch_size=1000)
+                Observacion.objects.bulk_create(observaciones, batch_size=2000)
+                Derivacion.objects.bulk_create(derivaciones, batch_size=2000)
+                ContadorTickets.aplicar(deltas)
+                if indexar:
+                    TerminoBusqueda.indexar_tickets(tickets, observaciones, batch_size=5000)
+
+            totales['observaciones'] += len(observaciones)
+            totales['derivaciones'] += len(derivaciones)
+            creados = desde + len(tickets)
+            segundos = time.monotonic() - inicio
+            self.stdout.write(
+                f'  {creados}/{cantidad} tickets, {totales["observaciones"]} observaciones, '
+                f'{totales["derivaciones"]} derivaciones ({creados / segundos if segundos else 0:.0f} tickets/s)'
+            )
+
+    def _ticket(self, ids):
+        rng = self.rng
+        estado = _elegir(rng, ESTADOS)
+        nivel = _elegir(rng, NIVELES)
+        area = rng.choice(self.areas)
+        creada = self._fecha(self.dias)
+        trabajadores = self.usuarios_por_area[area]
+        asignado = rng.choice(trabajadores) if rng.random() < PROBABILIDAD_ASIGNADO[estado] else None
+        ultima = creada
+
+        ticket_id = ids['ticket']
+        ids['ticket'] += 1
+
+        # Derivaciones: el ticket llegó a su área actual desde otras
+        derivaciones = []
+        cantidad_derivaciones = _elegir(rng, DERIVACIONES_POR_TICKET) if len(self.areas) > 1 else 0
+        origen = rng.choice([otra for otra in self.areas if otra != area]) if cantidad_derivaciones else None
+        for numero in range(cantidad_derivaciones):
+            destino = area if numero == cantidad_derivaciones - 1 else rng.choice(
+                [otra for otra in self.areas if otra != origen]
+            )
+            ultima = ultima + timedelta(minutes=rng.randint(5, 2 * 24 * 60))
+            derivaciones.append(Derivacion(
+                id=ids['derivacion'],
+                ticket_id=ticket_id,
+                fecha_derivacion=ultima,
+                area_origen_id=origen,
+                trabajador_origen_id=rng.choice(self.usuarios_por_area[origen]),
+                area_destino_id=destino,
+                motivo_derivacion='Corresponde a otra área',
+            ))
+            ids['derivacion'] += 1
+            origen = destino
+
+        observaciones = []
+        for _ in range(_elegir(rng, OBSERVACIONES_POR_TICKET)):
+            ultima = ultima + timedelta(minutes=rng.randint(5, 3 * 24 * 60))
+            observaciones.append(Observacion(
+                id=ids['observacion'],
+                ticket_asociado_id=ticket_id,
+                observacion_texto=rng.choice(TEXTOS_OBSERVACION),
+                fecha_hora_observacion=ultima,
+                autor_trabajador_id=asignado or rng.choice(trabajadores),
+            ))
+            ids['observacion'] += 1
+
+        fecha_resolucion = fecha_cierre = None
+        if estado in (Ticket.Estado.RESUELTO, Ticket.Estado.CERRADO):
+            fecha_resolucion = ultima = ultima + timedelta(hours=rng.randint(1, 240))
+        if estado == Ticket.Estado.CERRADO:
+            fecha_cierre = ultima = ultima + timedelta(hours=rng.randint(1, 72))
+
+        ticket = Ticket(
+            id=ticket_id,
+            titulo=f'{rng.choice(PROBLEMAS)} en {rng.choice(LUGARES)}',
+            descripcion_problema=' '.join(rng.sample(FRASES, rng.randint(1, 3))),
+            estado=estado,
+            nivel_critico=nivel,
+            prioridad=Ticket.PRIORIDADES[nivel],
+            tipo_problema=rng.choice(TIPOS_PROBLEMA),
+            cliente_solicitante_id=rng.randint(*self.clientes),
+            area_asignada_id=area,
+            trabajador_creador_id=rng.choice(self.usuarios_por_area[rng.choice(self.areas)]),
+            trabajador_asignado_id=asignado,
+            fecha_creacion=creada,
+            fecha_actualizacion=min(ultima, self.ahora),
+            fecha_resolucion=fecha_resolucion,
+            fecha_cierre=fecha_cierre,
+            observaciones_count=len(observaciones),
+            derivaciones_count=len(derivaciones),
+        )
+        return ticket, observaciones, derivaciones
+
+    def _reiniciar_secuencias(self):
+        """Los IDs se asignaron explícitamente: PostgreSQL necesita ajustar sus secuencias"""
+        modelos = [Area, User, Perfil, Jefatura, HistorialUsuario, Cliente, Ticket, Observacion, Derivacion]
+        sentencias = connection.ops.sequence_reset_sql(no_style(), modelos)
+        if sentencias:
+            with connection.cursor() as cursor:
+                for sentencia in sentencias:
+                    cursor.execute(sentencia)
@@ -0,0 +1,83 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core import importacion
+
+class Command(BaseCommand):
+    help = (
+        'Importa tickets desde un archivo CSV o JSONL, leyéndolo fila a fila y creando los tickets por lotes. '
+        f'Columnas: {", ".join(importacion.COLUMNAS_OBLIGATORIAS)} '
+        f'(opcionales: {", ".join(importacion.COLUMNAS_OPCIONALES)})'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo a importar')
+        parser.add_argument(
+            '--formato',
+            choices=importacion.FORMATOS,
+            help='Formato del archivo (por defecto, según la extensión)'
+        )
+        parser.add_argument(
+            '--usuario',
+            required=True,
+            help='Nombre de usuario que figurará como creador de los tickets'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=importacion.LOTE_POR_DEFECTO,
+            help=f'Cantidad de filas por transacción (por defecto, {importacion.LOTE_POR_DEFECTO})'
+        )
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificación del archivo (por defecto, utf-8-sig)')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or importacion.formato_de_archivo(options['archivo'])
+        if not formato:
+            raise CommandError('No se reconoce el formato del archivo: use --formato csv o --formato jsonl')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        creador = User.objects.filter(username=options['usuario']).first()
+        if not creador:
+            raise CommandError(f'No existe el usuario {options["usuario"]}')
+
+        inicio = time.monotonic()
+
+        def al_avanzar(resultado):
+            segundos = time.monotonic() - inicio
+            self.stdout.write(
+                f'  {resultado.filas} filas procesadas, {resultado.tickets_creados} tickets creados, '
+                f'{resultado.filas_con_error} con error ({resultado.filas / segundos if segundos else 0:.0f} filas/s)'
+            )
+
+        try:
+            with open(options['archivo'], encoding=options['encoding'], newline='') as archivo:
+                resultado = importacion.importar_tickets(
+                    importacion.leer_filas(archivo, formato),
+                    creador,
+                    lote=options['lote'],
+                    al_avanzar=al_avanzar
+                )
+        except OSError as error:
+            raise CommandError(f'No se pudo leer el archivo: {error}')
+
+        for linea, mensaje in resultado.errores:
+            self.stdout.write(self.style.ERROR(f'✗ Línea {linea}: {mensaje}'))
+        if resultado.filas_con_error > len(resultado.errores):
+            self.stdout.write(self.style.ERROR(
+                f'  ... y {resultado.filas_con_error - len(resultado.errores)} fila(s) más con error'
+            ))
+
+        if resultado.interrupcion:
+            linea, mensaje = resultado.interrupcion
+            raise CommandError(
+                f'Importación interrumpida en la línea {linea}: {mensaje}. '
+                f'Quedaron importados {resultado.tickets_creados} tickets de las líneas anteriores'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Importación terminada en {time.monotonic() - inicio:.1f}s: {resultado.tickets_creados} tickets, '
+            f'{resultado.clientes_creados} clientes nuevos, {resultado.clientes_actualizados} actualizados, '
+            f'{resultado.filas_con_error} fila(s) omitidas'
+        ))
@@ -0,0 +1,64 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from core import outbox
+from core.models import EventoOutbox
+
+class Command(BaseCommand):
+    help = (
+        'Despacha los eventos pendientes del outbox (correos): reclama lotes con bloqueo de filas, '
+        'reintenta los fallidos con espera exponencial e informa el throughput'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50, help='Eventos reclamados por lote (por defecto, 50)')
+        parser.add_argument('--espera', type=float, default=2.0, help='Segundos entre consultas sin eventos pendientes (por defecto, 2)')
+        parser.add_argument('--reporte', type=float, default=60.0, help='Segundos entre reportes de throughput (por defecto, 60)')
+        parser.add_argument('--una-vez', action='store_true', help='Procesa los eventos disponibles y termina')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        # SIGTERM (docker stop) termina el lote en curso antes de salir
+        self._detener = False
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, '_detener', True))
+
+        total = outbox.ResultadoLote()
+        inicio = ultimo_reporte = time.monotonic()
+        parcial = outbox.ResultadoLote()
+        try:
+            while not self._detener:
+                resultado = outbox.procesar_lote(options['lote'])
+                for acumulado in (total, parcial):
+                    acumulado.enviados += resultado.enviados
+                    acumulado.reintentos += resultado.reintentos
+                    acumulado.fallidos += resultado.fallidos
+
+                ahora = time.monotonic()
+                if parcial.procesados and ahora - ultimo_reporte >= options['reporte']:
+                    self._reportar(parcial, ahora - ultimo_reporte)
+                    parcial, ultimo_reporte = outbox.ResultadoLote(), ahora
+
+                if not resultado.procesados:
+                    if options['una_vez']:
+                        break
+                    # Sin trabajo: liberar la conexión según CONN_MAX_AGE mientras se espera
+                    close_old_connections()
+                    time.sleep(options['espera'])
+        except KeyboardInterrupt:
+            pass
+
+        self._reportar(total, time.monotonic() - inicio, final=True)
+
+    def _reportar(self, resultado, segundos, final=False):
+        pendientes = EventoOutbox.objects.filter(estado=EventoOutbox.Estado.PENDIENTE).count()
+        texto = (
+            f'{resultado.procesados} eventos en {segundos:.1f} s '
+            f'({resultado.procesados / segundos if segundos else 0:.1f} eventos/s): '
+            f'{resultado.enviados} enviados, {resultado.reintentos} por reintentar, {resultado.fallidos} fallidos; '
+            f'{pendientes} pendientes'
+        )
+        self.stdout.write(self.style.SUCCESS(texto) if final and not resultado.fallidos else texto)
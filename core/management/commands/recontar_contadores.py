@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+from core.models import Ticket, ContadorTickets
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye (o verifica) la tabla ContadorTickets y los conteos de observaciones '
+        'y derivaciones de cada ticket'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo compara los contadores con los tickets y falla si hay diferencias, sin modificarlos'
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            diferencias = self._diferencias(self._conteo_real(), self._conteo_actual())
+            for clave, (esperado, actual) in sorted(diferencias.items()):
+                self.stdout.write(self.style.ERROR(f'✗ {self._describir(clave)}: esperado {esperado}, actual {actual}'))
+
+            tickets = Ticket.objects.con_conteos_desincronizados()
+            for ticket in tickets[:20]:
+                self.stdout.write(self.style.ERROR(
+                    f'✗ Ticket #{ticket.id}: observaciones {ticket.observaciones_count}/{ticket.observaciones_reales}, '
+                    f'derivaciones {ticket.derivaciones_count}/{ticket.derivaciones_reales}'
+                ))
+            tickets_desincronizados = tickets.count()
+
+            if diferencias or tickets_desincronizados:
+                raise CommandError(
+                    f'{len(diferencias)} contador(es) y {tickets_desincronizados} ticket(s) desincronizado(s)'
+                )
+            self.stdout.write(self.style.SUCCESS('✓ Los contadores coinciden con los tickets'))
+            return
+
+        with transaction.atomic():
+            # Bloquear los contadores existentes mientras se reconstruyen
+            list(ContadorTickets.objects.select_for_update().values_list('id', flat=True))
+            conteo_real = self._conteo_real()
+            diferencias = self._diferencias(conteo_real, self._conteo_actual())
+
+            ContadorTickets.objects.all().delete()
+            ContadorTickets.objects.bulk_create([
+                ContadorTickets(
+                    area_id=area_id,
+                    estado=estado,
+                    nivel_critico=nivel_critico,
+                    asignado=asignado,
+                    cantidad=total,
+                )
+                for (area_id, estado, nivel_critico, asignado), total in conteo_real.items()
+            ], batch_size=500)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {len(conteo_real)} contadores reconstruidos ({len(diferencias)} corregidos)'
+        ))
+
+        tickets_corregidos = Ticket.objects.con_conteos_desincronizados().count()
+        Ticket.objects.recalcular_conteos()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Conteos de observaciones y derivaciones corregidos en {tickets_corregidos} ticket(s)'
+        ))
+
+    def _conteo_real(self):
+        grupos = Ticket.objects.values('area_asignada_id', 'estado', 'nivel_critico').annotate(
+            asignados=Count('id', filter=Q(trabajador_asignado__isnull=False)),
+            sin_asignar=Count('id', filter=Q(trabajador_asignado__isnull=True)),
+        ).order_by()
+
+        conteo = {}
+        for grupo in grupos:
+            base = (grupo['area_asignada_id'], grupo['estado'], grupo['nivel_critico'])
+            if grupo['asignados']:
+                conteo[base + (True,)] = grupo['asignados']
+            if grupo['sin_asignar']:
+                conteo[base + (False,)] = grupo['sin_asignar']
+        return conteo
+
+    def _conteo_actual(self):
+        return {
+            (area_id, estado, nivel_critico, asignado): total
+            for area_id, estado, nivel_critico, asignado, total in ContadorTickets.objects.values_list(
+                'area_id', 'estado', 'nivel_critico', 'asignado', 'cantidad'
+            )
+            if total
+        }
+
+    def _diferencias(self, esperado, actual):
+        return {
+            clave: (esperado.get(clave, 0), actual.get(clave, 0))
+            for clave in set(esperado) | set(actual)
+            if esperado.get(clave, 0) != actual.get(clave, 0)
+        }
+
+    def _describir(self, clave):
+        area_id, estado, nivel_critico, asignado = clave
+        return f'área {area_id}, {estado}, {nivel_critico}, {"asignado" if asignado else "sin asignar"}'
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core import busqueda
+from core.models import Ticket, Observacion, TerminoBusqueda
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de tickets (FULLTEXT en MySQL, TerminoBusqueda en el resto)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Cantidad de tickets indexados por transacción (por defecto, 500)'
+        )
+
+    def handle(self, *args, **options):
+        if busqueda.usa_fulltext():
+            self._verificar_fulltext()
+            return
+
+        lote = options['lote']
+        ultimo_id = 0
+        indexados = 0
+        while True:
+            tickets = list(
+                Ticket.objects.filter(pk__gt=ultimo_id).order_by('pk')
+                .only('id', 'titulo', 'descripcion_problema')[:lote]
+            )
+            if not tickets:
+                break
+
+            observaciones = Observacion.objects.filter(
+                ticket_asociado__in=tickets
+            ).only('id', 'ticket_asociado_id', 'observacion_texto')
+
+            # Cada lote reemplaza sus términos en una transacción: la búsqueda sigue respondiendo
+            # durante la reconstrucción y un fallo deja los lotes restantes con el índice anterior
+            with transaction.atomic():
+                TerminoBusqueda.objects.filter(ticket_id__gt=ultimo_id, ticket_id__lte=tickets[-1].pk).delete()
+                TerminoBusqueda.indexar_tickets(tickets, observaciones)
+
+            ultimo_id = tickets[-1].pk
+            indexados += len(tickets)
+            self.stdout.write(f'  {indexados} tickets indexados...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Índice reconstruido: {indexados} tickets, {TerminoBusqueda.objects.count()} términos'
+        ))
+
+    def _verificar_fulltext(self):
+        """En MySQL el índice lo mantiene el motor: solo se crean los índices que falten"""
+        with connection.cursor() as cursor:
+            for tabla, nombre, columnas in busqueda.INDICES_FULLTEXT:
+                cursor.execute(
+                    'SELECT COUNT(*) FROM information_schema.STATISTICS '
+                    'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s',
+                    [tabla, nombre]
+                )
+                if cursor.fetchone()[0]:
+                    self.stdout.write(self.style.SUCCESS(f'✓ {nombre} existe en {tabla}'))
+                    continue
+                cursor.execute(busqueda.sql_crear_indice(tabla, nombre, columnas))
+                self.stdout.write(self.style.WARNING(f'✓ {nombre} creado en {tabla}'))
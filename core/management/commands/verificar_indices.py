@@ -0,0 +1,120 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection
+from core.models import Area, Ticket
+from core.routers import usar_replica
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre las consultas críticas de tickets y falla si alguna recorre la tabla completa'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--area', type=int, help='ID del área a usar en las consultas (por defecto, la primera)')
+        parser.add_argument('--usuario', type=int, help='ID del trabajador a usar en las consultas (por defecto, el primero sin ser superusuario)')
+
+    def handle(self, *args, **options):
+        # Solo lectura: con réplicas configuradas, los planes se piden a una de ellas
+        with usar_replica():
+            self._verificar(options)
+
+    def _verificar(self, options):
+        area = Area.objects.filter(pk=options['area']).first() if options['area'] else Area.objects.order_by('id').first()
+        # Por defecto, el primer trabajador que no es superusuario (para que la visibilidad filtre)
+        usuario = User.objects.filter(pk=options['usuario']).first() if options['usuario'] else (
+            User.objects.filter(is_superuser=False).order_by('id').first() or User.objects.order_by('id').first()
+        )
+
+        if not area or not usuario:
+            raise CommandError('Se necesita al menos un área y un usuario para construir las consultas')
+
+        self.stdout.write(f'Analizando planes de ejecución ({connection.vendor}) para el área "{area.nombre}"...')
+        if connection.vendor == 'mysql':
+            self.stdout.write('Nota: ejecute ANALYZE TABLE sobre core_ticket para que el optimizador use estadísticas actualizadas.')
+
+        verbosity = options['verbosity']
+        escaneos_completos = []
+        ordenamientos = []
+        for nombre, queryset in self._consultas(area, usuario).items():
+            plan = self._explain(queryset)
+            if verbosity >= 2:
+                self.stdout.write(plan)
+
+            if self._es_escaneo_completo(plan):
+                escaneos_completos.append(nombre)
+                self.stdout.write(self.style.ERROR(f'✗ {nombre}: recorre la tabla completa'))
+            elif nombre in self.ORDEN_POR_INDICE and self._ordena_en_memoria(plan):
+                ordenamientos.append(nombre)
+                self.stdout.write(self.style.ERROR(f'✗ {nombre}: ordena los resultados sin usar el índice'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {nombre}'))
+
+        if escaneos_completos or ordenamientos:
+            raise CommandError(
+                f'{len(escaneos_completos)} consulta(s) sin índice: {", ".join(escaneos_completos) or "-"}; '
+                f'{len(ordenamientos)} ordenamiento(s) sin índice: {", ".join(ordenamientos) or "-"}'
+            )
+
+        self.stdout.write(self.style.SUCCESS('\n¡Todas las consultas usan índices!'))
+
+    # Consultas cuyo ORDER BY debe resolverse con el índice (sin filesort)
+    ORDEN_POR_INDICE = {'cola sin asignar', 'lista: orden por prioridad', 'área por estado y prioridad'}
+
+    def _consultas(self, area, usuario):
+        """Querysets equivalentes a los de las vistas y el context processor"""
+        return {
+            'dashboard: conteo por estado': Ticket.objects.filter(estado=Ticket.Estado.ABIERTO).values('id'),
+            'dashboard: mis tickets': Ticket.objects.filter(trabajador_asignado=usuario).recientes()[:5],
+            'dashboard: carga de trabajo': Ticket.objects.filter(
+                trabajador_asignado=usuario,
+                estado__in=Ticket.ESTADOS_ACTIVOS
+            ).values('id'),
+            'dashboard: tickets del área': Ticket.objects.del_area(area).recientes()[:5],
+            'jefatura: estadísticas del área': Ticket.objects.del_area(area).filter(
+                estado=Ticket.Estado.ABIERTO
+            ).values('id'),
+            'cola sin asignar': Ticket.objects.cola_sin_asignar(area)[:20],
+            'lista: orden por prioridad': Ticket.objects.order_by('-prioridad', '-fecha_creacion')[:20],
+            'área por estado y prioridad': Ticket.objects.del_area(area).filter(
+                estado=Ticket.Estado.ABIERTO
+            ).order_by('-prioridad', '-fecha_creacion')[:20],
+            'contador sin asignar': Ticket.objects.sin_asignar(area).values('id'),
+            'lista: tickets visibles': Ticket.objects.visibles_para(usuario).values('id'),
+        }
+
+    def _explain(self, queryset):
+        if connection.vendor == 'mysql':
+            return queryset.explain(format='json')
+        return queryset.explain()
+
+    def _es_escaneo_completo(self, plan):
+        """Detecta un recorrido completo de core_ticket según el formato de cada motor"""
+        tabla = Ticket._meta.db_table
+
+        if connection.vendor == 'mysql':
+            return self._acceso_completo_mysql(json.loads(plan), tabla)
+
+        if connection.vendor == 'postgresql':
+            return f'Seq Scan on {tabla}' in plan
+
+        # SQLite: "SCAN core_ticket" sin índice es un recorrido completo
+        return any(
+            f'SCAN {tabla}' in linea and 'INDEX' not in linea
+            for linea in plan.splitlines()
+        )
+
+    def _ordena_en_memoria(self, plan):
+        if connection.vendor == 'mysql':
+            return '"using_filesort": true' in plan
+        if connection.vendor == 'postgresql':
+            return any(linea.strip().lstrip('->').strip().startswith('Sort') for linea in plan.splitlines())
+        return 'USE TEMP B-TREE FOR ORDER BY' in plan
+
+    def _acceso_completo_mysql(self, nodo, tabla):
+        if isinstance(nodo, dict):
+            if nodo.get('table_name') == tabla and nodo.get('access_type') == 'ALL':
+                return True
+            return any(self._acceso_completo_mysql(valor, tabla) for valor in nodo.values())
+        if isinstance(nodo, list):
+            return any(self._acceso_completo_mysql(valor, tabla) for valor in nodo)
+        return False
@@ -0,0 +1,218 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from .backends.mysql_pool.pool import estado_pools
+from .eventos import estado_broker
+
+# ===================================================================
+# MÉTRICAS DE REQUESTS (FORMATO PROMETHEUS)
+# Registro en memoria del proceso: latencia, consultas y tiempo de base
+# de datos, tamaño de respuesta y errores por vista (nombre de la URL).
+# Cada proceso del servidor expone sus propias métricas en /metrics
+# ===================================================================
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+BUCKETS_BYTES = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+
+# Etiqueta de las solicitudes que no coinciden con ninguna URL (404 de resolución)
+SIN_RUTA = 'sin_ruta'
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos (le=...)"""
+    __slots__ = ('buckets', 'conteos', 'suma', 'total')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        indice = bisect_left(self.buckets, valor)
+        if indice < len(self.conteos):
+            self.conteos[indice] += 1
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            yield f'{nombre}_bucket{_etiquetas(etiquetas, le=_numero(limite))} {acumulado}'
+        yield f'{nombre}_bucket{_etiquetas(etiquetas, le="+Inf")} {self.total}'
+        yield f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(self.suma)}'
+        yield f'{nombre}_count{_etiquetas(etiquetas)} {self.total}'
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _etiquetas(etiquetas, **extra):
+    pares = list(etiquetas) + list(extra.items())
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares) + '}'
+
+class RegistroMetricas:
+    """Métricas acumuladas desde el inicio del proceso; seguro entre hilos"""
+
+    # (nombre, tipo, ayuda)
+    DEFINICIONES = [
+        ('tda_http_solicitudes_total', 'counter', 'Solicitudes atendidas por vista, método y código'),
+        ('tda_http_duracion_segundos', 'histogram', 'Latencia de la solicitud hasta tener la respuesta'),
+        ('tda_http_respuesta_bytes', 'histogram', 'Tamaño del cuerpo de las respuestas no streaming'),
+        ('tda_db_consultas', 'histogram', 'Consultas SQL por solicitud'),
+        ('tda_db_duracion_segundos', 'histogram', 'Tiempo en la base de datos por solicitud'),
+        ('tda_http_errores_total', 'counter', 'Respuestas 5xx por vista y código'),
+        ('tda_http_excepciones_total', 'counter', 'Excepciones no controladas por vista y tipo'),
+        ('tda_http_solicitudes_en_curso', 'gauge', 'Solicitudes en proceso'),
+        ('tda_db_pool_conexiones_maximo', 'gauge', 'Conexiones que puede abrir el pool'),
+        ('tda_db_pool_conexiones_en_uso', 'gauge', 'Conexiones del pool entregadas a un request'),
+        ('tda_db_pool_conexiones_libres', 'gauge', 'Conexiones abiertas esperando un request'),
+        ('tda_db_pool_esperando', 'gauge', 'Requests esperando una conexión libre'),
+        ('tda_db_pool_conexiones_creadas_total', 'counter', 'Conexiones abiertas por el pool'),
+        ('tda_db_pool_conexiones_recicladas_total', 'counter', 'Conexiones cerradas por inactividad o antigüedad'),
+        ('tda_db_pool_conexiones_descartadas_total', 'counter', 'Conexiones cerradas por errores o ping fallido'),
+        ('tda_db_pool_esperas_agotadas_total', 'counter', 'Requests que no obtuvieron conexión a tiempo'),
+        ('tda_eventos_suscriptores', 'gauge', 'Conexiones escuchando la cola sin asignar'),
+        ('tda_eventos_publicados_total', 'counter', 'Eventos de la cola entregados a las conexiones del proceso'),
+        ('tda_eventos_descartados_total', 'counter', 'Eventos descartados por conexiones que no los consumen'),
+        ('tda_eventos_errores_total', 'counter', 'Eventos que no se pudieron publicar o recibir del broker'),
+    ]
+
+    # Métrica de cada valor de estado_pools()
+    METRICAS_POOL = {
+        'maximo': 'tda_db_pool_conexiones_maximo',
+        'en_uso': 'tda_db_pool_conexiones_en_uso',
+        'libres': 'tda_db_pool_conexiones_libres',
+        'esperando': 'tda_db_pool_esperando',
+        'creadas': 'tda_db_pool_conexiones_creadas_total',
+        'recicladas': 'tda_db_pool_conexiones_recicladas_total',
+        'descartadas': 'tda_db_pool_conexiones_descartadas_total',
+        'esperas_agotadas': 'tda_db_pool_esperas_agotadas_total',
+    }
+
+    # Métrica de cada valor de estado_broker()
+    METRICAS_EVENTOS = {
+        'suscriptores': 'tda_eventos_suscriptores',
+        'publicados': 'tda_eventos_publicados_total',
+        'descartados': 'tda_eventos_descartados_total',
+        'errores': 'tda_eventos_errores_total',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._solicitudes = defaultdict(int)
+            self._duracion = {}
+            self._bytes = {}
+            self._consultas = {}
+            self._tiempo_db = {}
+            self._errores = defaultdict(int)
+            self._excepciones = defaultdict(int)
+            self._en_curso = 0
+
+    def _histograma(self, tabla, clave, buckets):
+        histograma = tabla.get(clave)
+        if histograma is None:
+            histograma = tabla[clave] = Histograma(buckets)
+        return histograma
+
+    def iniciar(self):
+        with self._lock:
+            self._en_curso += 1
+
+    def registrar(self, vista, metodo, codigo, duracion, consultas, tiempo_db, tamano=None):
+        """Registra una solicitud terminada; tamano es None en respuestas streaming"""
+        with self._lock:
+            self._en_curso -= 1
+            self._solicitudes[(vista, metodo, codigo)] += 1
+            self._histograma(self._duracion, (vista, metodo), BUCKETS_SEGUNDOS).observar(duracion)
+            self._histograma(self._consultas, (vista,), BUCKETS_CONSULTAS).observar(consultas)
+            self._histograma(self._tiempo_db, (vista,), BUCKETS_SEGUNDOS).observar(tiempo_db)
+            if tamano is not None:
+                self._histograma(self._bytes, (vista,), BUCKETS_BYTES).observar(tamano)
+            if codigo >= 500:
+                self._errores[(vista, codigo)] += 1
+
+    def registrar_excepcion(self, vista, tipo):
+        with self._lock:
+            self._excepciones[(vista, tipo)] += 1
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)"""
+        pools = estado_pools()
+        broker = estado_broker()
+        with self._lock:
+            series = {
+                'tda_http_solicitudes_total': [
+                    (('vista', v), ('metodo', m), ('codigo', c), valor)
+                    for (v, m, c), valor in sorted(self._solicitudes.items())
+                ],
+                'tda_http_duracion_segundos': [
+                    (('vista', v), ('metodo', m), h) for (v, m), h in sorted(self._duracion.items())
+                ],
+                'tda_http_respuesta_bytes': [(('vista', v), h) for (v,), h in sorted(self._bytes.items())],
+                'tda_db_consultas': [(('vista', v), h) for (v,), h in sorted(self._consultas.items())],
+                'tda_db_duracion_segundos': [(('vista', v), h) for (v,), h in sorted(self._tiempo_db.items())],
+                'tda_http_errores_total': [
+                    (('vista', v), ('codigo', c), valor) for (v, c), valor in sorted(self._errores.items())
+                ],
+                'tda_http_excepciones_total': [
+                    (('vista', v), ('tipo', t), valor) for (v, t), valor in sorted(self._excepciones.items())
+                ],
+                'tda_http_solicitudes_en_curso': [(self._en_curso,)],
+            }
+            for clave, nombre in self.METRICAS_POOL.items():
+                series[nombre] = [(('base', alias), estado[clave]) for alias, estado in pools.items()]
+            for clave, nombre in self.METRICAS_EVENTOS.items():
+                series[nombre] = [(broker[clave],)] if broker else []
+
+            lineas = []
+            for nombre, tipo, ayuda in self.DEFINICIONES:
+                lineas.append(f'# HELP {nombre} {ayuda}')
+                lineas.append(f'# TYPE {nombre} {tipo}')
+                for serie in series[nombre]:
+                    *etiquetas, valor = serie
+                    if isinstance(valor, Histograma):
+                        lineas.extend(valor.lineas(nombre, etiquetas))
+                    else:
+                        lineas.append(f'{nombre}{_etiquetas(etiquetas)} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+REGISTRO = RegistroMetricas()
+
+class ContadorConsultas:
+    """execute_wrapper de Django que cuenta las consultas y su duración (sin necesitar DEBUG).
+    Las vistas async lo comparten entre los hilos de sus consultas paralelas."""
+    __slots__ = ('consultas', 'duracion', '_lock')
+
+    def __init__(self):
+        self.consultas = 0
+        self.duracion = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                self.consultas += 1
+                self.duracion += duracion
+
+def nombre_vista(request):
+    """Nombre de la URL resuelta (con su namespace), acotado para no crear series sin límite"""
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return SIN_RUTA
+    return resolver_match.view_name or SIN_RUTA
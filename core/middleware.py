@@ -0,0 +1,95 @@
+import time
+
+from django.utils.functional import SimpleLazyObject
+
+from . import perfilado, routers
+from .acceso import contexto_acceso
+from .asincronas import envolver_consultas
+from .metricas import REGISTRO, ContadorConsultas, nombre_vista
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+class ContextoAccesoMiddleware:
+    """Expone request.acceso: perfil, área y jefaturas activas del usuario.
+
+    Se resuelve la primera vez que se usa (vista, template o context processor)
+    y se comparte con los helpers de permisos que reciben request.user.
+    Debe ir después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.acceso = SimpleLazyObject(lambda: contexto_acceso(request.user))
+        return self.get_response(request)
+
+class FijacionPrimariaMiddleware:
+    """Después de una escritura exitosa del usuario (POST, PUT, PATCH o DELETE) fija su sesión
+    a la base primaria por DB_FIJACION_PRIMARIA_SEGUNDOS: las vistas con @lectura_replica dejan
+    de leer de la réplica hasta que esta alcance los cambios. Ver core/routers.py.
+
+    Debe ir después de SessionMiddleware y AuthenticationMiddleware. Sin réplicas no hace nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in METODOS_SEGUROS
+            and response.status_code < 400
+            and routers.replicas()
+            and request.user.is_authenticated
+        ):
+            routers.fijar_primaria(request)
+        return response
+
+class MetricasMiddleware:
+    """Registra latencia, consultas y tiempo de base de datos, tamaño de respuesta y errores
+    de cada solicitud, agrupados por nombre de URL (ver /metrics).
+
+    Debe ir primero en MIDDLEWARE para medir también al resto de los middlewares.
+    En respuestas streaming la latencia llega hasta los encabezados y no se mide el tamaño.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        contador = ContadorConsultas()
+        REGISTRO.iniciar()
+        inicio = time.perf_counter()
+        codigo = 500
+        tamano = None
+        try:
+            with envolver_consultas(contador):
+                response = self.get_response(request)
+            codigo = response.status_code
+            if not response.streaming:
+                tamano = len(response.content)
+            return response
+        finally:
+            REGISTRO.registrar(
+                nombre_vista(request), request.method, codigo,
+                time.perf_counter() - inicio, contador.consultas, contador.duracion, tamano
+            )
+
+    def process_exception(self, request, exception):
+        REGISTRO.registrar_excepcion(nombre_vista(request), type(exception).__name__)
+
+class PerfiladoMiddleware:
+    """Perfila la solicitud (cProfile + SQL con EXPLAIN de las lentas) cuando un usuario staff
+    lo pide con ?perfilar=1 o X-Perfilar: 1. Ver core/perfilado.py.
+
+    Debe ir después de AuthenticationMiddleware; cubre la vista, los templates y los context processors.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if perfilado.solicitado(request):
+            return perfilado.perfilar(request, self.get_response)
+        return self.get_response(request)
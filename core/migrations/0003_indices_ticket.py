@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_historialusuario_grupo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['area_asignada', 'trabajador_asignado', '-nivel_critico', '-fecha_creacion', 'estado'], name='ticket_cola_area_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['area_asignada', '-fecha_creacion'], name='ticket_area_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['area_asignada', 'estado', 'nivel_critico'], name='ticket_area_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['estado'], name='ticket_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['trabajador_asignado', 'estado'], name='ticket_asignado_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['trabajador_asignado', '-fecha_creacion'], name='ticket_asignado_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:21
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def poblar_contadores(apps, schema_editor):
+    Ticket = apps.get_model('core', 'Ticket')
+    ContadorTickets = apps.get_model('core', 'ContadorTickets')
+
+    grupos = Ticket.objects.values('area_asignada_id', 'estado', 'nivel_critico').annotate(
+        asignados=Count('id', filter=Q(trabajador_asignado__isnull=False)),
+        sin_asignar=Count('id', filter=Q(trabajador_asignado__isnull=True)),
+    ).order_by()
+
+    contadores = []
+    for grupo in grupos:
+        for asignado, total in ((True, grupo['asignados']), (False, grupo['sin_asignar'])):
+            if total:
+                contadores.append(ContadorTickets(
+                    area_id=grupo['area_asignada_id'],
+                    estado=grupo['estado'],
+                    nivel_critico=grupo['nivel_critico'],
+                    asignado=asignado,
+                    cantidad=total,
+                ))
+    ContadorTickets.objects.bulk_create(contadores, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_indices_ticket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorTickets',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('ABIERTO', 'Abierto'), ('EN_PROCESO', 'En Proceso'), ('RESUELTO', 'Resuelto'), ('CERRADO', 'Cerrado'), ('NO_APLICA', 'No Aplica')], max_length=50)),
+                ('nivel_critico', models.CharField(choices=[('BAJO', 'Bajo'), ('MEDIO', 'Medio'), ('ALTO', 'Alto'), ('CRITICO', 'Crítico')], max_length=50)),
+                ('asignado', models.BooleanField()),
+                ('cantidad', models.IntegerField(default=0)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_tickets', to='core.area')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='contadortickets',
+            constraint=models.UniqueConstraint(fields=('area', 'estado', 'nivel_critico', 'asignado'), name='contador_tickets_unico'),
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:25
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Copia del tokenizador de core.busqueda al crear esta migración: la migración histórica no
+# debe cambiar (ni fallar) si el módulo cambia después
+PESO_TITULO = 3
+PESO_DESCRIPCION = 1
+PESO_OBSERVACION = 1
+LARGO_MINIMO_TERMINO = 2
+LARGO_MAXIMO_TERMINO = 50
+PALABRAS_VACIAS = {
+    'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los', 'no',
+    'para', 'por', 'que', 'se', 'su', 'un', 'una', 'y',
+}
+INDICES_FULLTEXT = [
+    ('core_ticket', 'ticket_busqueda_ft', ['titulo', 'descripcion_problema']),
+    ('core_observacion', 'observacion_busqueda_ft', ['observacion_texto']),
+]
+
+TAMANO_LOTE = 1000
+
+
+def terminos_ponderados(*textos_con_peso):
+    pesos = Counter()
+    for texto, peso in textos_con_peso:
+        texto = unicodedata.normalize('NFKD', texto or '')
+        texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+        for termino in re.findall(r'\w+', texto):
+            if len(termino) >= LARGO_MINIMO_TERMINO and termino not in PALABRAS_VACIAS:
+                pesos[termino[:LARGO_MAXIMO_TERMINO]] += peso
+    return pesos
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    """MySQL: índices FULLTEXT. Resto de motores: poblar el índice invertido"""
+    if schema_editor.connection.vendor == 'mysql':
+        for tabla, nombre, columnas in INDICES_FULLTEXT:
+            schema_editor.execute(f'ALTER TABLE {tabla} ADD FULLTEXT INDEX {nombre} ({", ".join(columnas)})')
+        return
+
+    Ticket = apps.get_model('core', 'Ticket')
+    Observacion = apps.get_model('core', 'Observacion')
+    TerminoBusqueda = apps.get_model('core', 'TerminoBusqueda')
+
+    def filas():
+        tickets = Ticket.objects.values_list('id', 'titulo', 'descripcion_problema')
+        for ticket_id, titulo, descripcion in tickets.iterator(chunk_size=TAMANO_LOTE):
+            pesos = terminos_ponderados((titulo, PESO_TITULO), (descripcion, PESO_DESCRIPCION))
+            for termino, peso in pesos.items():
+                yield TerminoBusqueda(ticket_id=ticket_id, termino=termino, peso=peso)
+        observaciones = Observacion.objects.values_list('id', 'ticket_asociado_id', 'observacion_texto')
+        for observacion_id, ticket_id, texto in observaciones.iterator(chunk_size=TAMANO_LOTE):
+            for termino, peso in terminos_ponderados((texto, PESO_OBSERVACION)).items():
+                yield TerminoBusqueda(ticket_id=ticket_id, observacion_id=observacion_id, termino=termino, peso=peso)
+
+    # Se inserta por lotes para no acumular en memoria los términos de todos los tickets
+    lote = []
+    for fila in filas():
+        lote.append(fila)
+        if len(lote) >= TAMANO_LOTE:
+            TerminoBusqueda.objects.bulk_create(lote)
+            lote = []
+    TerminoBusqueda.objects.bulk_create(lote)
+
+
+def eliminar_indices_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        for tabla, nombre, _ in INDICES_FULLTEXT:
+            schema_editor.execute(f'ALTER TABLE {tabla} DROP INDEX {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_contadortickets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=50)),
+                ('peso', models.PositiveIntegerField(default=1)),
+                ('observacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='core.observacion')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='core.ticket')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['termino', 'ticket'], name='termino_busqueda_idx')],
+            },
+        ),
+        migrations.RunPython(crear_indices_busqueda, eliminar_indices_busqueda),
+    ]
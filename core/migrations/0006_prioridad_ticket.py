@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+PRIORIDADES = {'BAJO': 1, 'MEDIO': 2, 'ALTO': 3, 'CRITICO': 4}
+
+
+def poblar_prioridad(apps, schema_editor):
+    Ticket = apps.get_model('core', 'Ticket')
+    for nivel_critico, prioridad in PRIORIDADES.items():
+        Ticket.objects.filter(nivel_critico=nivel_critico).update(prioridad=prioridad)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_terminobusqueda'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ticket',
+            name='ticket_cola_area_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='ticket',
+            name='ticket_area_estado_idx',
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='prioridad',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        # Antes de crear los índices, para no mantenerlos durante el backfill
+        migrations.RunPython(poblar_prioridad, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['area_asignada', 'trabajador_asignado', '-prioridad', '-fecha_creacion', 'estado'], name='ticket_cola_prioridad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['area_asignada', 'estado', '-prioridad', '-fecha_creacion'], name='ticket_area_estado_prio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-prioridad', '-fecha_creacion'], name='ticket_prioridad_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:30
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def poblar_conteos(apps, schema_editor):
+    Ticket = apps.get_model('core', 'Ticket')
+    Observacion = apps.get_model('core', 'Observacion')
+    Derivacion = apps.get_model('core', 'Derivacion')
+
+    def conteo(modelo, campo):
+        filas = modelo.objects.filter(**{campo: OuterRef('pk')}).values(campo).annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(filas, output_field=IntegerField()), 0)
+
+    Ticket.objects.update(
+        observaciones_count=conteo(Observacion, 'ticket_asociado'),
+        derivaciones_count=conteo(Derivacion, 'ticket'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_prioridad_ticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='derivaciones_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='observaciones_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(poblar_conteos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_conteos_ticket'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='derivacion',
+            index=models.Index(fields=['ticket', '-fecha_derivacion'], name='derivacion_ticket_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observacion',
+            index=models.Index(fields=['ticket_asociado', '-fecha_hora_observacion'], name='observacion_ticket_fecha_idx'),
+        ),
+    ]
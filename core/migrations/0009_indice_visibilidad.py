@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_indices_timeline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['trabajador_creador', '-fecha_creacion'], name='ticket_creador_fecha_idx'),
+        ),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+from . import busqueda, cache_tickets, eventos
 
 # ===================================================================
 # MODELOS DE ORGANIZACIÓN Y USUARIOS
@@ -40,12 +45,179 @@ class Jefatura(models.Model):
 # MODELOS DE GESTIÓN DE TICKETS
 # ===================================================================
 
+class TicketQuerySet(models.QuerySet):
+    """Consultas reutilizables sobre tickets, alineadas con los índices de Ticket.Meta"""
+
+    def del_area(self, area):
+        """Tickets asignados a un área"""
+        return self.filter(area_asignada=area)
+
+    def sin_asignar(self, area):
+        """Tickets activos (abiertos o en proceso) del área sin trabajador asignado"""
+        return self.filter(
+            area_asignada=area,
+            trabajador_asignado__isnull=True,
+            estado__in=Ticket.ESTADOS_ACTIVOS
+        )
+
+    def cola_sin_asignar(self, area):
+        """Cola de triage del área: sin asignar, de mayor a menor prioridad y luego más recientes"""
+        return self.sin_asignar(area).order_by('-prioridad', '-fecha_creacion')
+
+    def recientes(self):
+        return self.order_by('-fecha_creacion')
+
+    def visibles_para(self, user):
+        """Tickets que el usuario puede ver: creados por él, asignados a él, de su área
+        o de las áreas que dirige. Un solo predicado OR sobre columnas indexadas;
+        los superusuarios ven todos"""
+        if not user.is_authenticated:
+            return self.none()
+        if user.is_superuser:
+            return self
+
+        from .acceso import contexto_acceso
+        acceso = contexto_acceso(user)
+
+        condicion = Q(trabajador_creador_id=user.id) | Q(trabajador_asignado_id=user.id)
+        areas = {area.id for area in acceso.areas_jefatura}
+        if acceso.area_id:
+            areas.add(acceso.area_id)
+        if areas:
+            condicion |= Q(area_asignada_id__in=sorted(areas))
+        return self.filter(condicion)
+
+    def _conteos_reales(self):
+        def contar(modelo, campo):
+            filas = modelo.objects.filter(**{campo: OuterRef('pk')}).values(campo).annotate(
+                total=Count('id')
+            ).values('total')
+            return Coalesce(Subquery(filas, output_field=models.IntegerField()), 0)
+
+        return {
+            'observaciones_count': contar(Observacion, 'ticket_asociado'),
+            'derivaciones_count': contar(Derivacion, 'ticket'),
+        }
+
+    def con_conteos_desincronizados(self):
+        """Tickets cuyos observaciones_count / derivaciones_count no coinciden con sus filas"""
+        reales = self._conteos_reales()
+        return self.annotate(
+            observaciones_reales=reales['observaciones_count'],
+            derivaciones_reales=reales['derivaciones_count'],
+        ).exclude(
+            observaciones_count=F('observaciones_reales'),
+            derivaciones_count=F('derivaciones_reales'),
+        )
+
+    def recalcular_conteos(self):
+        """Recalcula observaciones_count y derivaciones_count en un único UPDATE"""
+        return self.update(**self._conteos_reales())
+
+    def buscar(self, texto):
+        """Tickets que coinciden con el texto (título, descripción u observaciones),
+        anotados con 'relevancia' y ordenados de mayor a menor"""
+        texto = texto.strip()
+        if busqueda.usa_fulltext(self.db):
+            candidatos, relevancia = self._coincidencias_fulltext(texto)
+        else:
+            candidatos, relevancia = self._coincidencias_indice(texto)
+
+        # Búsqueda por número de ticket: coincidencia exacta, siempre primero
+        if texto.isdigit():
+            candidatos.append(int(texto))
+            relevancia = Case(
+                When(pk=int(texto), then=Value(1000000.0)),
+                default=relevancia,
+                output_field=FloatField()
+            )
+
+        return self.filter(pk__in=candidatos).annotate(
+            relevancia=relevancia
+        ).order_by('-relevancia', '-fecha_creacion')
+
+    def _coincidencias_fulltext(self, texto):
+        """MySQL: MATCH ... AGAINST sobre los índices FULLTEXT de tickets y observaciones"""
+        limite = busqueda.limite_resultados()
+        match_ticket = RawSQL(
+            'MATCH (titulo, descripcion_problema) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+            [texto], output_field=FloatField()
+        )
+        match_observacion = RawSQL(
+            'MATCH (observacion_texto) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+            [texto], output_field=FloatField()
+        )
+
+        # Cada consulta de candidatos usa su propio índice FULLTEXT, restringida a los tickets del
+        # queryset (área, estado, visibilidad) antes de ordenar y limitar
+        filtrados = self.values('pk')
+        candidatos = list(
+            Ticket.objects.using(self.db).filter(pk__in=filtrados).annotate(puntaje=match_ticket)
+            .filter(puntaje__gt=0).order_by('-puntaje').values_list('pk', flat=True)[:limite]
+        )
+        candidatos += list(
+            Observacion.objects.using(self.db).filter(ticket_asociado__in=filtrados).annotate(puntaje=match_observacion)
+            .filter(puntaje__gt=0).order_by('-puntaje').values_list('ticket_asociado_id', flat=True)[:limite]
+        )
+
+        mejor_observacion = Observacion.objects.filter(
+            ticket_asociado=OuterRef('pk')
+        ).annotate(puntaje=match_observacion).order_by('-puntaje').values('puntaje')[:1]
+        relevancia = match_ticket + Coalesce(Subquery(mejor_observacion), Value(0.0))
+        return candidatos, relevancia
+
+    def _coincidencias_indice(self, texto):
+        """Resto de los motores: suma de pesos de los términos en TerminoBusqueda"""
+        terminos = list(busqueda.terminos_ponderados((texto, 1)))
+        coincidencias = TerminoBusqueda.objects.using(self.db).filter(
+            termino__in=terminos, ticket__in=self.values('pk')
+        )
+
+        candidatos = list(
+            coincidencias.values('ticket_id').annotate(puntaje=Sum('peso'))
+            .order_by('-puntaje').values_list('ticket_id', flat=True)[:busqueda.limite_resultados()]
+        )
+
+        puntaje = TerminoBusqueda.objects.filter(
+            ticket=OuterRef('pk'), termino__in=terminos
+        ).values('ticket').annotate(puntaje=Sum('peso')).values('puntaje')
+        relevancia = Coalesce(Subquery(puntaje, output_field=FloatField()), Value(0.0))
+        return candidatos, relevancia
+
+class ClienteQuerySet(models.QuerySet):
+    # Caracteres mínimos para buscar y máximo de resultados del autocompletado
+    LARGO_MINIMO_AUTOCOMPLETAR = 2
+    LIMITE_AUTOCOMPLETAR = 20
+
+    def autocompletar(self, texto, limite=LIMITE_AUTOCOMPLETAR):
+        """Clientes cuyo nombre o correo empieza con el texto, ordenados por nombre.
+        Dos búsquedas por prefijo acotadas (índices de nombre y de correo) en lugar de un OR
+        que obligaría a recorrer la tabla"""
+        texto = (texto or '').strip()
+        if len(texto) < self.LARGO_MINIMO_AUTOCOMPLETAR:
+            return []
+
+        campos = ('id', 'nombre', 'correo_electronico')
+        por_nombre = self.filter(nombre__istartswith=texto).order_by('nombre', 'id').values(*campos)[:limite]
+        por_correo = self.filter(correo_electronico__istartswith=texto).order_by('correo_electronico').values(*campos)[:limite]
+
+        clientes = {cliente['id']: cliente for cliente in [*por_nombre, *por_correo]}
+        return sorted(clientes.values(), key=lambda cliente: (cliente['nombre'].lower(), cliente['id']))[:limite]
+
 class Cliente(models.Model):
     nombre = models.CharField(max_length=100)
     telefono = models.CharField(max_length=25, null=True, blank=True)
     correo_electronico = models.EmailField(max_length=255, unique=True)
     fecha_registro = models.DateTimeField(auto_now_add=True)
 
+    objects = ClienteQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Autocompletado por prefijo del nombre (el correo ya tiene índice por ser único)
+            models.Index(fields=['nombre'], name='cliente_nombre_idx'),
+        ]
+
     def __str__(self):
         return self.nombre
 
@@ -67,6 +239,8 @@ class Ticket(models.Model):
     estado = models.CharField(max_length=50, choices=Estado.choices, default=Estado.ABIERTO)
     descripcion_problema = models.TextField()
     nivel_critico = models.CharField(max_length=50, choices=NivelCritico.choices)
+    # Rango numérico de nivel_critico (mayor = más crítico), sincronizado en save()
+    prioridad = models.PositiveSmallIntegerField(default=0, editable=False)
     tipo_problema = models.CharField(max_length=100)
     cliente_solicitante = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name='tickets')
     area_asignada = models.ForeignKey(Area, on_delete=models.PROTECT, related_name='tickets_en_area')
@@ -76,19 +250,241 @@ class Ticket(models.Model):
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     fecha_resolucion = models.DateTimeField(null=True, blank=True)
     fecha_cierre = models.DateTimeField(null=True, blank=True)
+    # Mantenidos por Observacion y Derivacion, para no consultar sus filas en las listas
+    observaciones_count = models.PositiveIntegerField(default=0, editable=False)
+    derivaciones_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TicketQuerySet.as_manager()
+
+    # Estados que cuentan como trabajo pendiente (colas y carga de trabajo)
+    ESTADOS_ACTIVOS = [Estado.ABIERTO, Estado.EN_PROCESO]
+
+    # Valor de 'prioridad' para cada nivel crítico
+    PRIORIDADES = {
+        NivelCritico.BAJO: 1,
+        NivelCritico.MEDIO: 2,
+        NivelCritico.ALTO: 3,
+        NivelCritico.CRITICO: 4,
+    }
+
+    class Meta:
+        indexes = [
+            # Cola sin asignar por área (dashboard, jefatura, tickets_sin_asignar): el índice entrega
+            # el orden de triage y el estado se evalúa dentro del mismo índice
+            models.Index(
+                fields=['area_asignada', 'trabajador_asignado', '-prioridad', '-fecha_creacion', 'estado'],
+                name='ticket_cola_prioridad_idx'
+            ),
+            # Tickets recientes del área
+            models.Index(fields=['area_asignada', '-fecha_creacion'], name='ticket_area_fecha_idx'),
+            # Tickets del área por estado, de mayor a menor prioridad
+            models.Index(
+                fields=['area_asignada', 'estado', '-prioridad', '-fecha_creacion'],
+                name='ticket_area_estado_prio_idx'
+            ),
+            # Lista de tickets ordenada por prioridad
+            models.Index(fields=['-prioridad', '-fecha_creacion'], name='ticket_prioridad_idx'),
+            # Estadísticas globales por estado
+            models.Index(fields=['estado'], name='ticket_estado_idx'),
+            # Mis tickets y carga de trabajo por trabajador
+            models.Index(fields=['trabajador_asignado', 'estado'], name='ticket_asignado_estado_idx'),
+            models.Index(fields=['trabajador_asignado', '-fecha_creacion'], name='ticket_asignado_fecha_idx'),
+            # Visibilidad por creador (rama del predicado de visibles_para)
+            models.Index(fields=['trabajador_creador', '-fecha_creacion'], name='ticket_creador_fecha_idx'),
+        ]
 
     def __str__(self):
         return f'Ticket #{self.id}: {self.titulo}'
 
+    # Campos que determinan la fila de ContadorTickets a la que pertenece el ticket
+    CAMPOS_CONTADOR = ['area_asignada_id', 'estado', 'nivel_critico', 'trabajador_asignado_id']
+
+    # Conteos que solo se modifican con UPDATE atómicos (ver incrementar_conteo)
+    CAMPOS_CONTEO = ['observaciones_count', 'derivaciones_count']
+
+    # Campos propios del ticket incluidos en la búsqueda de texto completo
+    CAMPOS_BUSQUEDA = ['titulo', 'descripcion_problema']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordar la clave con la que se cargó para mover el contador al guardar
+        if all(campo in instance.__dict__ for campo in cls.CAMPOS_CONTADOR):
+            instance._clave_contador = instance.clave_contador()
+        # Y el texto indexado, para reindexar solo si cambia
+        if all(campo in instance.__dict__ for campo in cls.CAMPOS_BUSQUEDA):
+            instance._texto_busqueda = instance.texto_busqueda()
+        return instance
+
+    def clave_contador(self):
+        return ContadorTickets.clave(
+            self.area_asignada_id, self.estado, self.nivel_critico, self.trabajador_asignado_id
+        )
+
+    def _clave_contador_anterior(self):
+        """Clave con la que el ticket está contado actualmente (None si es nuevo)"""
+        if self._state.adding:
+            return None
+        clave = self.__dict__.get('_clave_contador')
+        if clave is None:
+            # Instancia cargada con campos diferidos: leer la clave desde la base de datos
+            fila = Ticket.objects.filter(pk=self.pk).values_list(*self.CAMPOS_CONTADOR).first()
+            clave = ContadorTickets.clave(*fila) if fila else None
+        return clave
+
+    def texto_busqueda(self):
+        return (self.titulo, self.descripcion_problema)
+
+    @classmethod
+    def incrementar_conteo(cls, ticket_id, campo, delta):
+        cls.objects.filter(pk=ticket_id).update(**{campo: F(campo) + delta})
+
+    def _campos_a_guardar(self):
+        """Campos cargados, sin los conteos: una instancia desactualizada no los pisa"""
+        diferidos = self.get_deferred_fields()
+        return [
+            campo.name for campo in self._meta.concrete_fields
+            if not campo.primary_key
+            and campo.name not in self.CAMPOS_CONTEO
+            and campo.attname not in diferidos
+        ]
+
+    def save(self, *args, **kwargs):
+        self.prioridad = self.PRIORIDADES.get(self.nivel_critico, 0)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not args and not self._state.adding:
+            # Guardado completo de un ticket existente: todos los campos cargados salvo los conteos
+            kwargs['update_fields'] = self._campos_a_guardar()
+        elif update_fields is not None and 'nivel_critico' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'prioridad'}
+        clave_anterior = self._clave_contador_anterior()
+        texto_anterior = None if self._state.adding else self.__dict__.get('_texto_busqueda')
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            ContadorTickets.mover(clave_anterior, self.clave_contador(), ticket_id=self.pk)
+            if self.texto_busqueda() != texto_anterior:
+                TerminoBusqueda.indexar_ticket(self)
+        self._clave_contador = self.clave_contador()
+        self._texto_busqueda = self.texto_busqueda()
+
+    def delete(self, *args, **kwargs):
+        clave_anterior = self._clave_contador_anterior()
+        with transaction.atomic(using=kwargs.get('using')):
+            resultado = super().delete(*args, **kwargs)
+            ContadorTickets.mover(clave_anterior, None, ticket_id=self.pk)
+        return resultado
+
+class ContadorTickets(models.Model):
+    """Modelo de lectura con la cantidad de tickets por área, estado, criticidad y asignación.
+
+    Se mantiene en la misma transacción que Ticket.save()/delete(). Las escrituras masivas
+    (QuerySet.update, bulk_create) deben aplicar sus deltas con ContadorTickets.aplicar() o
+    reconstruirse con el comando recontar_contadores.
+    """
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='contadores_tickets')
+    estado = models.CharField(max_length=50, choices=Ticket.Estado.choices)
+    nivel_critico = models.CharField(max_length=50, choices=Ticket.NivelCritico.choices)
+    asignado = models.BooleanField()
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['area', 'estado', 'nivel_critico', 'asignado'],
+                name='contador_tickets_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.area_id}/{self.estado}/{self.nivel_critico}/{"asignado" if self.asignado else "sin asignar"}: {self.cantidad}'
+
+    @staticmethod
+    def clave(area_id, estado, nivel_critico, trabajador_asignado_id):
+        return (area_id, estado, nivel_critico, trabajador_asignado_id is not None)
+
+    @classmethod
+    def mover(cls, clave_anterior, clave_nueva, ticket_id=None):
+        """Mueve un ticket de una fila del contador a otra"""
+        if clave_anterior == clave_nueva:
+            return
+        deltas = {}
+        if clave_anterior is not None:
+            deltas[clave_anterior] = -1
+        if clave_nueva is not None:
+            deltas[clave_nueva] = 1
+        cls.aplicar(deltas, evento=(eventos.tipo_cambio(clave_anterior, clave_nueva), ticket_id))
+
+    @classmethod
+    def sin_asignar(cls, area_id):
+        """Tickets activos sin asignar del área, cacheado hasta el próximo cambio en su cola"""
+        return cache_tickets.obtener_sin_asignar(
+            area_id,
+            lambda: cls.objects.filter(
+                area_id=area_id,
+                asignado=False,
+                estado__in=Ticket.ESTADOS_ACTIVOS
+            ).aggregate(total=models.Sum('cantidad'))['total'] or 0
+        )
+
+    @classmethod
+    def aplicar(cls, deltas, evento=None):
+        """Aplica incrementos {clave: delta} con UPDATE atómicos, creando las filas que falten.
+        Las áreas cuya cola sin asignar cambió reciben el evento (tipo, ticket_id) al confirmarse."""
+        areas_cola_modificada = set()
+        for (area_id, estado, nivel_critico, asignado), delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            if not asignado and estado in Ticket.ESTADOS_ACTIVOS:
+                areas_cola_modificada.add(area_id)
+            filtro = {
+                'area_id': area_id,
+                'estado': estado,
+                'nivel_critico': nivel_critico,
+                'asignado': asignado,
+            }
+            if cls.objects.filter(**filtro).update(cantidad=F('cantidad') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(cantidad=delta, **filtro)
+            except IntegrityError:
+                # Otra transacción creó la fila entre el UPDATE y el INSERT
+                cls.objects.filter(**filtro).update(cantidad=F('cantidad') + delta)
+
+        cache_tickets.invalidar_sin_asignar(areas_cola_modificada)
+        # Después de invalidar el cache: el evento lleva el total ya actualizado
+        tipo, ticket_id = evento or (eventos.ACTUALIZADO, None)
+        eventos.publicar_cola(areas_cola_modificada, tipo, ticket_id, cls.sin_asignar)
+
 class Observacion(models.Model):
     ticket_asociado = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='observaciones')
     observacion_texto = models.TextField()
     fecha_hora_observacion = models.DateTimeField(auto_now_add=True)
     autor_trabajador = models.ForeignKey(User, on_delete=models.PROTECT, related_name='observaciones_realizadas')
 
+    class Meta:
+        indexes = [
+            # Timeline del ticket
+            models.Index(fields=['ticket_asociado', '-fecha_hora_observacion'], name='observacion_ticket_fecha_idx'),
+        ]
+
     def __str__(self):
         return f'Observación en Ticket #{self.ticket_asociado.id} por {self.autor_trabajador.username}'
 
+    def save(self, *args, **kwargs):
+        nueva = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if nueva:
+                Ticket.incrementar_conteo(self.ticket_asociado_id, 'observaciones_count', 1)
+            TerminoBusqueda.indexar_observacion(self)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            resultado = super().delete(*args, **kwargs)
+            Ticket.incrementar_conteo(self.ticket_asociado_id, 'observaciones_count', -1)
+        return resultado
+
 class Derivacion(models.Model):
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='derivaciones')
     fecha_derivacion = models.DateTimeField(auto_now_add=True)
@@ -97,8 +493,93 @@ class Derivacion(models.Model):
     area_destino = models.ForeignKey(Area, on_delete=models.PROTECT, related_name='derivaciones_entrantes')
     motivo_derivacion = models.TextField()
 
+    class Meta:
+        indexes = [
+            # Timeline del ticket
+            models.Index(fields=['ticket', '-fecha_derivacion'], name='derivacion_ticket_fecha_idx'),
+        ]
+
     def __str__(self):
         return f'Derivación de Ticket #{self.ticket.id} de {self.area_origen.nombre} a {self.area_destino.nombre}'
+
+    def save(self, *args, **kwargs):
+        nueva = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if nueva:
+                Ticket.incrementar_conteo(self.ticket_id, 'derivaciones_count', 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            resultado = super().delete(*args, **kwargs)
+            Ticket.incrementar_conteo(self.ticket_id, 'derivaciones_count', -1)
+        return resultado
+
+class TerminoBusqueda(models.Model):
+    """Índice invertido para la búsqueda de tickets en motores sin FULLTEXT (SQLite, PostgreSQL).
+
+    En MySQL la búsqueda usa índices FULLTEXT y esta tabla queda vacía. Se mantiene desde
+    Ticket.save() y Observacion.save(); las escrituras masivas deben llamar a indexar_tickets()
+    o ejecutar el comando reindexar_busqueda.
+    """
+    termino = models.CharField(max_length=busqueda.LARGO_MAXIMO_TERMINO)
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='terminos_busqueda')
+    # Nulo para los términos del título y la descripción del ticket
+    observacion = models.ForeignKey(
+        Observacion, on_delete=models.CASCADE, null=True, blank=True, related_name='terminos_busqueda'
+    )
+    peso = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['termino', 'ticket'], name='termino_busqueda_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.termino} → Ticket #{self.ticket_id} ({self.peso})'
+
+    @classmethod
+    def terminos_ticket(cls, ticket):
+        return [
+            cls(ticket_id=ticket.pk, termino=termino, peso=peso)
+            for termino, peso in busqueda.terminos_ponderados(
+                (ticket.titulo, busqueda.PESO_TITULO),
+                (ticket.descripcion_problema, busqueda.PESO_DESCRIPCION),
+            ).items()
+        ]
+
+    @classmethod
+    def terminos_observacion(cls, observacion):
+        return [
+            cls(ticket_id=observacion.ticket_asociado_id, observacion_id=observacion.pk, termino=termino, peso=peso)
+            for termino, peso in busqueda.terminos_ponderados(
+                (observacion.observacion_texto, busqueda.PESO_OBSERVACION),
+            ).items()
+        ]
+
+    @classmethod
+    def indexar_ticket(cls, ticket):
+        """Reemplaza los términos del título y la descripción del ticket"""
+        if busqueda.usa_fulltext(ticket._state.db):
+            return
+        cls.objects.filter(ticket_id=ticket.pk, observacion__isnull=True).delete()
+        cls.objects.bulk_create(cls.terminos_ticket(ticket))
+
+    @classmethod
+    def indexar_observacion(cls, observacion):
+        if busqueda.usa_fulltext(observacion._state.db):
+            return
+        cls.objects.filter(observacion_id=observacion.pk).delete()
+        cls.objects.bulk_create(cls.terminos_observacion(observacion))
+
+    @classmethod
+    def indexar_tickets(cls, tickets, observaciones=(), batch_size=1000):
+        """Indexa tickets y observaciones recién creados en bloque (sin términos previos)"""
+        if busqueda.usa_fulltext():
+            return
+        filas = [fila for ticket in tickets for fila in cls.terminos_ticket(ticket)]
+        filas += [fila for observacion in observaciones for fila in cls.terminos_observacion(observacion)]
+        cls.objects.bulk_create(filas, batch_size=batch_size)
     
 # ===================================================================
 # SPRINT 4 - MODELOS DE GESTIÓN ADMINISTRATIVA
@@ -150,4 +631,36 @@ class HistorialUsuario(models.Model):
         ordering = ['-fecha_accion']
         
     def __str__(self):
-        return f'{self.get_tipo_accion_display()} - {self.usuario.username} ({self.fecha_accion.strftime("%d/%m/%Y %H:%M")})'
\ No newline at end of file
+        return f'{self.get_tipo_accion_display()} - {self.usuario.username} ({self.fecha_accion.strftime("%d/%m/%Y %H:%M")})'
+
+class EventoOutbox(models.Model):
+    """Efecto secundario pendiente (correo de credenciales, notificaciones de tickets).
+
+    Se guarda en la misma transacción que la mutación que lo origina (core.outbox.registrar) y lo
+    despacha el comando procesar_outbox: si la transacción se revierte el evento no existe, y el
+    envío (SMTP) no agrega latencia al request.
+    """
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        ENVIADO = 'ENVIADO', 'Enviado'
+        FALLIDO = 'FALLIDO', 'Fallido'
+
+    tipo = models.CharField(max_length=50)
+    datos = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    # Un evento pendiente se despacha desde esta fecha: la del reintento o la de vencimiento del
+    # reclamo de un worker (si el worker muere, el evento vuelve a estar disponible)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_procesado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Lote del worker: pendientes ya disponibles, en orden de llegada
+            models.Index(fields=['estado', 'disponible_desde'], name='outbox_pendientes_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tipo} #{self.id} ({self.get_estado_display()})'
@@ -0,0 +1,208 @@
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import EventoOutbox, Jefatura, Ticket
+
+# ===================================================================
+# OUTBOX TRANSACCIONAL
+# Las vistas que modifican datos registran sus efectos secundarios
+# (correos) como filas de EventoOutbox en la misma transacción, y el
+# comando procesar_outbox los despacha fuera del request: reclama lotes
+# con bloqueo de filas, envía y reintenta con espera exponencial.
+# La entrega es al menos una vez: si un worker muere después de enviar y
+# antes de marcar el evento, otro lo reenviará al vencer el reclamo
+# ===================================================================
+
+USUARIO_CREADO = 'usuario_creado'
+TICKET_ASIGNADO = 'ticket_asignado'
+TICKET_DERIVADO = 'ticket_derivado'
+TICKET_ESTADO = 'ticket_estado'
+
+def registrar(tipo, **datos):
+    """Agrega el evento a la transacción en curso: solo existirá si la transacción se confirma"""
+    return EventoOutbox.objects.create(tipo=tipo, datos=datos)
+
+def registrar_varios(tipo, lista_datos):
+    """Un evento por elemento de lista_datos, en un solo INSERT (acciones masivas)"""
+    EventoOutbox.objects.bulk_create([EventoOutbox(tipo=tipo, datos=datos) for datos in lista_datos])
+
+# -------------------------------------------------------------------
+# Correos de cada tipo de evento
+# Cada función recibe los datos del evento y devuelve los mensajes a enviar; los destinatarios
+# se resuelven al despachar, así el request solo guarda los IDs
+# -------------------------------------------------------------------
+
+def _url(nombre, *args):
+    return settings.SITIO_URL.rstrip('/') + reverse(nombre, args=args)
+
+def _mensaje(plantilla, asunto, destinatarios, contexto):
+    return EmailMessage(
+        subject=asunto,
+        body=render_to_string(f'core/correos/{plantilla}.txt', contexto),
+        to=destinatarios,
+    )
+
+def _nombre(usuario):
+    return usuario.get_full_name() or usuario.username
+
+def _usuario_creado(datos):
+    usuario = User.objects.filter(pk=datos['usuario_id'], is_active=True).first()
+    if usuario is None or not usuario.email:
+        return []
+    return [_mensaje('usuario_creado', 'Tu cuenta en el Sistema de Tickets', [usuario.email], {
+        'nombre': _nombre(usuario),
+        'username': usuario.username,
+        'url_login': _url('login'),
+    })]
+
+def _ticket_asignado(datos):
+    ticket = Ticket.objects.filter(pk=datos['ticket_id']).first()
+    trabajador = User.objects.filter(pk=datos['trabajador_id'], is_active=True).first()
+    # Si el ticket ya cambió de manos, el aviso no corresponde
+    if ticket is None or trabajador is None or not trabajador.email or ticket.trabajador_asignado_id != trabajador.id:
+        return []
+    return [_mensaje('ticket_asignado', f'Ticket #{ticket.id} asignado a ti', [trabajador.email], {
+        'nombre': _nombre(trabajador),
+        'ticket': ticket,
+        'url_ticket': _url('ver_ticket', ticket.id),
+    })]
+
+def _ticket_derivado(datos):
+    ticket = Ticket.objects.select_related('area_asignada').filter(pk=datos['ticket_id']).first()
+    if ticket is None:
+        return []
+    # Jefes activos del área de destino
+    correos = sorted(set(
+        Jefatura.objects.filter(
+            area_jefatura_id=datos['area_destino_id'],
+            fecha_fin_jefatura__isnull=True,
+            trabajador_jefe__is_active=True,
+        ).exclude(trabajador_jefe__email='').values_list('trabajador_jefe__email', flat=True)
+    ))
+    if not correos:
+        return []
+    return [_mensaje('ticket_derivado', f'Ticket #{ticket.id} derivado a tu área', correos, {
+        'ticket': ticket,
+        'motivo': datos.get('motivo', ''),
+        'url_ticket': _url('ver_ticket', ticket.id),
+    })]
+
+def _ticket_estado(datos):
+    ticket = Ticket.objects.select_related('cliente_solicitante').filter(pk=datos['ticket_id']).first()
+    if ticket is None or not ticket.cliente_solicitante.correo_electronico:
+        return []
+    return [_mensaje(
+        'ticket_estado',
+        f'Su ticket #{ticket.id} está {Ticket.Estado(datos["estado_nuevo"]).label.lower()}',
+        [ticket.cliente_solicitante.correo_electronico],
+        {
+            'ticket': ticket,
+            'cliente': ticket.cliente_solicitante,
+            'estado_anterior': Ticket.Estado(datos['estado_anterior']).label,
+            'estado_nuevo': Ticket.Estado(datos['estado_nuevo']).label,
+        }
+    )]
+
+DESPACHADORES = {
+    USUARIO_CREADO: _usuario_creado,
+    TICKET_ASIGNADO: _ticket_asignado,
+    TICKET_DERIVADO: _ticket_derivado,
+    TICKET_ESTADO: _ticket_estado,
+}
+
+# -------------------------------------------------------------------
+# Procesamiento
+# -------------------------------------------------------------------
+
+@dataclass
+class ResultadoLote:
+    enviados: int = 0
+    reintentos: int = 0
+    fallidos: int = 0
+
+    @property
+    def procesados(self):
+        return self.enviados + self.reintentos + self.fallidos
+
+def reclamar(tamano):
+    """Toma hasta `tamano` eventos disponibles. Las filas se bloquean (SKIP LOCKED: dos workers no
+    toman el mismo evento) y se reservan por OUTBOX_RECLAMO_SEGUNDOS, sin mantener la transacción
+    abierta durante el envío."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        eventos = list(
+            EventoOutbox.objects.select_for_update(skip_locked=True).filter(
+                estado=EventoOutbox.Estado.PENDIENTE, disponible_desde__lte=ahora
+            ).order_by('disponible_desde', 'id')[:tamano]
+        )
+        if eventos:
+            EventoOutbox.objects.filter(pk__in=[evento.pk for evento in eventos]).update(
+                disponible_desde=ahora + timedelta(seconds=settings.OUTBOX_RECLAMO_SEGUNDOS)
+            )
+    return eventos
+
+def espera_reintento(intentos):
+    """Espera exponencial desde OUTBOX_REINTENTO_BASE_SEGUNDOS hasta OUTBOX_REINTENTO_MAXIMO_SEGUNDOS,
+    con variación aleatoria para que los eventos de una misma caída no se reintenten juntos"""
+    espera = min(settings.OUTBOX_REINTENTO_BASE_SEGUNDOS * 2 ** (intentos - 1), settings.OUTBOX_REINTENTO_MAXIMO_SEGUNDOS)
+    return timedelta(seconds=espera * random.uniform(0.5, 1.0))
+
+def _fallo(evento, error, resultado):
+    intentos = evento.intentos + 1
+    cambios = {'intentos': intentos, 'ultimo_error': f'{type(error).__name__}: {error}'[:2000]}
+    if intentos >= settings.OUTBOX_MAX_INTENTOS:
+        cambios.update(estado=EventoOutbox.Estado.FALLIDO, fecha_procesado=timezone.now())
+        resultado.fallidos += 1
+    else:
+        cambios['disponible_desde'] = timezone.now() + espera_reintento(intentos)
+        resultado.reintentos += 1
+    EventoOutbox.objects.filter(pk=evento.pk).update(**cambios)
+
+def despachar(eventos):
+    """Envía los correos de los eventos por una misma conexión SMTP y registra el resultado"""
+    resultado = ResultadoLote()
+    try:
+        conexion = get_connection(fail_silently=False)
+        conexion.open()
+    except Exception as error:
+        # Servidor de correo inaccesible: todo el lote se reintenta más tarde
+        for evento in eventos:
+            _fallo(evento, error, resultado)
+        return resultado
+
+    enviados = []
+    try:
+        for evento in eventos:
+            try:
+                despachador = DESPACHADORES.get(evento.tipo)
+                if despachador is None:
+                    raise ValueError(f'Tipo de evento desconocido: {evento.tipo}')
+                mensajes = despachador(evento.datos)
+                if mensajes:
+                    conexion.send_messages(mensajes)
+            except Exception as error:
+                _fallo(evento, error, resultado)
+            else:
+                enviados.append(evento.pk)
+    finally:
+        conexion.close()
+
+    if enviados:
+        EventoOutbox.objects.filter(pk__in=enviados).update(
+            estado=EventoOutbox.Estado.ENVIADO, fecha_procesado=timezone.now(), ultimo_error=''
+        )
+    resultado.enviados = len(enviados)
+    return resultado
+
+def procesar_lote(tamano=50):
+    eventos = reclamar(tamano)
+    return despachar(eventos) if eventos else ResultadoLote()
@@ -0,0 +1,209 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# ===================================================================
+# PAGINACIÓN POR CURSOR (KEYSET)
+# Cada página se obtiene con un WHERE sobre la clave de orden del último
+# elemento visto, sin OFFSET ni COUNT(*) sobre el conjunto filtrado
+# ===================================================================
+
+# Parámetros GET que usa el paginador; el resto se conserva en los enlaces
+PARAMETRO_DESPUES = 'despues'
+PARAMETRO_ANTES = 'antes'
+PARAMETRO_ULTIMA = 'ultima'
+PARAMETROS_CURSOR = (PARAMETRO_DESPUES, PARAMETRO_ANTES, PARAMETRO_ULTIMA, 'page')
+
+def contar_hasta(queryset, limite):
+    """Cuenta como máximo 'limite' filas: (total, es_minimo).
+    Sirve de total estimado cuando un COUNT(*) exacto sería costoso."""
+    total = queryset.order_by()[:limite + 1].count()
+    if total > limite:
+        return limite, True
+    return total, False
+
+def codificar_cursor(valores):
+    valores = [valor.isoformat() if isinstance(valor, (date, datetime)) else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, cantidad):
+    """Valores del cursor, o None si no es válido (se muestra la primera página)"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        return None
+    return valores
+
+class PaginaCursor:
+    """Página de resultados con los enlaces de navegación ya construidos"""
+
+    def __init__(self, object_list, parametros, cursor_anterior, cursor_siguiente,
+                 tiene_anterior, tiene_siguiente, total=None, total_es_minimo=False):
+        self.object_list = object_list
+        self.tiene_anterior = tiene_anterior
+        self.tiene_siguiente = tiene_siguiente
+        self.total = total
+        self.total_es_minimo = total_es_minimo
+        self._parametros = parametros
+        self._cursor_anterior = cursor_anterior
+        self._cursor_siguiente = cursor_siguiente
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def tiene_otras_paginas(self):
+        return self.tiene_anterior or self.tiene_siguiente
+
+    def _url(self, **extra):
+        parametros = self._parametros.copy()
+        for clave, valor in extra.items():
+            parametros[clave] = valor
+        consulta = parametros.urlencode()
+        return f'?{consulta}' if consulta else '?'
+
+    @property
+    def url_primera(self):
+        return self._url()
+
+    @property
+    def url_anterior(self):
+        return self._url(**{PARAMETRO_ANTES: self._cursor_anterior})
+
+    @property
+    def url_siguiente(self):
+        return self._url(**{PARAMETRO_DESPUES: self._cursor_siguiente})
+
+    @property
+    def url_ultima(self):
+        return self._url(**{PARAMETRO_ULTIMA: '1'})
+
+class PaginadorCursor:
+    """Paginador keyset sobre (campos de orden..., pk).
+
+    'orden' acepta nombres de campos o anotaciones del queryset, con '-' para orden
+    descendente (por defecto, el order_by del queryset); la clave primaria se agrega como
+    desempate. 'total' puede ser un entero
+    ya conocido (por ejemplo, desde ContadorTickets), 'estimado' para contar con tope
+    'limite_conteo', o None para no mostrar total.
+    """
+
+    def __init__(self, queryset, orden=None, por_pagina=20, total=None, limite_conteo=1000):
+        orden = orden or queryset.query.order_by or ['pk']
+        campos = [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+        if not any(nombre in ('pk', 'id') for nombre, _ in campos):
+            campos.append(('pk', campos[-1][1] if campos else False))
+        self.campos = campos
+        self.queryset = queryset
+        self.por_pagina = por_pagina
+        self.total = total
+        self.limite_conteo = limite_conteo
+
+    def _ordenar(self, invertir):
+        return self.queryset.order_by(*[
+            f'-{nombre}' if descendente != invertir else nombre
+            for nombre, descendente in self.campos
+        ])
+
+    def _decodificar(self, cursor):
+        """Valores del cursor convertidos al tipo de cada campo de orden, o None si el cursor no es
+        válido (alterado o de otro orden): se muestra la primera página"""
+        valores = decodificar_cursor(cursor, len(self.campos))
+        if valores is None:
+            return None
+        query = self.queryset.query.chain()
+        try:
+            valores = [
+                query.resolve_ref(nombre).output_field.to_python(valor)
+                for (nombre, _), valor in zip(self.campos, valores)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            return None
+        # Las columnas de orden no admiten NULL en el filtro keyset
+        return None if None in valores else valores
+
+    def _filtro(self, valores, invertir):
+        """(a, b, pk) posteriores al cursor: a > va OR (a = va AND b > vb) OR ..."""
+        condicion = Q()
+        iguales = {}
+        for (nombre, descendente), valor in zip(self.campos, valores):
+            comparacion = 'lt' if descendente != invertir else 'gt'
+            condicion |= Q(**iguales, **{f'{nombre}__{comparacion}': valor})
+            iguales[nombre] = valor
+        return condicion
+
+    def _valores(self, objeto):
+        """Clave de orden de un objeto (o de un diccionario, si el queryset usa values())"""
+        if isinstance(objeto, dict):
+            return [objeto[nombre] for nombre, _ in self.campos]
+        return [getattr(objeto, nombre) for nombre, _ in self.campos]
+
+    def _cursor(self, objeto):
+        return codificar_cursor(self._valores(objeto))
+
+    def recorrer(self, tamano_lote=1000):
+        """Recorre todo el queryset en orden, una consulta keyset por lote.
+        Mantiene la memoria constante aun en motores sin cursores de servidor."""
+        queryset = self._ordenar(False)
+        valores = None
+        while True:
+            lote = queryset.filter(self._filtro(valores, False)) if valores is not None else queryset
+            objetos = list(lote[:tamano_lote])
+            yield from objetos
+            if len(objetos) < tamano_lote:
+                return
+            valores = self._valores(objetos[-1])
+
+    def obtener_pagina(self, parametros):
+        """Página indicada por los parámetros GET (despues / antes / ultima)"""
+        base = parametros.copy()
+        for clave in PARAMETROS_CURSOR:
+            base.pop(clave, None)
+
+        despues = self._decodificar(parametros.get(PARAMETRO_DESPUES, ''))
+        antes = self._decodificar(parametros.get(PARAMETRO_ANTES, ''))
+        ultima = bool(parametros.get(PARAMETRO_ULTIMA))
+
+        # Hacia atrás (página anterior o última) se recorre el orden invertido
+        invertir = antes is not None or (ultima and despues is None)
+        queryset = self._ordenar(invertir)
+        cursor = antes if invertir else despues
+        if cursor is not None:
+            queryset = queryset.filter(self._filtro(cursor, invertir))
+
+        objetos = list(queryset[:self.por_pagina + 1])
+        hay_mas = len(objetos) > self.por_pagina
+        objetos = objetos[:self.por_pagina]
+
+        if invertir:
+            objetos.reverse()
+            tiene_anterior, tiene_siguiente = hay_mas, not ultima
+        else:
+            tiene_anterior, tiene_siguiente = despues is not None, hay_mas
+
+        total, total_es_minimo = self._total()
+        return PaginaCursor(
+            objetos,
+            base,
+            cursor_anterior=self._cursor(objetos[0]) if objetos else '',
+            cursor_siguiente=self._cursor(objetos[-1]) if objetos else '',
+            tiene_anterior=tiene_anterior and bool(objetos),
+            tiene_siguiente=tiene_siguiente and bool(objetos),
+            total=total,
+            total_es_minimo=total_es_minimo,
+        )
+
+    def _total(self):
+        if self.total == 'estimado':
+            return contar_hasta(self.queryset, self.limite_conteo)
+        return self.total, False
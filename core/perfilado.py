@@ -0,0 +1,142 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import traceback
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, DatabaseError
+from django.utils import timezone
+
+from .asincronas import envolver_consultas
+
+# ===================================================================
+# PERFILADO BAJO DEMANDA
+# Un usuario staff agrega ?perfilar=1 (o el encabezado X-Perfilar: 1)
+# y la solicitud se ejecuta con cProfile y captura de SQL; el paquete
+# queda en PERFILADO_DIRECTORIO/<id> y el id vuelve en X-Perfil-Id
+# ===================================================================
+
+PARAMETRO = 'perfilar'
+ENCABEZADO = 'X-Perfilar'
+ENCABEZADO_RESPUESTA = 'X-Perfil-Id'
+
+# Funciones del resumen de cProfile (por tiempo acumulado)
+LINEAS_RESUMEN = 60
+
+_RAIZ_PROYECTO = str(Path(__file__).resolve().parent.parent)
+
+def solicitado(request):
+    """True si la solicitud pide perfilado y el usuario es staff"""
+    if not getattr(settings, 'PERFILADO_HABILITADO', True):
+        return False
+    if request.GET.get(PARAMETRO) != '1' and request.headers.get(ENCABEZADO) != '1':
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and (user.is_staff or user.is_superuser))
+
+def _origen():
+    """Frames del proyecto que ejecutaron la consulta (para ubicar un N+1 en vista o template)"""
+    return [
+        f'{Path(frame.filename).relative_to(_RAIZ_PROYECTO)}:{frame.lineno} {frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(_RAIZ_PROYECTO)
+        and frame.filename != __file__
+        and 'site-packages' not in frame.filename
+    ]
+
+class CapturaSQL:
+    """execute_wrapper que guarda cada sentencia con su base, parámetros, duración y origen"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': None if many else _serializable(params),
+                '_params': None if many else params,
+                'many': many,
+                'ms': round((time.perf_counter() - inicio) * 1000, 3),
+                'origen': _origen(),
+            })
+
+def _serializable(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {clave: str(valor) for clave, valor in params.items()}
+    return [valor if isinstance(valor, (int, float, bool, type(None))) else str(valor) for valor in params]
+
+def _explain(alias, sql, params):
+    """Plan de ejecución de una consulta de lectura, en la sintaxis de cada motor"""
+    conexion = connections[alias]
+    prefijo = 'EXPLAIN QUERY PLAN ' if conexion.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(prefijo + sql, params)
+            columnas = [columna[0] for columna in cursor.description or ()]
+            return [dict(zip(columnas, map(str, fila))) for fila in cursor.fetchall()]
+    except DatabaseError as error:
+        return {'error': str(error)}
+
+def perfilar(request, get_response):
+    """Ejecuta la solicitud con cProfile y captura de SQL y guarda el paquete en disco"""
+    perfil_id = f'{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+    captura = CapturaSQL()
+    perfilador = cProfile.Profile()
+
+    inicio = time.perf_counter()
+    with envolver_consultas(captura):
+        perfilador.enable()
+        try:
+            response = get_response(request)
+        finally:
+            perfilador.disable()
+    duracion = time.perf_counter() - inicio
+
+    consultas = sorted(captura.consultas, key=lambda c: c['ms'], reverse=True)
+    umbral = getattr(settings, 'PERFILADO_UMBRAL_EXPLAIN_MS', 100)
+    for consulta in consultas:
+        params = consulta.pop('_params')
+        if consulta['ms'] >= umbral and not consulta['many'] and consulta['sql'].lstrip().upper().startswith('SELECT'):
+            consulta['explain'] = _explain(consulta['alias'], consulta['sql'], params)
+
+    _guardar(perfil_id, request, response, duracion, perfilador, consultas)
+    response[ENCABEZADO_RESPUESTA] = perfil_id
+    return response
+
+def _guardar(perfil_id, request, response, duracion, perfilador, consultas):
+    """Escribe solicitud.json, consultas.json, perfil.prof (pstats/snakeviz) y resumen.txt"""
+    directorio = Path(settings.PERFILADO_DIRECTORIO) / perfil_id
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    resolver_match = getattr(request, 'resolver_match', None)
+    solicitud = {
+        'id': perfil_id,
+        'fecha': timezone.now().isoformat(),
+        'metodo': request.method,
+        'ruta': request.get_full_path(),
+        'vista': resolver_match.view_name if resolver_match else None,
+        'usuario': request.user.get_username(),
+        'codigo': response.status_code,
+        'streaming': response.streaming,
+        'duracion_ms': round(duracion * 1000, 3),
+        'consultas': len(consultas),
+        'duracion_db_ms': round(sum(consulta['ms'] for consulta in consultas), 3),
+    }
+    (directorio / 'solicitud.json').write_text(json.dumps(solicitud, indent=2, ensure_ascii=False), encoding='utf-8')
+    (directorio / 'consultas.json').write_text(json.dumps(consultas, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    perfilador.dump_stats(str(directorio / 'perfil.prof'))
+    resumen = io.StringIO()
+    pstats.Stats(perfilador, stream=resumen).sort_stats('cumulative').print_stats(LINEAS_RESUMEN)
+    (directorio / 'resumen.txt').write_text(resumen.getvalue(), encoding='utf-8')
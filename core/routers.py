@@ -0,0 +1,126 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# ===================================================================
+# RÉPLICAS DE LECTURA
+# Las vistas y comandos de solo lectura (@lectura_replica o el bloque
+# usar_replica) leen de una réplica; todo lo demás y toda escritura van
+# a la primaria. Después de una escritura la sesión del usuario queda
+# fijada a la primaria unos segundos para que vea sus propios cambios
+# aunque la réplica venga atrasada (ver FijacionPrimariaMiddleware)
+# ===================================================================
+
+CLAVE_SESION = 'db_primaria_hasta'
+
+# Alias de la réplica que atiende las lecturas del contexto actual (None = primaria)
+_alias_lectura = ContextVar('alias_lectura', default=None)
+
+def replicas():
+    """Alias de DATABASES que son réplicas de la primaria (settings.DATABASE_REPLICAS)"""
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+@contextmanager
+def _leer_de(alias):
+    token = _alias_lectura.set(alias)
+    try:
+        yield
+    finally:
+        _alias_lectura.reset(token)
+
+def usar_replica():
+    """Las lecturas del bloque van a una réplica elegida al azar (a la primaria si no hay réplicas)"""
+    disponibles = replicas()
+    return _leer_de(random.choice(disponibles) if disponibles else None)
+
+def usar_primaria():
+    """Las lecturas del bloque van a la primaria, aunque se esté dentro de usar_replica"""
+    return _leer_de(None)
+
+# -------------------------------------------------------------------
+# Fijación de la sesión a la primaria
+# -------------------------------------------------------------------
+
+def fijar_primaria(request):
+    request.session[CLAVE_SESION] = time.time() + getattr(settings, 'DB_FIJACION_PRIMARIA_SEGUNDOS', 10)
+
+def fijada_a_primaria(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(CLAVE_SESION, 0) > time.time()
+
+def _iterar_en(alias, contenido):
+    """Recorre el contenido de una respuesta streaming leyendo de la misma réplica que la vista"""
+    iterador = iter(contenido)
+    while True:
+        with _leer_de(alias):
+            try:
+                fragmento = next(iterador)
+            except StopIteration:
+                return
+        yield fragmento
+
+def lectura_replica(view):
+    """Decorador para vistas de solo lectura: sus consultas (templates y context processors incluidos)
+    van a una réplica, salvo que la sesión esté fijada a la primaria por una escritura reciente"""
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def envoltura_async(request, *args, **kwargs):
+            # La sesión se carga desde la base: fuera del event loop
+            if not replicas() or await sync_to_async(fijada_a_primaria)(request):
+                return await view(request, *args, **kwargs)
+            with usar_replica():
+                return await view(request, *args, **kwargs)
+        return envoltura_async
+
+    @wraps(view)
+    def envoltura(request, *args, **kwargs):
+        if not replicas() or fijada_a_primaria(request):
+            return view(request, *args, **kwargs)
+
+        with usar_replica():
+            alias = _alias_lectura.get()
+            response = view(request, *args, **kwargs)
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = _iterar_en(alias, response.streaming_content)
+        return response
+    return envoltura
+
+# -------------------------------------------------------------------
+# Router
+# -------------------------------------------------------------------
+
+class RouterReplicas:
+    """Envía las lecturas del contexto de réplica a su réplica y el resto a la primaria.
+
+    Dentro de una transacción de la primaria se lee siempre de la primaria, y las escrituras
+    van a la primaria aunque la instancia se haya leído de una réplica.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _alias_lectura.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplicas tienen los mismos datos
+        bases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        if db in replicas():
+            return False
+        return None
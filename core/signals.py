@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import catalogos
+from .acceso import invalidar_contexto
+from .models import Area, Perfil, Jefatura
+
+# ===================================================================
+# INVALIDACIÓN DEL CONTEXTO DE ACCESO CACHEADO
+# ===================================================================
+
+@receiver([post_save, post_delete], sender=Perfil)
+def perfil_modificado(sender, instance, **kwargs):
+    invalidar_contexto([instance.usuario_id])
+
+@receiver([post_save, post_delete], sender=Jefatura)
+def jefatura_modificada(sender, instance, **kwargs):
+    invalidar_contexto([instance.trabajador_jefe_id])
+
+@receiver([post_save, post_delete], sender=User)
+def usuario_modificado(sender, instance, **kwargs):
+    invalidar_contexto([instance.pk])
+
+@receiver(post_save, sender=Area)
+def area_modificada(sender, instance, **kwargs):
+    # El contexto guarda el área (nombre incluido) de miembros y jefes
+    usuarios = set(instance.miembros.values_list('usuario_id', flat=True))
+    usuarios.update(Jefatura.objects.filter(area_jefatura=instance).values_list('trabajador_jefe_id', flat=True))
+    invalidar_contexto(usuarios)
+
+# ===================================================================
+# INVALIDACIÓN DE LOS CATÁLOGOS DE OPCIONES (ÁREAS Y TRABAJADORES)
+# ===================================================================
+
+@receiver([post_save, post_delete], sender=Area)
+@receiver([post_save, post_delete], sender=Perfil)
+@receiver([post_save, post_delete], sender=Jefatura)
+def catalogo_modificado(sender, **kwargs):
+    catalogos.invalidar()
+
+@receiver([post_save, post_delete], sender=User)
+def catalogo_usuario_modificado(sender, update_fields=None, **kwargs):
+    # El login solo actualiza last_login, que no aparece en el catálogo
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    catalogos.invalidar()
@@ -2,22 +2,19 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from core.acceso import contexto_acceso
 
 def es_jefe_o_admin(user):
     """Verifica si el usuario es jefe de área o administrador"""
-    if user.is_superuser:
-        return True
-    
-    return user.roles_jefatura.filter(
-        fecha_fin_jefatura__isnull=True
-    ).exists()
+    return user.is_superuser or contexto_acceso(user).es_jefe
 
 def es_del_area(user, area):
     """Verifica si el usuario pertenece a un área específica"""
     if user.is_superuser:
         return True
     
-    if hasattr(user, 'perfil') and user.perfil.area == area:
+    if contexto_acceso(user).es_del_area(getattr(area, 'id', area)):
         return True
     
     return False
@@ -28,22 +25,21 @@ def puede_editar_ticket(user, ticket):
         return True
     
     # Creador del ticket
-    if user == ticket.trabajador_creador:
+    if user.id == ticket.trabajador_creador_id:
         return True
     
     # Asignado al ticket
-    if user == ticket.trabajador_asignado:
+    if user.id == ticket.trabajador_asignado_id:
         return True
     
+    acceso = contexto_acceso(user)
+    
     # Del área del ticket
-    if hasattr(user, 'perfil') and user.perfil.area == ticket.area_asignada:
+    if acceso.es_del_area(ticket.area_asignada_id):
         return True
     
     # Jefe del área del ticket
-    if user.roles_jefatura.filter(
-        area_jefatura=ticket.area_asignada,
-        fecha_fin_jefatura__isnull=True
-    ).exists():
+    if acceso.es_jefe_de(ticket.area_asignada_id):
         return True
     
     return False
@@ -59,16 +55,18 @@ def requiere_jefe_o_admin(view_func):
     return wrapped_view
 
 def requiere_permiso_ticket(view_func):
-    """Decorador que verifica permisos sobre un ticket específico"""
+    """Decorador que verifica permisos sobre un ticket específico.
+    El ticket queda en request.ticket para que la vista no lo vuelva a consultar."""
     @wraps(view_func)
     def wrapped_view(request, pk, *args, **kwargs):
         from core.models import Ticket
-        ticket = Ticket.objects.get(pk=pk)
+        ticket = get_object_or_404(Ticket, pk=pk)
         
         if not puede_editar_ticket(request.user, ticket):
             messages.error(request, 'No tienes permisos para modificar este ticket')
             return redirect('ver_ticket', pk=pk)
         
+        request.ticket = ticket
         return view_func(request, pk, *args, **kwargs)
     return wrapped_view
 
@@ -1,3 +1,1259 @@
-from django.test import TestCase
+import csv
+import json
+import sqlite3
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.migrations.loader import MigrationLoader
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import acciones_masivas, benchmark, catalogos, estadisticas, eventos, exportacion, importacion, outbox, routers, views
+from .acceso import contexto_acceso
+from .asincronas import en_paralelo
+from .backends.mysql_pool import pool as pool_conexiones
+from .forms import AccionMasivaForm, FiltroTicketsForm, GrupoForm, TicketForm
+from .metricas import REGISTRO
+from .middleware import FijacionPrimariaMiddleware
+from .models import Area, Cliente, Derivacion, EventoOutbox, Jefatura, Observacion, Perfil, TerminoBusqueda, Ticket
+from .paginacion import PaginadorCursor, codificar_cursor
+from .timeline import pagina_timeline
+
+
+# Sin réplicas: en los tests la réplica es un espejo de la primaria y contaría las mismas consultas
+@override_settings(DATABASE_REPLICAS=[])
+class PresupuestoConsultasTests(TestCase):
+    """Cada vista crítica debe mantenerse dentro de su presupuesto de consultas (sin N+1)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests')
+        call_command('generar_carga', tickets=60, areas=3, usuarios=12, clientes=15, stdout=StringIO())
+
+    def setUp(self):
+        self.escenarios = benchmark.escenarios(benchmark.usuarios_benchmark())
+
+    def _consultas(self):
+        return {
+            escenario.nombre: benchmark.contar_consultas(self.client, escenario)
+            for escenario in self.escenarios
+        }
+
+    def test_vistas_dentro_del_presupuesto(self):
+        self.assertEqual(len(self.escenarios), len(benchmark.PRESUPUESTO_CONSULTAS))
+        for nombre, (estado, consultas) in self._consultas().items():
+            with self.subTest(escenario=nombre):
+                self.assertEqual(estado, 200)
+                self.assertLessEqual(consultas, benchmark.PRESUPUESTO_CONSULTAS[nombre])
+
+    def test_consultas_no_crecen_con_los_datos(self):
+        antes = self._consultas()
+        call_command('generar_carga', tickets=120, areas=3, usuarios=30, prefijo='extra', stdout=StringIO())
+        despues = self._consultas()
+        for nombre in antes:
+            with self.subTest(escenario=nombre):
+                self.assertEqual(despues[nombre], antes[nombre])
+
+    def test_comparar_detecta_regresiones(self):
+        base = {'escenarios': {'lista (admin)': {'consultas': 10, 'p50_ms': 40.0}}}
+        igual = {'escenarios': {'lista (admin)': {'consultas': 10, 'p50_ms': 43.0}}}
+        peor = {'escenarios': {'lista (admin)': {'consultas': 12, 'p50_ms': 80.0}}}
+
+        self.assertEqual(benchmark.comparar(igual, base), [])
+        self.assertEqual(len(benchmark.comparar(peor, base)), 2)
+        self.assertEqual(benchmark.comparar(peor, base, latencias=False), ['lista (admin): 12 consultas (base 10)'])
+
+
+class IndicesTicketTests(TestCase):
+    """Las consultas críticas de tickets deben resolverse con índices"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generar_carga', tickets=60, areas=3, usuarios=12, clientes=15, stdout=StringIO())
+
+    def test_verificar_indices_sin_errores(self):
+        salida = StringIO()
+        call_command('verificar_indices', stdout=salida)
+        self.assertIn('¡Todas las consultas usan índices!', salida.getvalue())
+
+    def test_indice_de_cola_ordena_antes_de_filtrar_por_estado(self):
+        estado = MigrationLoader(None, ignore_no_migrations=True).project_state(('core', '0003_indices_ticket'))
+        indices = {indice.name: indice for indice in estado.models['core', 'ticket'].options['indexes']}
+        self.assertEqual(
+            indices['ticket_cola_area_idx'].fields,
+            ['area_asignada', 'trabajador_asignado', '-nivel_critico', '-fecha_creacion', 'estado']
+        )
+
+
+class MetricasTests(TestCase):
+    """Instrumentación de requests y endpoints de observabilidad"""
+    databases = '__all__'
+
+    def setUp(self):
+        REGISTRO.reiniciar()
+
+    def test_metricas_por_nombre_de_url(self):
+        self.client.get(reverse('login'))
+        self.client.get('/no-existe/')
+
+        respuesta = self.client.get(reverse('metricas'))
+        texto = respuesta.content.decode()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('tda_http_solicitudes_total{vista="login",metodo="GET",codigo="200"} 1', texto)
+        self.assertIn('tda_http_solicitudes_total{vista="sin_ruta",metodo="GET",codigo="404"} 1', texto)
+        self.assertIn('tda_db_consultas_count{vista="login"} 1', texto)
+        self.assertIn('tda_http_duracion_segundos_bucket{vista="login",metodo="GET",le="+Inf"} 1', texto)
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_metricas_con_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 401)
+        respuesta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_salud(self):
+        respuesta = self.client.get(reverse('salud'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['bases_de_datos']['default']['estado'], 'ok')
+
+
+class PerfiladoTests(TestCase):
+    """Perfilado bajo demanda: solo para staff, con el paquete escrito en disco"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.staff = User.objects.create_user('staff', password='clave-tests', is_staff=True)
+        self.trabajador = User.objects.create_user('trabajador', password='clave-tests')
+
+    def test_staff_obtiene_paquete(self):
+        self.client.force_login(self.staff)
+        with self.settings(PERFILADO_DIRECTORIO=self.directorio.name, PERFILADO_UMBRAL_EXPLAIN_MS=0):
+            respuesta = self.client.get(reverse('dashboard'), {'perfilar': '1'})
+
+        self.assertEqual(respuesta.status_code, 200)
+        paquete = Path(self.directorio.name) / respuesta['X-Perfil-Id']
+        self.assertEqual(
+            sorted(archivo.name for archivo in paquete.iterdir()),
+            ['consultas.json', 'perfil.prof', 'resumen.txt', 'solicitud.json']
+        )
+        consultas = json.loads((paquete / 'consultas.json').read_text(encoding='utf-8'))
+        self.assertTrue(consultas)
+        self.assertTrue(any('explain' in consulta for consulta in consultas))
+        self.assertEqual(json.loads((paquete / 'solicitud.json').read_text(encoding='utf-8'))['vista'], 'dashboard')
+
+    def test_usuario_sin_staff_no_perfila(self):
+        self.client.force_login(self.trabajador)
+        with self.settings(PERFILADO_DIRECTORIO=self.directorio.name):
+            respuesta = self.client.get(reverse('dashboard'), HTTP_X_PERFILAR='1')
+
+        self.assertNotIn('X-Perfil-Id', respuesta)
+        self.assertEqual(list(Path(self.directorio.name).iterdir()), [])
+
+
+class AutocompletarClientesTests(TestCase):
+    """Buscador de clientes del formulario de tickets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('soporte', password='clave-tests')
+        Cliente.objects.bulk_create([
+            Cliente(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test'),
+            Cliente(nombre='Andrés Soto', correo_electronico='asoto@ejemplo.test'),
+            Cliente(nombre='Pedro Díaz', correo_electronico='anaya.pedro@ejemplo.test'),
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_prefijo_de_nombre_o_correo(self):
+        respuesta = self.client.get(reverse('buscar_clientes'), {'q': 'ana'})
+        datos = respuesta.json()
+        self.assertEqual(datos['q'], 'ana')
+        self.assertEqual([cliente['nombre'] for cliente in datos['resultados']], ['Ana Rojas', 'Pedro Díaz'])
+
+    def test_texto_corto_no_consulta(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(Cliente.objects.autocompletar('a'), [])
+
+    def test_limite_de_resultados(self):
+        self.assertEqual(len(Cliente.objects.autocompletar('an', limite=1)), 1)
+
+
+@override_settings(BUSQUEDA_LIMITE_RESULTADOS=5)
+class BusquedaTicketsTests(TestCase):
+    """Los filtros del queryset se aplican antes del límite de candidatos de la búsqueda"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area_1 = Area.objects.create(nombre='Soporte')
+        cls.area_2 = Area.objects.create(nombre='Redes')
+        cls.trabajador = User.objects.create_user('redes', password='clave-tests')
+        Perfil.objects.create(usuario=cls.trabajador, area=cls.area_2)
+        creador = User.objects.create_user('soporte', password='clave-tests')
+        cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+        for area in [cls.area_1] * 10 + [cls.area_2]:
+            Ticket.objects.create(
+                titulo='Impresora sin tóner', descripcion_problema='La impresora no imprime',
+                nivel_critico='BAJO', tipo_problema='Hardware', cliente_solicitante=cliente,
+                area_asignada=area, trabajador_creador=creador,
+            )
+        cls.ticket_area_2 = Ticket.objects.get(area_asignada=cls.area_2)
+
+    def test_filtro_antes_del_limite(self):
+        self.assertEqual(Ticket.objects.buscar('impresora').count(), 5)
+        self.assertEqual(
+            list(Ticket.objects.filter(area_asignada=self.area_2).buscar('impresora')), [self.ticket_area_2]
+        )
+        self.assertEqual(
+            list(Ticket.objects.visibles_para(self.trabajador).buscar('impresora')), [self.ticket_area_2]
+        )
+
+    def _indice(self):
+        return sorted(TerminoBusqueda.objects.values_list('ticket_id', 'observacion_id', 'termino', 'peso'))
+
+    def test_reindexar_por_lotes(self):
+        esperado = self._indice()
+        TerminoBusqueda.objects.filter(ticket=self.ticket_area_2).delete()
+        call_command('reindexar_busqueda', lote=4, stdout=StringIO())
+        self.assertEqual(self._indice(), esperado)
+
+        # Un fallo a mitad de camino conserva el índice de los lotes no procesados
+        original = TerminoBusqueda.indexar_tickets
+        llamadas = []
+
+        def fallar_en_el_segundo_lote(*args, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 2:
+                raise DatabaseError('sin conexión')
+            return original(*args, **kwargs)
+
+        with mock.patch.object(TerminoBusqueda, 'indexar_tickets', side_effect=fallar_en_el_segundo_lote):
+            with self.assertRaises(DatabaseError):
+                call_command('reindexar_busqueda', lote=4, stdout=StringIO())
+        self.assertEqual(self._indice(), esperado)
+
+
+class CatalogosTests(TestCase):
+    """Opciones de áreas y trabajadores desde el catálogo cacheado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(nombre='Redes')
+        cls.usuario = User.objects.create_user('mperez', first_name='María', last_name='Pérez')
+        Perfil.objects.create(usuario=cls.usuario, area=cls.area)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_formularios_sin_consultas_con_catalogo_cargado(self):
+        catalogos.obtener()
+        with self.assertNumQueries(0):
+            html = FiltroTicketsForm().as_p() + GrupoForm().as_p()
+        self.assertIn('María Pérez', html)
+        self.assertIn('Redes (1 miembros)', html)
+
+    def test_invalidacion_al_modificar(self):
+        self.assertEqual(catalogos.opciones_areas(), [(self.area.id, 'Redes')])
+        with self.captureOnCommitCallbacks(execute=True):
+            Area.objects.create(nombre='Bodega')
+        self.assertEqual([nombre for _, nombre in catalogos.opciones_areas()], ['Bodega', 'Redes'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.is_active = False
+            self.usuario.save()
+        self.assertEqual(catalogos.opciones_trabajadores(), [])
+
+    def test_fin_de_jefatura_invalida_el_contexto(self):
+        Jefatura.objects.create(
+            trabajador_jefe=self.usuario, area_jefatura=self.area, fecha_inicio_jefatura=timezone.now().date()
+        )
+        self.assertTrue(contexto_acceso(User.objects.get(pk=self.usuario.pk)).es_jefe)
+
+        self.client.force_login(User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests'))
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(
+                reverse('desactivar_usuario', args=[self.usuario.id]),
+                {'motivo': 'Dejó la empresa', 'confirmar': 'on'}
+            )
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertFalse(contexto_acceso(User.objects.get(pk=self.usuario.pk)).es_jefe)
+
+    def test_valor_enviado_se_valida_contra_la_base(self):
+        form = FiltroTicketsForm({'area_asignada': '999999'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('area_asignada', form.errors)
+
+
+class UsuariosJefeTests(TestCase):
+    """Un jefe solo puede asignar su área a los usuarios que crea o edita"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soporte = Area.objects.create(nombre='Soporte')
+        cls.redes = Area.objects.create(nombre='Redes')
+        cls.jefe = User.objects.create_user('jefe', password='clave-tests')
+        Perfil.objects.create(usuario=cls.jefe, area=cls.soporte)
+        Jefatura.objects.create(trabajador_jefe=cls.jefe, area_jefatura=cls.soporte, fecha_inicio_jefatura=timezone.now().date())
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.jefe)
+
+    def test_crear_usuario_solo_muestra_su_area(self):
+        respuesta = self.client.get(reverse('crear_usuario'))
+        self.assertEqual(respuesta.status_code, 200)
+        opciones = [valor for valor, _ in respuesta.context['form'].fields['area'].choices if valor != '']
+        self.assertEqual(opciones, [self.soporte.id])
+        self.assertNotIn('>Redes</option>', respuesta.content.decode())
+
+    def test_area_ajena_no_se_acepta(self):
+        respuesta = self.client.post(reverse('crear_usuario'), {
+            'username': 'mperez', 'email': 'mperez@ejemplo.test', 'first_name': 'María', 'last_name': 'Pérez',
+            'password1': 'clave-segura-1', 'password2': 'clave-segura-1', 'area': self.redes.id,
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('area', respuesta.context['form'].errors)
+        self.assertFalse(User.objects.filter(username='mperez').exists())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class RouterReplicasTests(SimpleTestCase):
+    """Lecturas de vistas de solo lectura a la réplica; escrituras y sesiones fijadas a la primaria"""
+
+    def setUp(self):
+        self.router = routers.RouterReplicas()
+        self.factory = RequestFactory()
+
+    def _solicitud(self, metodo='get', user=None):
+        request = getattr(self.factory, metodo)('/')
+        request.session = {}
+        request.user = user or User(username='lector')
+        return request
+
+    def test_contextos_de_lectura(self):
+        self.assertEqual(self.router.db_for_read(Cliente), 'default')
+        with routers.usar_replica():
+            self.assertEqual(self.router.db_for_read(Cliente), 'replica1')
+            self.assertEqual(self.router.db_for_write(Cliente), 'default')
+            with routers.usar_primaria():
+                self.assertEqual(self.router.db_for_read(Cliente), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+
+    def test_vista_de_solo_lectura_y_fijacion(self):
+        vista = routers.lectura_replica(lambda request: HttpResponse(self.router.db_for_read(Cliente)))
+        request = self._solicitud()
+        self.assertEqual(vista(request).content, b'replica1')
+
+        escritura = self._solicitud('post')
+        escritura.session = request.session
+        FijacionPrimariaMiddleware(lambda request: HttpResponse(status=302))(escritura)
+        self.assertEqual(vista(request).content, b'default')
+
+    def test_sin_fijacion_para_anonimos_ni_errores(self):
+        middleware = FijacionPrimariaMiddleware(lambda request: HttpResponse(status=400))
+        request = self._solicitud('post')
+        middleware(request)
+        anonimo = self._solicitud('post', AnonymousUser())
+        FijacionPrimariaMiddleware(lambda request: HttpResponse())(anonimo)
+        self.assertEqual((request.session, anonimo.session), ({}, {}))
+
+
+class PoolConexionesTests(SimpleTestCase):
+    """Pool del backend core.backends.mysql_pool (con conexiones SQLite reales)"""
+
+    def _pool(self, **opciones):
+        pool = pool_conexiones.obtener_pool('pool_tests', (':memory:',), opciones)
+        self.addCleanup(pool_conexiones._POOLS.pop, 'pool_tests')
+        self.addCleanup(pool.cerrar_libres)
+        return pool
+
+    def test_reutiliza_y_publica_metricas(self):
+        pool = self._pool()
+        conexion, nueva = pool.tomar(lambda: sqlite3.connect(':memory:'))
+        self.assertTrue(nueva)
+        pool.devolver(conexion)
+        self.assertEqual(pool.tomar(sqlite3.connect)[0], conexion)
+
+        texto = REGISTRO.exportar()
+        self.assertIn('tda_db_pool_conexiones_en_uso{base="pool_tests"} 1', texto)
+        self.assertIn('tda_db_pool_conexiones_creadas_total{base="pool_tests"} 1', texto)
+
+    def test_maximo_y_espera_agotada(self):
+        pool = self._pool(MAXIMO=1, ESPERA=0.05)
+        pool.tomar(lambda: sqlite3.connect(':memory:'))
+        with self.assertRaises(pool_conexiones.PoolAgotado):
+            pool.tomar(lambda: sqlite3.connect(':memory:'))
+        self.assertEqual(pool.estado()['esperas_agotadas'], 1)
+
+    def test_recicla_inactivas_y_descarta_sin_ping(self):
+        pool = self._pool(MAX_INACTIVA=0)
+        conexion, _ = pool.tomar(lambda: sqlite3.connect(':memory:'))
+        pool.devolver(conexion)
+        time.sleep(0.01)
+        self.assertTrue(pool.tomar(lambda: sqlite3.connect(':memory:'))[1])
+
+        pool.opciones['MAX_INACTIVA'] = 300
+        muerta, _ = pool.tomar(lambda: sqlite3.connect(':memory:'))
+        pool.devolver(muerta)
+        muerta.close()
+        conexion, nueva = pool.tomar(lambda: sqlite3.connect(':memory:'))
+        self.assertTrue(nueva)
+        self.assertEqual(
+            {clave: pool.estado()[clave] for clave in ('en_uso', 'creadas', 'recicladas', 'descartadas')},
+            {'en_uso': 2, 'creadas': 4, 'recicladas': 1, 'descartadas': 1}
+        )
+
+
+# TransactionTestCase: las consultas en paralelo usan otras conexiones, que no verían los datos
+# de la transacción de un TestCase
+@override_settings(DATABASE_REPLICAS=[])
+class VistasAsyncTests(TransactionTestCase):
+    """Dashboards async: mismas consultas que los sync, ejecutadas en paralelo"""
+
+    def setUp(self):
+        User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests')
+        call_command('generar_carga', tickets=30, areas=2, usuarios=8, clientes=5, stdout=StringIO())
+        self.jefe = benchmark.usuarios_benchmark().jefe
+        cache.clear()
+
+    def _request(self, usuario):
+        request = RequestFactory().get(reverse('dashboard'))
+        request.user = usuario
+        request.session = {}
+        request.acceso = contexto_acceso(usuario)
+        return request
+
+    def test_mismo_contexto_que_la_vista_sync(self):
+        acceso = contexto_acceso(self.jefe)
+        for consultas, contexto in (
+            (lambda: views._consultas_dashboard(self.jefe, acceso), views._contexto_dashboard),
+            (lambda: views._consultas_dashboard_jefatura(acceso.area_jefatura),
+             lambda resultados: views._contexto_dashboard_jefatura(acceso.area_jefatura, resultados)),
+        ):
+            sync = contexto(views._ejecutar_consultas(consultas()))
+            paralelo = contexto(async_to_sync(en_paralelo)(consultas()))
+            self.assertEqual(paralelo, sync)
+
+    def test_vistas_responden(self):
+        for vista in (views.dashboard_async_view, views.dashboard_jefatura_async_view):
+            with self.subTest(vista=vista.__name__):
+                self.assertEqual(async_to_sync(vista)(self._request(self.jefe)).status_code, 200)
+
+        anonimo = self._request(AnonymousUser())
+        self.assertEqual(async_to_sync(views.dashboard_async_view)(anonimo).status_code, 302)
+
+
+@override_settings(EVENTOS_COLA=True, DATABASE_REPLICAS=[])
+class EventosColaTests(TestCase):
+    """Cambios de la cola sin asignar publicados a las conexiones suscritas a su área"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(nombre='Soporte')
+        cls.usuario = User.objects.create_user('soporte', password='clave-tests')
+        Perfil.objects.create(usuario=cls.usuario, area=cls.area)
+        cls.cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+
+    def setUp(self):
+        cache.clear()
+        broker = mock.patch.object(eventos, '_broker', eventos.BrokerMemoria())
+        self.broker = broker.start()
+        self.addCleanup(broker.stop)
+
+    def _crear_y_tomar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(
+                titulo='Sin red', descripcion_problema='No hay conexión', nivel_critico='ALTO',
+                tipo_problema='Red', cliente_solicitante=self.cliente, area_asignada=self.area,
+                trabajador_creador=self.usuario,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.trabajador_asignado = self.usuario
+            ticket.save()
+        return ticket
+
+    def test_suscripcion_recibe_cambios_del_area(self):
+        async def escuchar():
+            suscripcion = self.broker.suscribir([self.area.id])
+            otra_area = self.broker.suscribir([self.area.id + 1])
+            ticket = await sync_to_async(self._crear_y_tomar)()
+            recibidos = [await suscripcion.siguiente(1), await suscripcion.siguiente(1)]
+            return ticket, recibidos, await otra_area.siguiente(0.01)
+
+        ticket, recibidos, otra_area = async_to_sync(escuchar)()
+        self.assertEqual(recibidos, [
+            {'area': self.area.id, 'tipo': eventos.NUEVO, 'ticket': ticket.id, 'sin_asignar': 1},
+            {'area': self.area.id, 'tipo': eventos.ASIGNADO, 'ticket': ticket.id, 'sin_asignar': 0},
+        ])
+        self.assertIsNone(otra_area)
+
+    def test_sin_suscriptores_no_publica(self):
+        # Tampoco recalcula el total de la cola para el evento
+        with CaptureQueriesContext(connection) as consultas:
+            self._crear_y_tomar()
+        self.assertFalse([consulta for consulta in consultas if 'SUM(' in consulta['sql']])
+        self.assertEqual(self.broker.estado()['publicados'], 0)
+
+    def test_flujo_sse(self):
+        async def leer():
+            respuesta = await self.async_client.get(reverse('eventos_cola'))
+            return respuesta, b''.join([fragmento async for fragmento in respuesta.streaming_content])
+
+        self.client.force_login(self.usuario)
+        self.async_client.cookies = self.client.cookies
+        with self.settings(EVENTOS_DURACION_MAXIMA_SEGUNDOS=0):
+            respuesta, contenido = async_to_sync(leer)()
+
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        self.assertIn(
+            f'event: cola\ndata: {{"area": {self.area.id}, "tipo": "inicial", "ticket": null, "sin_asignar": 0}}',
+            contenido.decode()
+        )
+        self.assertEqual(self.broker.estado()['suscriptores'], 0)
+
+
+class OutboxTests(TestCase):
+    """Efectos secundarios registrados con la mutación y despachados por procesar_outbox"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests')
+
+    def _crear_usuario(self):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse('crear_usuario'), {
+            'username': 'mperez', 'email': 'mperez@ejemplo.test', 'first_name': 'María', 'last_name': 'Pérez',
+            'password1': 'clave-segura-1', 'password2': 'clave-segura-1',
+        })
+
+    def test_crear_usuario_envia_correo_desde_el_worker(self):
+        self.assertEqual(self._crear_usuario().status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        evento = EventoOutbox.objects.get()
+        self.assertEqual(evento.tipo, outbox.USUARIO_CREADO)
+
+        salida = StringIO()
+        call_command('procesar_outbox', una_vez=True, stdout=salida)
+        self.assertIn('1 enviados', salida.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['mperez@ejemplo.test'])
+        self.assertIn('Usuario: mperez', mail.outbox[0].body)
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, EventoOutbox.Estado.ENVIADO)
+
+    def test_evento_no_existe_si_la_transaccion_se_revierte(self):
+        with mock.patch.object(outbox, 'registrar', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self._crear_usuario()
+        self.assertFalse(User.objects.filter(username='mperez').exists())
+        self.assertFalse(EventoOutbox.objects.exists())
+
+    @override_settings(OUTBOX_MAX_INTENTOS=2)
+    def test_reintento_con_espera_y_fallido(self):
+        evento = outbox.registrar(outbox.USUARIO_CREADO, usuario_id=self.admin.id)
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', side_effect=ConnectionError('SMTP caído')):
+            self.assertEqual(outbox.procesar_lote().reintentos, 1)
+            evento.refresh_from_db()
+            self.assertEqual((evento.estado, evento.intentos), (EventoOutbox.Estado.PENDIENTE, 1))
+            self.assertGreater(evento.disponible_desde, timezone.now())
+            self.assertEqual(outbox.procesar_lote().procesados, 0)
+
+            EventoOutbox.objects.filter(pk=evento.pk).update(disponible_desde=timezone.now())
+            self.assertEqual(outbox.procesar_lote().fallidos, 1)
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, EventoOutbox.Estado.FALLIDO)
+        self.assertIn('SMTP caído', evento.ultimo_error)
+
+
+class ContadoresVistasTests(TestCase):
+    """Las vistas que cambian un ticket mantienen ContadorTickets igual a los tickets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests')
+        cls.soporte = Area.objects.create(nombre='Soporte')
+        cls.redes = Area.objects.create(nombre='Redes')
+        cls.trabajador = User.objects.create_user('soporte', password='clave-tests')
+        Perfil.objects.create(usuario=cls.trabajador, area=cls.soporte)
+        cls.ticket = Ticket.objects.create(
+            titulo='Sin red', descripcion_problema='No hay conexión', nivel_critico='ALTO', tipo_problema='Red',
+            cliente_solicitante=Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test'),
+            area_asignada=cls.soporte, trabajador_creador=cls.admin,
+        )
+
+    def _post(self, usuario, url, datos=None):
+        self.client.force_login(usuario)
+        respuesta = self.client.post(reverse(url, args=[self.ticket.id]), datos or {})
+        self.assertEqual(respuesta.status_code, 302)
+
+    def test_recontar_no_encuentra_diferencias(self):
+        self._post(self.trabajador, 'tomar_ticket')
+        self._post(self.admin, 'asignar_ticket', {'trabajador_asignado': ''})
+        self._post(self.admin, 'derivar_ticket', {'area_destino': self.redes.id, 'motivo_derivacion': 'Es de redes'})
+        self._post(self.admin, 'cambiar_estado_ticket', {'nuevo_estado': Ticket.Estado.EN_PROCESO})
+
+        self.ticket.refresh_from_db()
+        self.assertEqual(
+            (self.ticket.area_asignada, self.ticket.estado, self.ticket.trabajador_asignado),
+            (self.redes, Ticket.Estado.EN_PROCESO, None)
+        )
+        salida = StringIO()
+        call_command('recontar_contadores', verificar=True, stdout=salida)
+        self.assertIn('Los contadores coinciden', salida.getvalue())
+
+    def test_edicion_con_formulario_guarda_todos_los_campos(self):
+        ticket = Ticket.objects.get(pk=self.ticket.pk)
+        fecha_actualizacion = ticket.fecha_actualizacion
+        # Conteo incrementado después de cargar la instancia: save() no debe pisarlo
+        Observacion.objects.create(ticket_asociado=self.ticket, observacion_texto='Revisado', autor_trabajador=self.admin)
+
+        form = TicketForm({
+            'titulo': 'Impresora atascada', 'descripcion_problema': 'Papel trabado', 'nivel_critico': 'CRITICO',
+            'tipo_problema': 'Hardware', 'area_asignada': self.redes.id,
+            'cliente_existente': ticket.cliente_solicitante_id,
+        }, instance=ticket)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        ticket.refresh_from_db()
+        self.assertEqual(
+            (ticket.titulo, ticket.descripcion_problema, ticket.nivel_critico, ticket.tipo_problema, ticket.area_asignada),
+            ('Impresora atascada', 'Papel trabado', 'CRITICO', 'Hardware', self.redes)
+        )
+        self.assertEqual((ticket.prioridad, ticket.observaciones_count), (Ticket.PRIORIDADES['CRITICO'], 1))
+        self.assertGreater(ticket.fecha_actualizacion, fecha_actualizacion)
+        self.assertEqual(list(Ticket.objects.buscar('impresora')), [ticket])
+        call_command('recontar_contadores', verificar=True, stdout=StringIO())
+
+    def test_derivar_revierte_todo_si_falla(self):
+        self.client.force_login(self.admin)
+        with mock.patch.object(outbox, 'registrar', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post(
+                    reverse('derivar_ticket', args=[self.ticket.id]),
+                    {'area_destino': self.redes.id, 'motivo_derivacion': 'Es de redes'}
+                )
+        self.ticket.refresh_from_db()
+        self.assertEqual((self.ticket.area_asignada, self.ticket.derivaciones_count), (self.soporte, 0))
+        self.assertFalse(Derivacion.objects.exists())
+        call_command('recontar_contadores', verificar=True, stdout=StringIO())
+
+
+class AccionesMasivasTests(TestCase):
+    """Acciones masivas: rechazos por ticket, contadores, observaciones, derivaciones y outbox"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soporte = Area.objects.create(nombre='Soporte')
+        cls.redes = Area.objects.create(nombre='Redes')
+        cls.jefe = User.objects.create_user('jefe', password='clave-tests')
+        Perfil.objects.create(usuario=cls.jefe, area=cls.soporte)
+        Jefatura.objects.create(trabajador_jefe=cls.jefe, area_jefatura=cls.soporte, fecha_inicio_jefatura=timezone.now().date())
+        cls.trabajador = User.objects.create_user('soporte', first_name='Juan', last_name='Soto', password='clave-tests')
+        Perfil.objects.create(usuario=cls.trabajador, area=cls.soporte)
+        cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+
+        def crear(area, estado=Ticket.Estado.ABIERTO):
+            return Ticket.objects.create(
+                titulo='Sin red', descripcion_problema='No hay conexión', nivel_critico='ALTO', tipo_problema='Red',
+                cliente_solicitante=cliente, area_asignada=area, trabajador_creador=cls.jefe, estado=estado,
+            )
+        cls.abierto_1, cls.abierto_2 = crear(cls.soporte), crear(cls.soporte)
+        cls.en_proceso = crear(cls.soporte, Ticket.Estado.EN_PROCESO)
+        cls.ajeno = crear(cls.redes)
+
+    def setUp(self):
+        cache.clear()
+
+    def _verificar(self, resultado, actualizados, rechazados, tipo_evento):
+        self.assertEqual(resultado.actualizados, [ticket.id for ticket in actualizados])
+        self.assertEqual(set(resultado.rechazados), {getattr(ticket, 'id', ticket) for ticket in rechazados})
+        self.assertEqual(
+            sorted(evento.datos['ticket_id'] for evento in EventoOutbox.objects.filter(tipo=tipo_evento)),
+            sorted(resultado.actualizados)
+        )
+        # Mismo control que recontar_contadores --verificar: ContadorTickets y conteos de cada ticket
+        call_command('recontar_contadores', verificar=True, stdout=StringIO())
+
+    def test_asignar_y_desasignar(self):
+        resultado = acciones_masivas.asignar_tickets(
+            self.jefe, [self.abierto_1.id, self.abierto_2.id, self.ajeno.id, 999999], self.trabajador
+        )
+        self._verificar(resultado, [self.abierto_1, self.abierto_2], [self.ajeno, 999999], outbox.TICKET_ASIGNADO)
+        self.assertIn('permisos', resultado.rechazados[self.ajeno.id])
+        self.assertEqual(Ticket.objects.filter(trabajador_asignado=self.trabajador).count(), 2)
+
+        resultado = acciones_masivas.asignar_tickets(self.jefe, [self.abierto_1.id, self.en_proceso.id], None)
+        self.assertEqual(resultado.actualizados, [self.abierto_1.id])
+        self.assertEqual(resultado.rechazados, {self.en_proceso.id: 'El ticket ya tiene esa asignación'})
+        call_command('recontar_contadores', verificar=True, stdout=StringIO())
+        self.abierto_1.refresh_from_db()
+        self.assertIsNone(self.abierto_1.trabajador_asignado)
+        self.assertEqual(
+            list(self.abierto_1.observaciones.values_list('observacion_texto', flat=True).order_by('id')),
+            ['Ticket asignado a Juan Soto', 'Ticket desasignado de Juan Soto']
+        )
+        self.assertEqual(self.abierto_1.observaciones_count, 2)
+
+    def test_derivar(self):
+        resultado = acciones_masivas.derivar_tickets(
+            self.trabajador, [self.abierto_1.id, self.en_proceso.id, self.ajeno.id], self.redes, 'Es de redes'
+        )
+        self._verificar(resultado, [self.abierto_1], [self.en_proceso, self.ajeno], outbox.TICKET_DERIVADO)
+        self.assertEqual(resultado.rechazados[self.en_proceso.id], 'Solo se pueden derivar tickets en estado ABIERTO')
+        self.abierto_1.refresh_from_db()
+        self.assertEqual((self.abierto_1.area_asignada, self.abierto_1.derivaciones_count), (self.redes, 1))
+        self.assertEqual(Derivacion.objects.get().ticket, self.abierto_1)
+
+    def test_cambiar_estado(self):
+        resultado = acciones_masivas.cambiar_estado_tickets(
+            self.jefe, [self.abierto_1.id, self.en_proceso.id, self.ajeno.id], Ticket.Estado.RESUELTO,
+            'Se reinició el equipo'
+        )
+        self._verificar(resultado, [self.en_proceso], [self.abierto_1, self.ajeno], outbox.TICKET_ESTADO)
+        self.assertIn('No se puede cambiar', resultado.rechazados[self.abierto_1.id])
+        self.assertIn('permisos', resultado.rechazados[self.ajeno.id])
+        self.en_proceso.refresh_from_db()
+        self.assertEqual(self.en_proceso.estado, Ticket.Estado.RESUELTO)
+        self.assertIsNotNone(self.en_proceso.fecha_resolucion)
+        self.assertEqual(Observacion.objects.get().ticket_asociado, self.en_proceso)
+        self.assertEqual(self.en_proceso.observaciones_count, 1)
+
+    def test_formulario_limita_los_tickets(self):
+        def formulario(cantidad):
+            datos = QueryDict(mutable=True)
+            datos.setlist('tickets', [str(numero) for numero in range(1, cantidad + 1)])
+            datos['accion'] = AccionMasivaForm.ASIGNAR
+            return AccionMasivaForm(datos)
+
+        self.assertTrue(formulario(AccionMasivaForm.MAX_TICKETS).is_valid())
+        form = formulario(AccionMasivaForm.MAX_TICKETS + 1)
+        self.assertFalse(form.is_valid())
+        self.assertIn('tickets', form.errors)
+
+
+class PaginadorCursorTests(TestCase):
+    """Paginación keyset: ida y vuelta entre páginas, empates en la clave de orden y cursores alterados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = User.objects.create_user('soporte', password='clave-tests')
+        area = Area.objects.create(nombre='Soporte')
+        cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+        for numero in range(7):
+            Ticket.objects.create(
+                titulo=f'Ticket {numero}', descripcion_problema='Sin red', nivel_critico='BAJO', tipo_problema='Red',
+                cliente_solicitante=cliente, area_asignada=area, trabajador_creador=usuario,
+            )
+        # Empate en la clave de orden: la mitad de los tickets con la misma fecha
+        ids = sorted(Ticket.objects.values_list('id', flat=True))
+        Ticket.objects.filter(id__in=ids[1:5]).update(fecha_creacion=timezone.now())
+        cls.esperado = list(Ticket.objects.order_by('-fecha_creacion', '-pk').values_list('id', flat=True))
+
+    def _pagina(self, consulta=''):
+        return PaginadorCursor(Ticket.objects.all(), ['-fecha_creacion'], por_pagina=3).obtener_pagina(QueryDict(consulta))
+
+    def _ids(self, pagina):
+        return [ticket.id for ticket in pagina]
+
+    def test_siguiente_y_anterior(self):
+        paginas = [self._pagina()]
+        while paginas[-1].tiene_siguiente:
+            paginas.append(self._pagina(paginas[-1].url_siguiente[1:]))
+        self.assertEqual([ticket for pagina in paginas for ticket in self._ids(pagina)], self.esperado)
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 1])
+
+        anterior = self._pagina(paginas[2].url_anterior[1:])
+        self.assertEqual(self._ids(anterior), self.esperado[3:6])
+        self.assertTrue(anterior.tiene_anterior and anterior.tiene_siguiente)
+        self.assertEqual(self._ids(self._pagina(anterior.url_anterior[1:])), self.esperado[:3])
+
+        ultima = self._pagina(paginas[0].url_ultima[1:])
+        self.assertEqual(self._ids(ultima), self.esperado[4:])
+        self.assertFalse(ultima.tiene_siguiente)
+
+    def test_cursor_alterado_muestra_la_primera_pagina(self):
+        fecha = timezone.now().isoformat()
+        for valores in (['no es fecha', 1], [fecha, 'no es id'], [fecha], [fecha, 1, 2], [None, 1], {'id': 1}):
+            with self.subTest(valores=valores):
+                pagina = self._pagina(f'despues={codificar_cursor(valores)}')
+                self.assertEqual(self._ids(pagina), self.esperado[:3])
+                self.assertFalse(pagina.tiene_anterior)
+        self.assertEqual(self._ids(self._pagina('antes=%%%')), self.esperado[:3])
+
+
+class ImportacionTicketsTests(TestCase):
+    """Importación por lotes: validación de filas, upsert de clientes, contadores, índice y errores de lectura"""
+
+    COLUMNAS = 'titulo,descripcion_problema,nivel_critico,tipo_problema,area,cliente_nombre,cliente_email,estado\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests')
+        cls.area = Area.objects.create(nombre='Soporte Técnico')
+        Cliente.objects.create(nombre='Ana', correo_electronico='ana@ejemplo.test', telefono='555-1234')
+
+    def _importar(self, contenido, lote=1000):
+        archivo = importacion.abrir_texto(BytesIO(contenido if isinstance(contenido, bytes) else contenido.encode()))
+        return importacion.importar_tickets(importacion.leer_filas(archivo, importacion.FORMATO_CSV), self.admin, lote=lote)
+
+    def test_validar_fila(self):
+        areas = importacion.mapa_areas()
+        fila = {
+            'titulo': ' Sin red ', 'descripcion_problema': 'No hay conexión', 'nivel_critico': 'Crítico',
+            'tipo_problema': 'Red', 'area': 'soporte tecnico', 'cliente_nombre': 'Ana', 'cliente_email': 'ana@ejemplo.test',
+            'estado': 'resuelto',
+        }
+        datos = importacion.validar_fila(fila, areas)
+        self.assertEqual(
+            (datos['titulo'], datos['nivel_critico'], datos['estado'], datos['area_asignada_id']),
+            ('Sin red', Ticket.NivelCritico.CRITICO, Ticket.Estado.RESUELTO, self.area.id)
+        )
+        for cambios, error in [
+            ({'area': 'Bodega'}, 'Área desconocida'),
+            ({'nivel_critico': 'urgente'}, 'Nivel crítico inválido'),
+            ({'estado': 'pendiente'}, 'Estado inválido'),
+            ({'cliente_email': 'ana'}, 'Correo inválido'),
+            ({'titulo': ''}, 'Faltan valores: titulo'),
+            ({'titulo': 'x' * 201}, 'supera los 200'),
+            ({'_error': 'JSON inválido'}, 'JSON inválido'),
+        ]:
+            with self.subTest(cambios=cambios):
+                with self.assertRaisesMessage(ValueError, error):
+                    importacion.validar_fila({**fila, **cambios}, areas)
+
+    def test_importa_con_clientes_contadores_e_indice(self):
+        resultado = self._importar(
+            self.COLUMNAS
+            + 'Impresora atascada,No imprime,ALTO,Hardware,Soporte Técnico,Ana Rojas,ana@ejemplo.test,\n'
+            + 'Sin red,No hay conexión,BAJO,Red,Soporte Técnico,Pedro,pedro@ejemplo.test,RESUELTO\n'
+            + 'Sin área,x,BAJO,Red,Bodega,Pedro,pedro@ejemplo.test,\n'
+            + 'Cuenta bloqueada,No entra,MEDIO,Acceso,Soporte Técnico,Pedro,pedro@ejemplo.test,CERRADO\n',
+            lote=2
+        )
+        self.assertIsNone(resultado.interrupcion)
+        self.assertEqual((resultado.filas, resultado.tickets_creados, resultado.filas_con_error), (4, 3, 1))
+        self.assertEqual(resultado.errores, [(4, 'Área desconocida: Bodega')])
+        # Pedro aparece en los dos lotes: se crea en el primero y se actualiza en el segundo
+        self.assertEqual((resultado.clientes_creados, resultado.clientes_actualizados), (1, 2))
+
+        ana = Cliente.objects.get(correo_electronico='ana@ejemplo.test')
+        self.assertEqual((ana.nombre, ana.telefono), ('Ana Rojas', '555-1234'))
+        abierto, resuelto, cerrado = Ticket.objects.order_by('id')
+        self.assertEqual((abierto.fecha_resolucion, abierto.fecha_cierre), (None, None))
+        self.assertIsNotNone(resuelto.fecha_resolucion)
+        self.assertIsNone(resuelto.fecha_cierre)
+        self.assertIsNotNone(cerrado.fecha_cierre)
+        self.assertEqual(abierto.prioridad, Ticket.PRIORIDADES[Ticket.NivelCritico.ALTO])
+
+        call_command('recontar_contadores', verificar=True, stdout=StringIO())
+        self.assertEqual(list(Ticket.objects.buscar('impresora')), [abierto])
+
+    def test_error_de_lectura_informa_lo_importado(self):
+        fila = 'Sin red,No hay conexión,BAJO,Red,Soporte Técnico,Pedro,pedro@ejemplo.test,\n'
+        contenido = (self.COLUMNAS + fila * 300).encode() + b'\xff\xfe roto\n' + fila.encode()
+        resultado = self._importar(contenido, lote=50)
+
+        linea, mensaje = resultado.interrupcion
+        self.assertIn('decode', mensaje)
+        self.assertGreater(resultado.tickets_creados, 0)
+        self.assertEqual(Ticket.objects.count(), resultado.tickets_creados)
+        self.assertEqual(linea, resultado.filas + 2)
+
+        with tempfile.NamedTemporaryFile(suffix='.csv') as archivo:
+            archivo.write(contenido)
+            archivo.flush()
+            with self.assertRaisesMessage(CommandError, f'Quedaron importados {resultado.tickets_creados} tickets'):
+                call_command('importar_tickets', archivo.name, usuario='admin_tests', lote=50, stdout=StringIO())
+
+    def test_columnas_faltantes(self):
+        resultado = self._importar('titulo,area\nSin red,Soporte Técnico\n')
+        self.assertEqual(resultado.interrupcion[0], 1)
+        self.assertIn('Faltan columnas', resultado.interrupcion[1])
+        self.assertEqual(resultado.tickets_creados, 0)
+
+
+class ExportacionTicketsTests(TestCase):
+    """La exportación respeta la visibilidad del usuario y los filtros de la lista"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soporte = Area.objects.create(nombre='Soporte')
+        redes = Area.objects.create(nombre='Redes')
+        cls.trabajador = User.objects.create_user('soporte', password='clave-tests')
+        Perfil.objects.create(usuario=cls.trabajador, area=cls.soporte)
+        creador = User.objects.create_user('mesa', password='clave-tests')
+        cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+
+        def crear(titulo, area, estado=Ticket.Estado.ABIERTO):
+            return Ticket.objects.create(
+                titulo=titulo, descripcion_problema='Detalle', nivel_critico='BAJO', tipo_problema='Red',
+                cliente_solicitante=cliente, area_asignada=area, trabajador_creador=creador, estado=estado,
+            )
+        cls.abierto = crear('Sin red', cls.soporte)
+        cls.en_proceso = crear('=HYPERLINK("x")', cls.soporte, Ticket.Estado.EN_PROCESO)
+        crear('Router caído', redes)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.trabajador)
+
+    def _exportar(self, **parametros):
+        respuesta = self.client.get(reverse('exportar_tickets'), parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return b''.join(respuesta.streaming_content)
+
+    def test_csv_solo_tickets_visibles_y_filtrados(self):
+        filas = list(csv.reader(StringIO(self._exportar().decode('utf-8-sig'))))
+        self.assertEqual(filas[0][:2], ['ID', 'Título'])
+        self.assertEqual(sorted(int(fila[0]) for fila in filas[1:]), [self.abierto.id, self.en_proceso.id])
+        # Texto que la planilla evaluaría como fórmula
+        self.assertIn('\'=HYPERLINK("x")', [fila[1] for fila in filas])
+
+        filas = list(csv.reader(StringIO(self._exportar(estado=Ticket.Estado.EN_PROCESO).decode('utf-8-sig'))))
+        self.assertEqual([int(fila[0]) for fila in filas[1:]], [self.en_proceso.id])
+
+    def test_xlsx_valido(self):
+        contenido = self._exportar(formato='xlsx', orden='fecha_creacion')
+        with zipfile.ZipFile(BytesIO(contenido)) as archivo:
+            self.assertIsNone(archivo.testzip())
+            hoja = ElementTree.fromstring(archivo.read('xl/worksheets/sheet1.xml'))
+        espacio = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        filas = hoja.iter(f'{espacio}row')
+        encabezado = [celda.findtext(f'.//{espacio}t') for celda in next(filas)]
+        self.assertEqual(encabezado, [titulo for _, titulo in exportacion.COLUMNAS])
+        self.assertEqual(
+            [(fila.find(f'{espacio}c/{espacio}v').text, fila.findtext(f'.//{espacio}t')) for fila in filas],
+            [(str(self.abierto.id), 'Sin red'), (str(self.en_proceso.id), '=HYPERLINK("x")')]
+        )
+
+
+class VisibilidadTicketsTests(TestCase):
+    """Ticket.objects.visibles_para según el rol del usuario"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soporte, cls.redes, cls.bodega = [Area.objects.create(nombre=nombre) for nombre in ('Soporte', 'Redes', 'Bodega')]
+        cls.mesa = User.objects.create_user('mesa', password='clave-tests')
+        cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+
+        def crear(area, **extra):
+            return Ticket.objects.create(
+                titulo='Sin red', descripcion_problema='Detalle', nivel_critico='BAJO', tipo_problema='Red',
+                cliente_solicitante=cliente, area_asignada=area, trabajador_creador=cls.mesa, **extra,
+            )
+        cls.trabajador = User.objects.create_user('soporte', password='clave-tests')
+        Perfil.objects.create(usuario=cls.trabajador, area=cls.soporte)
+        cls.de_soporte = crear(cls.soporte)
+        cls.de_redes = crear(cls.redes)
+        cls.de_bodega = crear(cls.bodega)
+        # Asignado al trabajador de soporte aunque está en otra área
+        cls.asignado_fuera = crear(cls.bodega, trabajador_asignado=cls.trabajador)
+
+    def setUp(self):
+        cache.clear()
+
+    def _visibles(self, usuario):
+        return set(Ticket.objects.visibles_para(usuario))
+
+    def test_superusuario_ve_todos(self):
+        admin = User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests')
+        self.assertEqual(self._visibles(admin), set(Ticket.objects.all()))
+
+    def test_jefe_de_varias_areas(self):
+        jefe = User.objects.create_user('jefe', password='clave-tests')
+        for area in (self.soporte, self.redes):
+            Jefatura.objects.create(trabajador_jefe=jefe, area_jefatura=area, fecha_inicio_jefatura=timezone.now().date())
+        self.assertEqual(self._visibles(jefe), {self.de_soporte, self.de_redes})
+
+    def test_trabajador_ve_su_area_y_lo_asignado_fuera_de_ella(self):
+        self.assertEqual(self._visibles(self.trabajador), {self.de_soporte, self.asignado_fuera})
+
+    def test_sin_perfil_solo_lo_que_creo(self):
+        sin_perfil = User.objects.create_user('externo', password='clave-tests')
+        self.assertEqual(self._visibles(sin_perfil), set())
+        propio = Ticket.objects.create(
+            titulo='Propio', descripcion_problema='Detalle', nivel_critico='BAJO', tipo_problema='Red',
+            cliente_solicitante=self.de_bodega.cliente_solicitante, area_asignada=self.bodega, trabajador_creador=sin_perfil,
+        )
+        self.assertEqual(self._visibles(sin_perfil), {propio})
+
+    def test_anonimo_no_ve_nada(self):
+        self.assertFalse(Ticket.objects.visibles_para(AnonymousUser()).exists())
+
+
+class TimelineTicketTests(TestCase):
+    """Timeline paginado: observaciones y derivaciones intercaladas, con empates de fecha entre ambas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        soporte, redes = Area.objects.create(nombre='Soporte'), Area.objects.create(nombre='Redes')
+        cls.trabajador = User.objects.create_user('soporte', password='clave-tests')
+        Perfil.objects.create(usuario=cls.trabajador, area=soporte)
+        cls.ticket = Ticket.objects.create(
+            titulo='Sin red', descripcion_problema='Detalle', nivel_critico='BAJO', tipo_problema='Red',
+            cliente_solicitante=Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test'),
+            area_asignada=soporte, trabajador_creador=cls.trabajador,
+        )
+        for numero in range(4):
+            Observacion.objects.create(ticket_asociado=cls.ticket, observacion_texto=f'Revisión {numero}', autor_trabajador=cls.trabajador)
+        for _ in range(3):
+            Derivacion.objects.create(
+                ticket=cls.ticket, area_origen=soporte, area_destino=redes, trabajador_origen=cls.trabajador,
+                motivo_derivacion='Es de redes',
+            )
+        # Dos fechas compartidas por observaciones y derivaciones
+        antes, despues = timezone.now() - timedelta(hours=1), timezone.now()
+        for modelo, campo in ((Observacion, 'fecha_hora_observacion'), (Derivacion, 'fecha_derivacion')):
+            ids = sorted(modelo.objects.values_list('id', flat=True))
+            modelo.objects.filter(id__in=ids[::2]).update(**{campo: antes})
+            modelo.objects.filter(id__in=ids[1::2]).update(**{campo: despues})
+
+    def _todos(self):
+        eventos, _ = pagina_timeline(self.ticket, por_pagina=100)
+        return [(evento.tipo, evento.id) for evento in eventos]
+
+    def test_paginas_con_fechas_empatadas(self):
+        esperado = self._todos()
+        self.assertEqual(len(esperado), 7)
+        for por_pagina in (1, 2, 3):
+            with self.subTest(por_pagina=por_pagina):
+                recorridos, cursor = [], ''
+                while cursor is not None:
+                    eventos, cursor = pagina_timeline(self.ticket, cursor, por_pagina)
+                    recorridos += [(evento.tipo, evento.id) for evento in eventos]
+                self.assertEqual(recorridos, esperado)
+
+    def test_vista_y_cursor_alterado(self):
+        self.client.force_login(self.trabajador)
+        url = reverse('ticket_timeline', args=[self.ticket.id])
+        primera = self.client.get(url).json()
+        self.assertEqual(len(primera['eventos']), 7)
+        for valores in (['no es fecha', 1, 1], [timezone.now().isoformat(), 'x', 1], [None, 1, 1], [1, 2]):
+            with self.subTest(valores=valores):
+                respuesta = self.client.get(url, {'cursor': codificar_cursor(valores)})
+                self.assertEqual(respuesta.json()['eventos'], primera['eventos'])
+
+    def test_ticket_no_visible(self):
+        otro = User.objects.create_user('externo', password='clave-tests')
+        self.client.force_login(otro)
+        self.assertEqual(self.client.get(reverse('ticket_timeline', args=[self.ticket.id])).status_code, 404)
+
+
+class EstadisticasTests(TestCase):
+    """Los conteos agregados coinciden con contar cada estado por separado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soporte, cls.redes = Area.objects.create(nombre='Soporte'), Area.objects.create(nombre='Redes')
+        cls.jefe = User.objects.create_user('jefe', password='clave-tests')
+        Jefatura.objects.create(trabajador_jefe=cls.jefe, area_jefatura=cls.soporte, fecha_inicio_jefatura=timezone.now().date())
+        cls.trabajador = User.objects.create_user('soporte', first_name='Juan', last_name='Soto', password='clave-tests')
+        cls.inactivo = User.objects.create_user('inactivo', password='clave-tests', is_active=False)
+        cls.de_redes = User.objects.create_user('redes', password='clave-tests')
+        for usuario, area in ((cls.jefe, cls.soporte), (cls.trabajador, cls.soporte), (cls.inactivo, cls.soporte), (cls.de_redes, cls.redes)):
+            Perfil.objects.create(usuario=usuario, area=area)
+        cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+
+        asignaciones = [None, cls.trabajador, cls.jefe, cls.inactivo, cls.de_redes]
+        for numero, (estado, nivel) in enumerate(
+            (estado, nivel) for estado in Ticket.Estado.values for nivel in Ticket.NivelCritico.values
+        ):
+            Ticket.objects.create(
+                titulo=f'Ticket {numero}', descripcion_problema='Detalle', nivel_critico=nivel, tipo_problema='Red',
+                estado=estado, cliente_solicitante=cliente, area_asignada=(cls.soporte, cls.redes)[numero % 2],
+                trabajador_creador=cls.jefe, trabajador_asignado=asignaciones[numero % len(asignaciones)],
+            )
+
+    def _ingenuo(self, tickets):
+        """Un COUNT por cada campo del resumen"""
+        sin_asignar = tickets.filter(trabajador_asignado__isnull=True)
+        return estadisticas.ResumenTickets(
+            total=tickets.count(),
+            abiertos=tickets.filter(estado=Ticket.Estado.ABIERTO).count(),
+            en_proceso=tickets.filter(estado=Ticket.Estado.EN_PROCESO).count(),
+            resueltos=tickets.filter(estado=Ticket.Estado.RESUELTO).count(),
+            criticos=tickets.filter(nivel_critico=Ticket.NivelCritico.CRITICO).count(),
+            altos=tickets.filter(nivel_critico=Ticket.NivelCritico.ALTO).count(),
+            asignados=tickets.filter(trabajador_asignado__isnull=False).count(),
+            sin_asignar=sin_asignar.count(),
+            sin_asignar_activos=sin_asignar.filter(estado__in=Ticket.ESTADOS_ACTIVOS).count(),
+        )
+
+    def _carga_ingenua(self, usuario):
+        asignados = Ticket.objects.filter(trabajador_asignado=usuario)
+        return (
+            asignados.count(),
+            asignados.filter(estado__in=Ticket.ESTADOS_ACTIVOS).count(),
+            asignados.filter(estado=Ticket.Estado.EN_PROCESO).count(),
+        )
+
+    def test_resumen_tickets(self):
+        self.assertEqual(estadisticas.resumen_tickets(), self._ingenuo(Ticket.objects.all()))
+        self.assertEqual(estadisticas.resumen_contadores(), self._ingenuo(Ticket.objects.all()))
+        for area in (self.soporte, self.redes):
+            with self.subTest(area=area.nombre):
+                esperado = self._ingenuo(Ticket.objects.filter(area_asignada=area))
+                self.assertEqual(estadisticas.resumen_tickets(Ticket.objects.filter(area_asignada=area)), esperado)
+                self.assertEqual(estadisticas.resumen_contadores(area), esperado)
+
+    def test_carga_trabajo(self):
+        carga = estadisticas.carga_trabajo(self.soporte)
+        self.assertEqual(sorted(trabajador.usuario_id for trabajador in carga), sorted([self.trabajador.id, self.jefe.id]))
+        self.assertEqual([trabajador.activos for trabajador in carga], sorted((trabajador.activos for trabajador in carga), reverse=True))
+        for trabajador in estadisticas.carga_trabajo(self.soporte, solo_activos=False):
+            usuario = User.objects.get(pk=trabajador.usuario_id)
+            with self.subTest(usuario=usuario.username):
+                self.assertEqual((trabajador.asignados, trabajador.activos, trabajador.en_proceso), self._carga_ingenua(usuario))
+                self.assertEqual(trabajador.es_jefe, usuario == self.jefe)
+        self.assertIn(self.inactivo.id, [trabajador.usuario_id for trabajador in estadisticas.carga_trabajo(self.soporte, solo_activos=False)])
+
+    def test_estadisticas_area_tras_cambios(self):
+        ticket = Ticket.objects.filter(area_asignada=self.soporte, estado=Ticket.Estado.ABIERTO).first()
+        ticket.estado, ticket.trabajador_asignado, ticket.nivel_critico = Ticket.Estado.EN_PROCESO, self.trabajador, 'CRITICO'
+        ticket.save()
+        Ticket.objects.filter(area_asignada=self.redes).first().delete()
+
+        for area in (self.soporte, self.redes):
+            with self.subTest(area=area.nombre):
+                resultado = estadisticas.estadisticas_area(area)
+                self.assertEqual(resultado.resumen, self._ingenuo(Ticket.objects.filter(area_asignada=area)))
+                self.assertEqual(resultado.carga_trabajo, estadisticas.carga_trabajo(area))
+        self.assertEqual(estadisticas.estadisticas_area(self.soporte).trabajadores_activos, 1)
+
+
+class PrioridadTicketTests(TestCase):
+    """prioridad sigue a nivel_critico al crear y al editar, y define el orden de la cola de triage"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soporte = Area.objects.create(nombre='Soporte')
+        cls.trabajador = User.objects.create_user('soporte', password='clave-tests')
+        Perfil.objects.create(usuario=cls.trabajador, area=cls.soporte)
+        cls.cliente = Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test')
+
+    def _crear(self, nivel_critico):
+        return Ticket.objects.create(
+            titulo='Sin red', descripcion_problema='Detalle', nivel_critico=nivel_critico, tipo_problema='Red',
+            cliente_solicitante=self.cliente, area_asignada=self.soporte, trabajador_creador=self.trabajador,
+        )
+
+    def _prioridad(self, ticket):
+        return Ticket.objects.values_list('prioridad', flat=True).get(pk=ticket.pk)
+
+    def test_al_crear(self):
+        for nivel, prioridad in Ticket.PRIORIDADES.items():
+            with self.subTest(nivel=nivel):
+                self.assertEqual(self._prioridad(self._crear(nivel)), prioridad)
+
+        self.client.force_login(self.trabajador)
+        respuesta = self.client.post(reverse('crear_ticket'), {
+            'titulo': 'Servidor caído', 'descripcion_problema': 'Detalle', 'nivel_critico': 'CRITICO',
+            'tipo_problema': 'Servidor', 'area_asignada': self.soporte.id, 'cliente_existente': self.cliente.id,
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self._prioridad(Ticket.objects.get(titulo='Servidor caído')), Ticket.PRIORIDADES['CRITICO'])
+
+    def test_al_editar(self):
+        ticket = self._crear('BAJO')
+        ticket.nivel_critico = 'ALTO'
+        ticket.save()
+        self.assertEqual(self._prioridad(ticket), Ticket.PRIORIDADES['ALTO'])
+
+        ticket.nivel_critico = 'MEDIO'
+        ticket.save(update_fields=['nivel_critico'])
+        self.assertEqual(self._prioridad(ticket), Ticket.PRIORIDADES['MEDIO'])
+
+        ticket = Ticket.objects.only('id', 'nivel_critico').get(pk=ticket.pk)
+        ticket.nivel_critico = 'CRITICO'
+        ticket.save()
+        self.assertEqual(self._prioridad(ticket), Ticket.PRIORIDADES['CRITICO'])
+
+    def test_orden_de_la_cola(self):
+        bajo, critico, medio = self._crear('BAJO'), self._crear('CRITICO'), self._crear('MEDIO')
+        otro_bajo = self._crear('BAJO')
+        Ticket.objects.filter(pk=bajo.pk).update(fecha_creacion=timezone.now() - timedelta(hours=1))
+        self.assertEqual(list(Ticket.objects.cola_sin_asignar(self.soporte)), [critico, medio, otro_bajo, bajo])
+
+        bajo.nivel_critico = 'ALTO'
+        bajo.save()
+        critico.nivel_critico = 'BAJO'
+        critico.save(update_fields=['nivel_critico'])
+        self.assertEqual(list(Ticket.objects.cola_sin_asignar(self.soporte)), [bajo, medio, otro_bajo, critico])
+
+
+class ConteosTicketTests(TestCase):
+    """observaciones_count y derivaciones_count siguen a sus filas al crear y al borrar"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_tests', 'admin_tests@ejemplo.test', 'clave-tests')
+        cls.soporte, cls.redes = Area.objects.create(nombre='Soporte'), Area.objects.create(nombre='Redes')
+        cls.ticket = Ticket.objects.create(
+            titulo='Sin red', descripcion_problema='Detalle', nivel_critico='BAJO', tipo_problema='Red',
+            cliente_solicitante=Cliente.objects.create(nombre='Ana Rojas', correo_electronico='ana.rojas@ejemplo.test'),
+            area_asignada=cls.soporte, trabajador_creador=cls.admin,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def _conteos(self):
+        self.assertFalse(Ticket.objects.con_conteos_desincronizados().exists())
+        return tuple(Ticket.objects.values_list('observaciones_count', 'derivaciones_count').get(pk=self.ticket.pk))
+
+    def test_vistas(self):
+        for numero in range(2):
+            self.client.post(reverse('agregar_observacion', args=[self.ticket.id]), {'observacion_texto': f'Revisión {numero}'})
+        self.assertEqual(self._conteos(), (2, 0))
+
+        respuesta = self.client.post(
+            reverse('derivar_ticket', args=[self.ticket.id]), {'area_destino': self.redes.id, 'motivo_derivacion': 'Es de redes'}
+        )
+        self.assertEqual(respuesta.status_code, 302)
+        # El ticket.save() de la vista no pisa el conteo incrementado por la derivación
+        self.assertEqual(self._conteos(), (2, 1))
+        self.assertEqual(self.client.get(reverse('ver_ticket', args=[self.ticket.id])).status_code, 200)
+
+    def test_borrado(self):
+        observaciones = [
+            Observacion.objects.create(ticket_asociado=self.ticket, observacion_texto=f'Revisión {numero}', autor_trabajador=self.admin)
+            for numero in range(3)
+        ]
+        derivaciones = [
+            Derivacion.objects.create(
+                ticket=self.ticket, area_origen=self.soporte, area_destino=self.redes, trabajador_origen=self.admin,
+                motivo_derivacion='Es de redes',
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual(self._conteos(), (3, 2))
+
+        observaciones[0].delete()
+        derivaciones[0].delete()
+        self.assertEqual(self._conteos(), (2, 1))
+
+        # Borrado masivo desde el admin (QuerySet.delete, sin pasar por delete() del modelo)
+        for modelo, filas in (('observacion', observaciones[1:]), ('derivacion', derivaciones[1:])):
+            respuesta = self.client.post(reverse(f'admin:core_{modelo}_changelist'), {
+                'action': 'delete_selected', 'post': 'yes', '_selected_action': [fila.pk for fila in filas],
+            })
+            self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self._conteos(), (0, 0))
@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Observacion, Derivacion
+from .paginacion import codificar_cursor, decodificar_cursor
+
+# ===================================================================
+# TIMELINE DE UN TICKET
+# Observaciones y derivaciones intercaladas, de la más reciente a la más
+# antigua, paginadas por cursor sobre (fecha, tipo, id)
+# ===================================================================
+
+TIPO_OBSERVACION = 'observacion'
+TIPO_DERIVACION = 'derivacion'
+
+# Desempate entre tipos con la misma fecha (mayor = aparece primero)
+RANGO_TIPO = {TIPO_OBSERVACION: 1, TIPO_DERIVACION: 0}
+
+@dataclass(frozen=True)
+class EventoTimeline:
+    """Observación o derivación del ticket, con los datos que muestra la página"""
+    tipo: str
+    id: int
+    fecha: datetime
+    autor: str
+    texto: str
+    area_origen: str = ''
+    area_destino: str = ''
+
+    @property
+    def es_observacion(self):
+        return self.tipo == TIPO_OBSERVACION
+
+    @property
+    def clave(self):
+        return (self.fecha, RANGO_TIPO[self.tipo], self.id)
+
+    def como_dict(self):
+        return {
+            'tipo': self.tipo,
+            'id': self.id,
+            'fecha': self.fecha.isoformat(),
+            'autor': self.autor,
+            'texto': self.texto,
+            'area_origen': self.area_origen,
+            'area_destino': self.area_destino,
+        }
+
+def _nombre(usuario):
+    return usuario.get_full_name() or usuario.username
+
+def evento_observacion(observacion):
+    return EventoTimeline(
+        tipo=TIPO_OBSERVACION,
+        id=observacion.id,
+        fecha=observacion.fecha_hora_observacion,
+        autor=_nombre(observacion.autor_trabajador),
+        texto=observacion.observacion_texto,
+    )
+
+def evento_derivacion(derivacion):
+    return EventoTimeline(
+        tipo=TIPO_DERIVACION,
+        id=derivacion.id,
+        fecha=derivacion.fecha_derivacion,
+        autor=_nombre(derivacion.trabajador_origen),
+        texto=derivacion.motivo_derivacion,
+        area_origen=derivacion.area_origen.nombre,
+        area_destino=derivacion.area_destino.nombre,
+    )
+
+def _posteriores(campo_fecha, tipo, cursor):
+    """Filas de un tipo que van después del cursor en orden descendente"""
+    fecha, rango, ultimo_id = cursor
+    rango_tipo = RANGO_TIPO[tipo]
+    if rango_tipo < rango:
+        return Q(**{f'{campo_fecha}__lte': fecha})
+    if rango_tipo > rango:
+        return Q(**{f'{campo_fecha}__lt': fecha})
+    return Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, 'id__lt': ultimo_id})
+
+def _observaciones(ticket, cursor, limite):
+    observaciones = Observacion.objects.filter(ticket_asociado=ticket).select_related('autor_trabajador')
+    if cursor:
+        observaciones = observaciones.filter(_posteriores('fecha_hora_observacion', TIPO_OBSERVACION, cursor))
+    return [
+        evento_observacion(observacion)
+        for observacion in observaciones.order_by('-fecha_hora_observacion', '-id')[:limite]
+    ]
+
+def _derivaciones(ticket, cursor, limite):
+    derivaciones = Derivacion.objects.filter(ticket=ticket).select_related(
+        'trabajador_origen', 'area_origen', 'area_destino'
+    )
+    if cursor:
+        derivaciones = derivaciones.filter(_posteriores('fecha_derivacion', TIPO_DERIVACION, cursor))
+    return [
+        evento_derivacion(derivacion)
+        for derivacion in derivaciones.order_by('-fecha_derivacion', '-id')[:limite]
+    ]
+
+def _decodificar(cursor):
+    """(fecha, rango del tipo, id) del cursor, o None si no es válido (se muestra la primera página)"""
+    valores = decodificar_cursor(cursor, 3)
+    if valores is None:
+        return None
+    fecha, rango, ultimo_id = valores
+    try:
+        fecha = parse_datetime(fecha)
+    except (TypeError, ValueError):
+        return None
+    enteros = all(isinstance(valor, int) and not isinstance(valor, bool) for valor in (rango, ultimo_id))
+    if fecha is None or not enteros or rango not in RANGO_TIPO.values():
+        return None
+    return fecha, rango, ultimo_id
+
+def pagina_timeline(ticket, cursor: str = '', por_pagina: int = 20) -> Tuple[List[EventoTimeline], Optional[str]]:
+    """Eventos de una página y el cursor de la siguiente (None si no hay más).
+    Cada tipo aporta como máximo por_pagina + 1 filas: dos consultas por página."""
+    valores = _decodificar(cursor) if cursor else None
+
+    eventos = _observaciones(ticket, valores, por_pagina + 1) + _derivaciones(ticket, valores, por_pagina + 1)
+    eventos.sort(key=lambda evento: evento.clave, reverse=True)
+
+    pagina = eventos[:por_pagina]
+    if len(eventos) <= por_pagina:
+        return pagina, None
+    ultimo = pagina[-1]
+    return pagina, codificar_cursor([ultimo.fecha, RANGO_TIPO[ultimo.tipo], ultimo.id])
@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Con VISTAS_ASYNC los dashboards ejecutan sus consultas en paralelo (solo bajo un servidor ASGI)
+if settings.VISTAS_ASYNC:
+    dashboard, dashboard_jefatura = views.dashboard_async_view, views.dashboard_jefatura_async_view
+else:
+    dashboard, dashboard_jefatura = views.dashboard_view, views.dashboard_jefatura_view
+
 urlpatterns = [
     # Página principal
     path('', views.home_view, name='home'),
@@ -11,13 +18,18 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     
     # Dashboards
-    path('dashboard/', views.dashboard_view, name='dashboard'),
-    path('dashboard/jefatura/', views.dashboard_jefatura_view, name='dashboard_jefatura'),
+    path('dashboard/', dashboard, name='dashboard'),
+    path('dashboard/jefatura/', dashboard_jefatura, name='dashboard_jefatura'),
     
     # Tickets
     path('tickets/', views.lista_tickets_view, name='lista_tickets'),
     path('tickets/crear/', views.crear_ticket_view, name='crear_ticket'),
+    path('clientes/buscar/', views.buscar_clientes_view, name='buscar_clientes'),
+    path('tickets/acciones-masivas/', views.acciones_masivas_view, name='acciones_masivas_tickets'),
+    path('tickets/importar/', views.importar_tickets_view, name='importar_tickets'),
+    path('tickets/exportar/', views.exportar_tickets_view, name='exportar_tickets'),
     path('tickets/<int:pk>/', views.ver_ticket_view, name='ver_ticket'),
+    path('tickets/<int:pk>/timeline/', views.ticket_timeline_view, name='ticket_timeline'),
 
     # SPRINT 2 - Nuevas funcionalidades
     # HU02 - Derivación de tickets
@@ -49,5 +61,10 @@ urlpatterns = [
     path('tickets/<int:pk>/asignar/', views.asignar_ticket_view, name='asignar_ticket'),
     path('tickets/<int:pk>/tomar/', views.tomar_ticket_view, name='tomar_ticket'),
     path('tickets/sin-asignar/', views.tickets_sin_asignar_view, name='tickets_sin_asignar'),
+    path('tickets/sin-asignar/eventos/', views.eventos_cola_view, name='eventos_cola'),
+
+    # Observabilidad
+    path('metrics', views.metricas_view, name='metricas'),
+    path('health/', views.salud_view, name='salud'),
 
 ]
\ No newline at end of file
@@ -1,20 +1,42 @@
-from django import forms
+import time
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.db import connections, transaction, DatabaseError
+from django.db.models import Count, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.urls import reverse
 from .forms import (
     CustomLoginForm, TicketForm, ClienteForm, DerivacionForm, 
     ObservacionForm, CambioEstadoForm, FiltroTicketsForm,
-    UsuarioCreacionForm, UsuarioEdicionForm, GrupoForm, DesactivacionUsuarioForm
+    UsuarioCreacionForm, UsuarioEdicionForm, GrupoForm, DesactivacionUsuarioForm,
+    AccionMasivaForm, ImportacionTicketsForm
+)
+from .models import Ticket, ContadorTickets, Cliente, ClienteQuerySet, Area, Perfil, Jefatura, Derivacion, Observacion, Grupo, HistorialUsuario
+from .estadisticas import resumen_tickets, resumen_contadores, estadisticas_area
+from .paginacion import PaginadorCursor
+from .timeline import pagina_timeline, evento_observacion
+from .acceso import contexto_acceso, invalidar_contexto
+from .routers import lectura_replica
+from .asincronas import en_paralelo, login_requerido
+from .acciones_masivas import asignar_tickets, derivar_tickets, cambiar_estado_tickets
+from . import catalogos, eventos, exportacion, outbox
+from .metricas import REGISTRO
+from .backends.mysql_pool.pool import estado_pools
+from .importacion import (
+    abrir_texto, leer_filas, importar_tickets, COLUMNAS_OBLIGATORIAS, COLUMNAS_OPCIONALES
 )
-from .models import Ticket, Cliente, Area, Perfil, Jefatura, Derivacion, Observacion, Grupo, HistorialUsuario
 
 def home_view(request):
     """Vista principal - redirige al login o dashboard según autenticación"""
@@ -35,9 +57,10 @@ def login_view(request):
             messages.success(request, f'Bienvenido {user.get_full_name() or user.username}')
             
             # Redirección basada en rol
-            if hasattr(user, 'perfil'):
+            acceso = contexto_acceso(user)
+            if acceso.tiene_perfil:
                 # Si es jefe de área, redirigir a dashboard de jefatura
-                if user.roles_jefatura.filter(fecha_fin_jefatura__isnull=True).exists():
+                if acceso.es_jefe:
                     return redirect('dashboard_jefatura')
             
             return redirect('dashboard')
@@ -54,139 +77,140 @@ def logout_view(request):
     messages.info(request, 'Has cerrado sesión exitosamente')
     return redirect('login')
 
-@login_required
-def dashboard_view(request):
-    """Dashboard principal - muestra resumen de tickets"""
-    # Obtener estadísticas básicas
-    total_tickets = Ticket.objects.count()
-    tickets_abiertos = Ticket.objects.filter(estado=Ticket.Estado.ABIERTO).count()
-    tickets_en_proceso = Ticket.objects.filter(estado=Ticket.Estado.EN_PROCESO).count()
-    tickets_resueltos = Ticket.objects.filter(estado=Ticket.Estado.RESUELTO).count()
-    
-    # Tickets asignados al usuario actual
-    mis_tickets = Ticket.objects.filter(trabajador_asignado=request.user).order_by('-fecha_creacion')[:5]
-    
-    # Tickets recientes del área del usuario (si tiene perfil con área)
-    tickets_area = []
-    tickets_sin_asignar = []
-    tickets_sin_asignar_total = 0
-    stats_asignacion = {}
-    carga_trabajo = []
+# Los dashboards se arman con consultas independientes ({clave: función}): la vista sync las
+# ejecuta una tras otra y la async (ASGI) a la vez, con core.asincronas.en_paralelo
+
+def _consultas_dashboard(user, acceso):
+    """Consultas del dashboard principal según el área y el rol del usuario"""
+    consultas = {
+        # Estadísticas básicas (desde los contadores por área)
+        'resumen': resumen_contadores,
+        # Tickets asignados al usuario actual
+        'mis_tickets': lambda: list(
+            Ticket.objects.filter(trabajador_asignado=user).order_by('-fecha_creacion')[:5]
+        ),
+    }
     
-    if hasattr(request.user, 'perfil') and request.user.perfil.area:
-        area = request.user.perfil.area
-        
-        # Tickets del área
-        tickets_area = Ticket.objects.filter(
-            area_asignada=area
-        ).order_by('-fecha_creacion')[:5]
-        
-        # Tickets sin asignar del área
-        tickets_sin_asignar = Ticket.objects.filter(
-            area_asignada=area,
-            trabajador_asignado__isnull=True,
-            estado__in=[Ticket.Estado.ABIERTO, Ticket.Estado.EN_PROCESO]
-        ).order_by('-nivel_critico', '-fecha_creacion')[:5]
-        
-        tickets_sin_asignar_total = Ticket.objects.filter(
-            area_asignada=area,
-            trabajador_asignado__isnull=True,
-            estado__in=[Ticket.Estado.ABIERTO, Ticket.Estado.EN_PROCESO]
-        ).count()
+    # Tickets recientes y sin asignar del área del usuario (si tiene perfil con área)
+    area = acceso.area
+    if area:
+        consultas['tickets_area'] = lambda: list(
+            Ticket.objects.del_area(area).select_related('trabajador_asignado').recientes()[:5]
+        )
+        consultas['tickets_sin_asignar'] = lambda: list(
+            Ticket.objects.cola_sin_asignar(area).select_related('cliente_solicitante')[:5]
+        )
+        consultas['tickets_sin_asignar_total'] = lambda: ContadorTickets.sin_asignar(area.id)
         
         # Estadísticas de asignación (solo para jefes)
-        if request.user.roles_jefatura.filter(fecha_fin_jefatura__isnull=True).exists():
-            tickets_area_total = Ticket.objects.filter(area_asignada=area)
-            sin_asignar = tickets_area_total.filter(trabajador_asignado__isnull=True).count()
-            asignados = tickets_area_total.filter(trabajador_asignado__isnull=False).count()
-            trabajadores_activos = User.objects.filter(
-                perfil__area=area, 
-                is_active=True
-            ).exclude(roles_jefatura__isnull=False).count()
-            
-            stats_asignacion = {
-                'sin_asignar': sin_asignar,
-                'asignados': asignados,
-                'trabajadores_activos': trabajadores_activos
-            }
-            
-            # Carga de trabajo por trabajador
-            trabajadores = User.objects.filter(perfil__area=area, is_active=True)
-            for trabajador in trabajadores:
-                tickets_asignados = trabajador.tickets_asignados.filter(
-                    estado__in=[Ticket.Estado.ABIERTO, Ticket.Estado.EN_PROCESO]
-                ).count()
-                carga_trabajo.append({
-                    'nombre': trabajador.get_full_name() or trabajador.username,
-                    'tickets_asignados': tickets_asignados
-                })
-            
-            # Ordenar por carga de trabajo
-            carga_trabajo.sort(key=lambda x: x['tickets_asignados'], reverse=True)
+        if acceso.es_jefe:
+            consultas['estadisticas'] = lambda: estadisticas_area(area)
     
-    context = {
-        'total_tickets': total_tickets,
-        'tickets_abiertos': tickets_abiertos,
-        'tickets_en_proceso': tickets_en_proceso,
-        'tickets_resueltos': tickets_resueltos,
-        'mis_tickets': mis_tickets,
-        'tickets_area': tickets_area,
-        'tickets_sin_asignar': tickets_sin_asignar,
-        'tickets_sin_asignar_total': tickets_sin_asignar_total,
+    return consultas
+
+def _contexto_dashboard(resultados):
+    resumen = resultados['resumen']
+    stats_asignacion = {}
+    carga = []
+    
+    estadisticas = resultados.get('estadisticas')
+    if estadisticas:
+        stats_asignacion = {
+            'sin_asignar': estadisticas.resumen.sin_asignar,
+            'asignados': estadisticas.resumen.asignados,
+            'trabajadores_activos': estadisticas.trabajadores_activos
+        }
+        
+        # Carga de trabajo por trabajador (ya ordenada de mayor a menor)
+        carga = estadisticas.carga_trabajo
+    
+    return {
+        'total_tickets': resumen.total,
+        'tickets_abiertos': resumen.abiertos,
+        'tickets_en_proceso': resumen.en_proceso,
+        'tickets_resueltos': resumen.resueltos,
+        'mis_tickets': resultados['mis_tickets'],
+        'tickets_area': resultados.get('tickets_area', []),
+        'tickets_sin_asignar': resultados.get('tickets_sin_asignar', []),
+        'tickets_sin_asignar_total': resultados.get('tickets_sin_asignar_total', 0),
         'stats_asignacion': stats_asignacion,
-        'carga_trabajo': carga_trabajo[:5],  # Solo mostrar top 5
+        'carga_trabajo': carga[:5],  # Solo mostrar top 5
     }
+
+def _consultas_dashboard_jefatura(area_jefatura):
+    return {
+        # Estadísticas del área y carga de sus trabajadores
+        'estadisticas': lambda: estadisticas_area(area_jefatura, solo_activos=False),
+        'tickets_recientes': lambda: list(
+            Ticket.objects.del_area(area_jefatura).select_related('trabajador_asignado').recientes()[:10]
+        ),
+        'tickets_sin_asignar_jefe': lambda: list(Ticket.objects.cola_sin_asignar(area_jefatura)[:5]),
+    }
+
+def _contexto_dashboard_jefatura(area_jefatura, resultados):
+    estadisticas = resultados['estadisticas']
+    resumen = estadisticas.resumen
     
-    return render(request, 'core/dashboard.html', context)
+    return {
+        'area_jefatura': area_jefatura,
+        'total_area': resumen.total,
+        'abiertos_area': resumen.abiertos,
+        'en_proceso_area': resumen.en_proceso,
+        'resueltos_area': resumen.resueltos,
+        'criticos': resumen.criticos,
+        'altos': resumen.altos,
+        'trabajadores_area': estadisticas.carga_trabajo,
+        'tickets_recientes': resultados['tickets_recientes'],
+        'tickets_sin_asignar_jefe': resultados['tickets_sin_asignar_jefe'],
+        'tickets_sin_asignar_total': resumen.sin_asignar_activos,
+    }
+
+def _ejecutar_consultas(consultas):
+    return {clave: consulta() for clave, consulta in consultas.items()}
 
 @login_required
+@lectura_replica
+def dashboard_view(request):
+    """Dashboard principal - muestra resumen de tickets"""
+    resultados = _ejecutar_consultas(_consultas_dashboard(request.user, request.acceso))
+    return render(request, 'core/dashboard.html', _contexto_dashboard(resultados))
+
+@login_requerido
+@lectura_replica
+async def dashboard_async_view(request):
+    """Dashboard principal con sus consultas en paralelo (servidor ASGI)"""
+    acceso = await sync_to_async(contexto_acceso)(request.user)
+    resultados = await en_paralelo(_consultas_dashboard(request.user, acceso))
+    return await sync_to_async(render)(request, 'core/dashboard.html', _contexto_dashboard(resultados))
+
+@login_required
+@lectura_replica
 def dashboard_jefatura_view(request):
     """Dashboard especial para jefes de área"""
-    # Verificar que el usuario sea jefe
-    jefaturas_activas = request.user.roles_jefatura.filter(fecha_fin_jefatura__isnull=True)
-    if not jefaturas_activas.exists():
+    # Verificar que el usuario sea jefe y obtener el área de jefatura
+    area_jefatura = request.acceso.area_jefatura
+    if not area_jefatura:
         return redirect('dashboard')
     
-    # Obtener el área de jefatura
-    area_jefatura = jefaturas_activas.first().area_jefatura
-    
-    # Estadísticas del área
-    tickets_area = Ticket.objects.filter(area_asignada=area_jefatura)
-    total_area = tickets_area.count()
-    abiertos_area = tickets_area.filter(estado=Ticket.Estado.ABIERTO).count()
-    en_proceso_area = tickets_area.filter(estado=Ticket.Estado.EN_PROCESO).count()
-    resueltos_area = tickets_area.filter(estado=Ticket.Estado.RESUELTO).count()
-    
-    # Tickets por nivel crítico
-    criticos = tickets_area.filter(nivel_critico=Ticket.NivelCritico.CRITICO).count()
-    altos = tickets_area.filter(nivel_critico=Ticket.NivelCritico.ALTO).count()
-    
-    # Trabajadores del área
-    trabajadores_area = area_jefatura.miembros.all()
-    
-    # Tickets sin asignar para gestión
-    tickets_sin_asignar_jefe = Ticket.objects.filter(
-        area_asignada=area_jefatura,
-        trabajador_asignado__isnull=True,
-        estado__in=[Ticket.Estado.ABIERTO, Ticket.Estado.EN_PROCESO]
-    ).order_by('-nivel_critico', '-fecha_creacion')
-    
-    context = {
-        'area_jefatura': area_jefatura,
-        'total_area': total_area,
-        'abiertos_area': abiertos_area,
-        'en_proceso_area': en_proceso_area,
-        'resueltos_area': resueltos_area,
-        'criticos': criticos,
-        'altos': altos,
-        'trabajadores_area': trabajadores_area,
-        'tickets_recientes': tickets_area.order_by('-fecha_creacion')[:10],
-        'tickets_sin_asignar_jefe': tickets_sin_asignar_jefe,
-    }
+    resultados = _ejecutar_consultas(_consultas_dashboard_jefatura(area_jefatura))
+    return render(request, 'core/dashboard_jefatura.html', _contexto_dashboard_jefatura(area_jefatura, resultados))
+
+@login_requerido
+@lectura_replica
+async def dashboard_jefatura_async_view(request):
+    """Dashboard de jefatura con sus consultas en paralelo (servidor ASGI)"""
+    acceso = await sync_to_async(contexto_acceso)(request.user)
+    area_jefatura = acceso.area_jefatura
+    if not area_jefatura:
+        return redirect('dashboard')
     
-    return render(request, 'core/dashboard_jefatura.html', context)
+    resultados = await en_paralelo(_consultas_dashboard_jefatura(area_jefatura))
+    return await sync_to_async(render)(
+        request, 'core/dashboard_jefatura.html', _contexto_dashboard_jefatura(area_jefatura, resultados)
+    )
 
 @login_required
+@transaction.atomic
 def crear_ticket_view(request):
     """Vista para crear un nuevo ticket"""
     if request.method == 'POST':
@@ -216,32 +240,34 @@ def crear_ticket_view(request):
     return render(request, 'core/crear_ticket.html', {'form': form})
 
 @login_required
-def lista_tickets_view(request):
-    """Vista de lista de tickets con filtros avanzados y paginación (HU05 mejorada)"""
-    # Inicializar formulario de filtros
-    form = FiltroTicketsForm(request.GET or None)
+@require_GET
+@lectura_replica
+def buscar_clientes_view(request):
+    """Autocompletado de clientes para el formulario de tickets (JSON).
+    Devuelve el texto buscado para que el navegador descarte respuestas de búsquedas anteriores."""
+    texto = request.GET.get('q', '')
+    clientes = Cliente.objects.autocompletar(texto)
     
-    # Query base con optimizaciones
-    tickets = Ticket.objects.select_related(
-        'cliente_solicitante', 
-        'area_asignada', 
-        'trabajador_creador', 
-        'trabajador_asignado'
-    ).prefetch_related(
-        'observaciones',
-        'derivaciones'
-    )
+    return JsonResponse({
+        'q': texto,
+        'resultados': [
+            {'id': cliente['id'], 'nombre': cliente['nombre'], 'correo': cliente['correo_electronico']}
+            for cliente in clientes
+        ],
+        'limite': ClienteQuerySet.LIMITE_AUTOCOMPLETAR,
+    })
+
+def _filtrar_tickets(tickets, form):
+    """Aplica los filtros de FiltroTicketsForm (lista y exportación).
+    Devuelve los tickets filtrados, el orden elegido y si hay filtros activos."""
+    orden = '-fecha_creacion'
     
     # Aplicar filtros si el formulario es válido
     if form.is_valid():
-        # Búsqueda general
+        # Búsqueda de texto completo (número, título, descripción y observaciones), por relevancia
         busqueda = form.cleaned_data.get('busqueda')
         if busqueda:
-            tickets = tickets.filter(
-                Q(id__icontains=busqueda) |
-                Q(titulo__icontains=busqueda) |
-                Q(descripcion_problema__icontains=busqueda)
-            )
+            tickets = tickets.buscar(busqueda)
         
         # Filtro de fechas
         fecha_desde = form.cleaned_data.get('fecha_desde')
@@ -285,35 +311,8 @@ def lista_tickets_view(request):
                 Q(cliente_solicitante__correo_electronico__icontains=cliente)
             )
         
-        # Ordenamiento
-    orden = forms.ChoiceField(
-        required=False,
-        choices=[
-            ('-fecha_creacion', 'Más recientes primero'),
-            ('fecha_creacion', 'Más antiguos primero'),
-            ('-nivel_critico', 'Mayor criticidad primero'),
-            ('nivel_critico', 'Menor criticidad primero'),
-            ('titulo', 'Título (A-Z)'),
-            ('-titulo', 'Título (Z-A)'),
-            ('-fecha_actualizacion', 'Última actualización'),
-        ],
-        initial='-fecha_creacion',
-        widget=forms.Select(attrs={'class': 'form-control'}),
-        label='Ordenar por'
-    )
-    
-    # Estadísticas de los tickets filtrados
-    stats = tickets.aggregate(
-        total=Count('id'),
-        criticos=Count('id', filter=Q(nivel_critico=Ticket.NivelCritico.CRITICO)),
-        en_proceso=Count('id', filter=Q(estado=Ticket.Estado.EN_PROCESO)),
-        resueltos=Count('id', filter=Q(estado=Ticket.Estado.RESUELTO))
-    )
-    
-    # Paginación
-    paginator = Paginator(tickets, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        # Ordenamiento (al buscar, por relevancia salvo que se elija otro)
+        orden = form.cleaned_data.get('orden') or ('-relevancia' if busqueda else orden)
     
     # Verificar si hay filtros activos
     filtros_activos = any([
@@ -321,38 +320,90 @@ def lista_tickets_view(request):
         if field != 'orden' and form.cleaned_data.get(field)
     ]) if form.is_valid() else False
     
+    return tickets, orden, filtros_activos
+
+@login_required
+@lectura_replica
+def lista_tickets_view(request):
+    """Vista de lista de tickets con filtros avanzados y paginación (HU05 mejorada)"""
+    # Inicializar formulario de filtros
+    form = FiltroTicketsForm(request.GET or None)
+    
+    # Query base con optimizaciones (las observaciones y derivaciones se muestran con sus conteos),
+    # limitada a los tickets que el usuario puede ver
+    tickets = Ticket.objects.visibles_para(request.user).select_related(
+        'cliente_solicitante', 
+        'area_asignada', 
+        'trabajador_creador', 
+        'trabajador_asignado'
+    )
+    tickets, orden, filtros_activos = _filtrar_tickets(tickets, form)
+    
+    # Estadísticas de los tickets filtrados. Los contadores son globales: solo sirven
+    # sin filtros y para quien ve todos los tickets
+    if filtros_activos or not request.user.is_superuser:
+        stats = resumen_tickets(tickets)
+    else:
+        stats = resumen_contadores()
+    
+    # Paginación por cursor; el total ya viene en las estadísticas
+    page_obj = PaginadorCursor(tickets, [orden], total=stats.total).obtener_pagina(request.GET)
+    
     context = {
         'form': form,
         'page_obj': page_obj,
         'stats': stats,
         'filtros_activos': filtros_activos,
+        'form_masivo': AccionMasivaForm(),
     }
     
     return render(request, 'core/lista_tickets.html', context)
 
+@login_required
+@lectura_replica
+def exportar_tickets_view(request):
+    """Exporta a CSV o XLSX los tickets de la lista con los mismos filtros y orden.
+    El archivo se genera mientras se envía, sin cargar todas las filas en memoria."""
+    form = FiltroTicketsForm(request.GET or None)
+    tickets, orden, _ = _filtrar_tickets(Ticket.objects.visibles_para(request.user), form)
+    
+    formato = request.GET.get('formato')
+    if formato not in exportacion.TIPOS_CONTENIDO:
+        formato = exportacion.FORMATO_CSV
+    
+    response = StreamingHttpResponse(
+        exportacion.contenido_streaming(formato, exportacion.filas_tickets(tickets, [orden])),
+        content_type=exportacion.TIPOS_CONTENIDO[formato]
+    )
+    nombre = f'tickets_{timezone.localtime():%Y%m%d_%H%M}.{formato}'
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
 @login_required
 def ver_ticket_view(request, pk):
     """Vista detallada de un ticket con funcionalidad de observaciones"""
-    ticket = get_object_or_404(Ticket, pk=pk)
+    ticket = get_object_or_404(
+        Ticket.objects.select_related(
+            'cliente_solicitante', 'area_asignada', 'trabajador_creador', 'trabajador_asignado'
+        ),
+        pk=pk
+    )
     
     # Verificar permisos básicos
-    puede_editar = (
-        request.user == ticket.trabajador_creador or
-        request.user == ticket.trabajador_asignado or
-        request.user.is_superuser or
-        (hasattr(request.user, 'perfil') and request.user.perfil.area == ticket.area_asignada)
-    )
+    puede_editar = _puede_editar_ticket(request.user, ticket)
     
-    # Obtener todas las áreas para los modales
-    areas = Area.objects.all()
+    # Áreas de destino para el modal de derivación (solo si se puede derivar)
+    areas = []
+    if puede_editar and ticket.estado == Ticket.Estado.ABIERTO:
+        areas = catalogos.areas(excluir=ticket.area_asignada_id)
     
     # Obtener trabajadores del área para asignación (solo para jefes)
     trabajadores_area = []
-    if request.user.roles_jefatura.filter(
-        area_jefatura=ticket.area_asignada,
-        fecha_fin_jefatura__isnull=True
-    ).exists():
-        trabajadores_area = ticket.area_asignada.miembros.filter(usuario__is_active=True)
+    if request.acceso.es_jefe_de(ticket.area_asignada_id):
+        trabajadores_area = catalogos.trabajadores(area_id=ticket.area_asignada_id)
+    
+    # Primera página del timeline; el resto se carga al hacer scroll
+    eventos, cursor_siguiente = pagina_timeline(ticket)
     
     context = {
         'ticket': ticket,
@@ -360,17 +411,40 @@ def ver_ticket_view(request, pk):
         'observacion_form': ObservacionForm(),
         'areas': areas,
         'trabajadores_area': trabajadores_area,
+        'eventos': eventos,
+        'cursor_siguiente': cursor_siguiente,
     }
     
     return render(request, 'core/ver_ticket.html', context)
 
+@login_required
+def ticket_timeline_view(request, pk):
+    """Página del timeline (observaciones y derivaciones) en JSON, para el scroll de ver_ticket"""
+    ticket = get_object_or_404(Ticket.objects.visibles_para(request.user).only('id'), pk=pk)
+    eventos, cursor_siguiente = pagina_timeline(ticket, request.GET.get('cursor', ''))
+    
+    return JsonResponse({
+        'eventos': [evento.como_dict() for evento in eventos],
+        'html': ''.join(
+            render_to_string('core/includes/evento_timeline.html', {'evento': evento})
+            for evento in eventos
+        ),
+        'siguiente': cursor_siguiente,
+    })
+
 # SPRINT 2 - NUEVAS FUNCIONALIDADES
 
+def _ticket_bloqueado(pk):
+    """Ticket bloqueado hasta el fin de la transacción: dos cambios simultáneos no pueden mover
+    ContadorTickets desde la misma clave anterior"""
+    return get_object_or_404(Ticket.objects.select_for_update(), pk=pk)
+
 @login_required
 @require_POST
+@transaction.atomic
 def derivar_ticket_view(request, pk):
     """Vista para derivar un ticket a otra área (HU02)"""
-    ticket = get_object_or_404(Ticket, pk=pk)
+    ticket = _ticket_bloqueado(pk)
     
     # Verificar permisos
     if not _puede_derivar_ticket(request.user, ticket):
@@ -392,7 +466,12 @@ def derivar_ticket_view(request, pk):
             ticket.trabajador_asignado = None  # Desasignar al cambiar de área
             ticket.save()
             
-            # Notificación (básica por ahora)
+            # Aviso por correo a los jefes del área de destino
+            outbox.registrar(
+                outbox.TICKET_DERIVADO, ticket_id=ticket.id,
+                area_destino_id=derivacion.area_destino_id, motivo=derivacion.motivo_derivacion
+            )
+            
             messages.success(
                 request, 
                 f'Ticket derivado exitosamente a {derivacion.area_destino.nombre}'
@@ -418,9 +497,10 @@ def derivar_ticket_view(request, pk):
 
 @login_required
 @require_POST
+@transaction.atomic
 def cambiar_estado_ticket_view(request, pk):
     """Vista para cambiar el estado de un ticket (HU03)"""
-    ticket = get_object_or_404(Ticket, pk=pk)
+    ticket = _ticket_bloqueado(pk)
     
     # Verificar permisos
     if not _puede_cambiar_estado(request.user, ticket):
@@ -445,6 +525,11 @@ def cambiar_estado_ticket_view(request, pk):
             
             ticket.save()
             
+            # Aviso por correo al cliente
+            outbox.registrar(
+                outbox.TICKET_ESTADO, ticket_id=ticket.id, estado_anterior=estado_anterior, estado_nuevo=nuevo_estado
+            )
+            
             # Crear observación obligatoria para estados finales
             if observacion_texto:
                 Observacion.objects.create(
@@ -481,14 +566,7 @@ def agregar_observacion_view(request, pk):
     ticket = get_object_or_404(Ticket, pk=pk)
     
     # Verificar permisos
-    puede_editar = (
-        request.user == ticket.trabajador_creador or
-        request.user == ticket.trabajador_asignado or
-        request.user.is_superuser or
-        (hasattr(request.user, 'perfil') and request.user.perfil.area == ticket.area_asignada)
-    )
-    
-    if not puede_editar:
+    if not _puede_editar_ticket(request.user, ticket):
         messages.error(request, 'No tienes permisos para agregar observaciones')
         return redirect('ver_ticket', pk=ticket.id)
     
@@ -509,7 +587,10 @@ def agregar_observacion_view(request, pk):
                     'autor': observacion.autor_trabajador.get_full_name() or observacion.autor_trabajador.username,
                     'fecha': observacion.fecha_hora_observacion.strftime('%d/%m/%Y %H:%M'),
                     'texto': observacion.observacion_texto
-                }
+                },
+                'html': render_to_string('core/includes/evento_timeline.html', {
+                    'evento': evento_observacion(observacion)
+                }),
             })
     else:
         # Si es AJAX y hay error
@@ -539,11 +620,9 @@ def lista_usuarios_view(request):
     
     # Filtrar por área si el usuario es jefe (solo ve usuarios de su área)
     if not request.user.is_superuser:
-        jefatura = request.user.roles_jefatura.filter(
-            fecha_fin_jefatura__isnull=True
-        ).first()
-        if jefatura:
-            usuarios = usuarios.filter(perfil__area=jefatura.area_jefatura)
+        area_jefatura = request.acceso.area_jefatura
+        if area_jefatura:
+            usuarios = usuarios.filter(perfil__area=area_jefatura)
     
     # Búsqueda
     busqueda = request.GET.get('busqueda')
@@ -563,9 +642,16 @@ def lista_usuarios_view(request):
         usuarios = usuarios.filter(is_active=False)
     
     # Paginación
-    paginator = Paginator(usuarios, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = PaginadorCursor(usuarios, total='estimado').obtener_pagina(request.GET)
+    
+    # Tickets asignados de los usuarios de la página en una sola consulta
+    totales = dict(
+        Ticket.objects.filter(trabajador_asignado__in=page_obj.object_list).order_by().values(
+            'trabajador_asignado'
+        ).annotate(total=Count('id')).values_list('trabajador_asignado', 'total')
+    )
+    for usuario in page_obj:
+        usuario.total_tickets_asignados = totales.get(usuario.id, 0)
     
     context = {
         'page_obj': page_obj,
@@ -584,30 +670,21 @@ def crear_usuario_view(request):
         return redirect('dashboard')
     
     if request.method == 'POST':
-        form = UsuarioCreacionForm(request.POST)
+        form = UsuarioCreacionForm(request.POST, areas_permitidas=_areas_permitidas_usuarios(request))
         if form.is_valid():
-            usuario = form.save()
+            with transaction.atomic():
+                usuario = form.save()
+                # Correo con los datos de acceso, enviado por procesar_outbox
+                outbox.registrar(outbox.USUARIO_CREADO, usuario_id=usuario.id)
             messages.success(
                 request, 
                 f'Usuario {usuario.username} creado exitosamente. '
-                f'Se han enviado las credenciales a {usuario.email}'
+                f'Se enviarán los datos de acceso a {usuario.email}'
             )
             
-            # TODO: Enviar email con credenciales (opcional para MVP)
-            
             return redirect('lista_usuarios')
     else:
-        form = UsuarioCreacionForm()
-        
-        # Si es jefe, limitar áreas disponibles a la suya
-        if not request.user.is_superuser:
-            jefatura = request.user.roles_jefatura.filter(
-                fecha_fin_jefatura__isnull=True
-            ).first()
-            if jefatura:
-                form.fields['area'].queryset = Area.objects.filter(
-                    id=jefatura.area_jefatura.id
-                )
+        form = UsuarioCreacionForm(areas_permitidas=_areas_permitidas_usuarios(request))
     
     return render(request, 'core/usuarios/crear_usuario.html', {'form': form})
 
@@ -622,23 +699,15 @@ def editar_usuario_view(request, pk):
         return redirect('lista_usuarios')
     
     if request.method == 'POST':
-        form = UsuarioEdicionForm(request.POST, instance=usuario)
+        form = UsuarioEdicionForm(
+            request.POST, instance=usuario, areas_permitidas=_areas_permitidas_usuarios(request)
+        )
         if form.is_valid():
             form.save()
             messages.success(request, f'Usuario {usuario.username} actualizado exitosamente')
             return redirect('lista_usuarios')
     else:
-        form = UsuarioEdicionForm(instance=usuario)
-        
-        # Si es jefe, limitar áreas disponibles
-        if not request.user.is_superuser:
-            jefatura = request.user.roles_jefatura.filter(
-                fecha_fin_jefatura__isnull=True
-            ).first()
-            if jefatura:
-                form.fields['area'].queryset = Area.objects.filter(
-                    id=jefatura.area_jefatura.id
-                )
+        form = UsuarioEdicionForm(instance=usuario, areas_permitidas=_areas_permitidas_usuarios(request))
     
     context = {
         'form': form,
@@ -689,15 +758,14 @@ def _puede_derivar_ticket(user, ticket):
     if user.is_superuser:
         return True
     
+    acceso = contexto_acceso(user)
+    
     # Usuario del área asignada
-    if hasattr(user, 'perfil') and user.perfil.area == ticket.area_asignada:
+    if acceso.es_del_area(ticket.area_asignada_id):
         return True
     
     # Jefe del área asignada
-    if user.roles_jefatura.filter(
-        area_jefatura=ticket.area_asignada,
-        fecha_fin_jefatura__isnull=True
-    ).exists():
+    if acceso.es_jefe_de(ticket.area_asignada_id):
         return True
     
     return False
@@ -709,30 +777,44 @@ def _puede_cambiar_estado(user, ticket):
         return True
     
     # Usuario asignado al ticket
-    if user == ticket.trabajador_asignado:
+    if user.id == ticket.trabajador_asignado_id:
         return True
     
+    acceso = contexto_acceso(user)
+    
     # Usuario del área asignada
-    if hasattr(user, 'perfil') and user.perfil.area == ticket.area_asignada:
+    if acceso.es_del_area(ticket.area_asignada_id):
         return True
     
     # Jefe del área asignada
-    if user.roles_jefatura.filter(
-        area_jefatura=ticket.area_asignada,
-        fecha_fin_jefatura__isnull=True
-    ).exists():
+    if acceso.es_jefe_de(ticket.area_asignada_id):
         return True
     
     return False
 
-def _es_jefe_o_admin(user):
-    """Verifica si el usuario es jefe de área o administrador"""
+def _puede_editar_ticket(user, ticket):
+    """Verifica si un usuario puede ver las acciones del ticket y agregar observaciones"""
     if user.is_superuser:
         return True
     
-    return user.roles_jefatura.filter(
-        fecha_fin_jefatura__isnull=True
-    ).exists()
+    # Creador o asignado al ticket
+    if user.id in (ticket.trabajador_creador_id, ticket.trabajador_asignado_id):
+        return True
+    
+    # Usuario del área asignada
+    return contexto_acceso(user).es_del_area(ticket.area_asignada_id)
+
+def _es_jefe_o_admin(user):
+    """Verifica si el usuario es jefe de área o administrador"""
+    return contexto_acceso(user).es_jefe_o_admin or user.is_superuser
+
+def _areas_permitidas_usuarios(request):
+    """Áreas que puede asignar quien crea o edita usuarios: todas (None) para superusuarios,
+    la de su jefatura para los jefes"""
+    if request.user.is_superuser:
+        return None
+    area_jefatura = request.acceso.area_jefatura
+    return [area_jefatura.id] if area_jefatura else []
 
 def _puede_editar_usuario(user, usuario_a_editar):
     """Verifica si un usuario puede editar a otro"""
@@ -745,12 +827,10 @@ def _puede_editar_usuario(user, usuario_a_editar):
         return False
     
     # Jefes pueden editar usuarios de su área
-    jefatura = user.roles_jefatura.filter(
-        fecha_fin_jefatura__isnull=True
-    ).first()
+    area_jefatura = contexto_acceso(user).area_jefatura
     
-    if jefatura and hasattr(usuario_a_editar, 'perfil'):
-        return usuario_a_editar.perfil.area == jefatura.area_jefatura
+    if area_jefatura and hasattr(usuario_a_editar, 'perfil'):
+        return usuario_a_editar.perfil.area_id == area_jefatura.id
     
     return False
 
@@ -977,6 +1057,9 @@ def desactivar_usuario_view(request, pk):
             usuario.roles_jefatura.filter(
                 fecha_fin_jefatura__isnull=True
             ).update(fecha_fin_jefatura=timezone.now().date())
+            # update() no envía post_save: invalidar a mano lo que invalidan las señales de Jefatura
+            invalidar_contexto([usuario.pk])
+            catalogos.invalidar()
             
             messages.success(
                 request, 
@@ -1032,9 +1115,10 @@ def get_usuarios_activos_choices():
 
 @login_required
 @require_POST
+@transaction.atomic
 def asignar_ticket_view(request, pk):
     """Vista para asignar un ticket a un trabajador"""
-    ticket = get_object_or_404(Ticket, pk=pk)
+    ticket = _ticket_bloqueado(pk)
     
     # Verificar permisos
     if not _puede_asignar_ticket(request.user, ticket):
@@ -1059,6 +1143,10 @@ def asignar_ticket_view(request, pk):
                     autor_trabajador=request.user
                 )
                 
+                # Aviso por correo al trabajador (no si se lo asignó a sí mismo)
+                if trabajador != request.user:
+                    outbox.registrar(outbox.TICKET_ASIGNADO, ticket_id=ticket.id, trabajador_id=trabajador.id)
+                
                 messages.success(request, f'Ticket asignado a {trabajador.get_full_name() or trabajador.username}')
             else:
                 messages.error(request, 'El trabajador debe pertenecer al área del ticket')
@@ -1093,9 +1181,10 @@ def asignar_ticket_view(request, pk):
 
 @login_required
 @require_POST
+@transaction.atomic
 def tomar_ticket_view(request, pk):
     """Vista para que un trabajador tome un ticket sin asignar de su área"""
-    ticket = get_object_or_404(Ticket, pk=pk)
+    ticket = _ticket_bloqueado(pk)
     
     # Verificar que el ticket no esté asignado
     if ticket.trabajador_asignado:
@@ -1103,7 +1192,7 @@ def tomar_ticket_view(request, pk):
         return redirect('ver_ticket', pk=ticket.id)
     
     # Verificar que el usuario pertenezca al área del ticket
-    if not (hasattr(request.user, 'perfil') and request.user.perfil.area == ticket.area_asignada):
+    if not request.acceso.es_del_area(ticket.area_asignada_id):
         messages.error(request, 'Solo puedes tomar tickets de tu área')
         return redirect('ver_ticket', pk=ticket.id)
     
@@ -1131,29 +1220,178 @@ def tomar_ticket_view(request, pk):
     return redirect('ver_ticket', pk=ticket.id)
 
 @login_required
+@lectura_replica
 def tickets_sin_asignar_view(request):
     """Vista para mostrar tickets sin asignar del área del usuario"""
-    if not hasattr(request.user, 'perfil') or not request.user.perfil.area:
+    area = request.acceso.area
+    if not area:
         messages.error(request, 'Debes estar asignado a un área para ver tickets sin asignar')
         return redirect('dashboard')
     
-    tickets = Ticket.objects.filter(
-        area_asignada=request.user.perfil.area,
-        trabajador_asignado__isnull=True,
-        estado__in=[Ticket.Estado.ABIERTO, Ticket.Estado.EN_PROCESO]
-    ).order_by('-nivel_critico', '-fecha_creacion')
+    tickets = Ticket.objects.cola_sin_asignar(area).select_related('cliente_solicitante')
     
     # Paginación
-    paginator = Paginator(tickets, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = PaginadorCursor(
+        tickets, total=ContadorTickets.sin_asignar(area.id)
+    ).obtener_pagina(request.GET)
     
     context = {
         'page_obj': page_obj,
-        'area': request.user.perfil.area
+        'area': area
     }
     
-    return render(request, 'core/tickets_sin_asignar.html', context)
+    return render(request, 'core/tickets/tickets_sin_asignar.html', context)
+
+@login_requerido
+async def eventos_cola_view(request):
+    """Server-Sent Events con los cambios en la cola sin asignar del área del usuario
+    (y de su área de jefatura), para actualizar contadores sin recargar las páginas"""
+    acceso = await sync_to_async(contexto_acceso)(request.user)
+    area_ids = {area.id for area in (acceso.area, acceso.area_jefatura) if area}
+    # 204: EventSource deja de reconectarse. Con WSGI la respuesta se armaría completa antes de enviarse
+    if not settings.EVENTOS_COLA or not area_ids:
+        return HttpResponse(status=204)
+    
+    response = StreamingHttpResponse(
+        eventos.flujo_sse(area_ids, ContadorTickets.sin_asignar), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Sin buffer en nginx: cada evento se envía apenas ocurre
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+def importar_tickets_view(request):
+    """Vista para importar tickets desde un archivo CSV o JSONL (solo administradores).
+    Para archivos muy grandes conviene el comando importar_tickets, que no depende del timeout del servidor."""
+    if not request.user.is_superuser:
+        messages.error(request, 'Solo los administradores pueden importar tickets')
+        return redirect('lista_tickets')
+    
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacionTicketsForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Los archivos grandes quedan en disco (TemporaryUploadedFile) y se leen por líneas
+            archivo = abrir_texto(form.cleaned_data['archivo'].file)
+            try:
+                resultado = importar_tickets(
+                    leer_filas(archivo, form.cleaned_data['formato']), request.user
+                )
+            finally:
+                archivo.detach()
+            
+            if resultado.interrupcion:
+                messages.warning(
+                    request,
+                    f'Importación interrumpida en la línea {resultado.interrupcion[0]}; quedaron importados '
+                    f'{resultado.tickets_creados} ticket(s) de las líneas anteriores'
+                )
+            else:
+                messages.success(
+                    request,
+                    f'{resultado.tickets_creados} ticket(s) importados; {resultado.filas_con_error} fila(s) omitidas'
+                )
+    else:
+        form = ImportacionTicketsForm()
+    
+    context = {
+        'form': form,
+        'resultado': resultado,
+        'columnas_obligatorias': COLUMNAS_OBLIGATORIAS,
+        'columnas_opcionales': COLUMNAS_OPCIONALES,
+    }
+    
+    return render(request, 'core/tickets/importar_tickets.html', context)
+
+@login_required
+@require_POST
+def acciones_masivas_view(request):
+    """Asigna, deriva o cambia el estado de los tickets seleccionados en la lista"""
+    form = AccionMasivaForm(request.POST)
+    es_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    
+    # Volver a la lista con los mismos filtros y página
+    siguiente = request.POST.get('siguiente', '')
+    if not url_has_allowed_host_and_scheme(siguiente, allowed_hosts={request.get_host()}):
+        siguiente = reverse('lista_tickets')
+    
+    if not form.is_valid() or not form.cleaned_data['tickets']:
+        errores = form.errors if form.errors else {'tickets': ['Seleccione al menos un ticket']}
+        if es_ajax:
+            return JsonResponse({'success': False, 'errors': errores})
+        for campo_errores in errores.values():
+            for error in campo_errores:
+                messages.error(request, error)
+        return redirect(siguiente)
+    
+    datos = form.cleaned_data
+    ids = datos['tickets']
+    accion = datos['accion']
+    
+    if accion == AccionMasivaForm.ASIGNAR:
+        resultado = asignar_tickets(request.user, ids, datos['trabajador_asignado'])
+    elif accion == AccionMasivaForm.DERIVAR:
+        resultado = derivar_tickets(request.user, ids, datos['area_destino'], datos['motivo_derivacion'])
+    else:
+        resultado = cambiar_estado_tickets(request.user, ids, datos['nuevo_estado'], datos['observacion'])
+    
+    if es_ajax:
+        return JsonResponse({
+            'success': bool(resultado.actualizados),
+            'actualizados': resultado.actualizados,
+            'rechazados': {str(ticket_id): motivo for ticket_id, motivo in resultado.rechazados.items()},
+        })
+    
+    if resultado.actualizados:
+        messages.success(request, f'{len(resultado.actualizados)} ticket(s) actualizados')
+    if resultado.rechazados:
+        # Agrupar los rechazos por motivo para no generar un mensaje por ticket
+        por_motivo = {}
+        for ticket_id, motivo in resultado.rechazados.items():
+            por_motivo.setdefault(motivo, []).append(f'#{ticket_id}')
+        for motivo, tickets in por_motivo.items():
+            messages.warning(request, f'{motivo}: {", ".join(tickets)}')
+    
+    return redirect(siguiente)
+
+# ===================================================================
+# OBSERVABILIDAD: MÉTRICAS Y ESTADO DEL SERVICIO
+# ===================================================================
+
+@require_GET
+def metricas_view(request):
+    """Métricas de requests en formato Prometheus (ver MetricasMiddleware).
+    Si METRICAS_TOKEN está definido se exige 'Authorization: Bearer <token>'."""
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('No autorizado\n', status=401, content_type='text/plain; charset=utf-8')
+    
+    return HttpResponse(REGISTRO.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@require_GET
+def salud_view(request):
+    """Estado para el balanceador (readiness): 200 si todas las bases de datos responden, 503 si no"""
+    bases = {}
+    disponible = True
+    for alias in connections:
+        inicio = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            bases[alias] = {'estado': 'ok', 'latencia_ms': round((time.perf_counter() - inicio) * 1000, 2)}
+        except DatabaseError:
+            bases[alias] = {'estado': 'no disponible'}
+            disponible = False
+    for alias, estado in estado_pools().items():
+        if alias in bases:
+            bases[alias]['pool'] = estado
+    
+    return JsonResponse(
+        {'estado': 'ok' if disponible else 'error', 'bases_de_datos': bases},
+        status=200 if disponible else 503
+    )
 
 # 2. FUNCIONES AUXILIARES DE PERMISOS
 
@@ -1164,10 +1402,7 @@ def _puede_asignar_ticket(user, ticket):
         return True
     
     # Jefe del área del ticket
-    if user.roles_jefatura.filter(
-        area_jefatura=ticket.area_asignada,
-        fecha_fin_jefatura__isnull=True
-    ).exists():
+    if contexto_acceso(user).es_jefe_de(ticket.area_asignada_id):
         return True
     
     return False